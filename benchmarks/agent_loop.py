@@ -0,0 +1,291 @@
+"""
+Offline benchmark of the agent loop, driven by the scripted echo chat provider.
+
+A `KimiSoul` with the default agent and its real tools runs scripted turns in a temporary work
+directory, each made of several steps calling `ReadFile`, `Glob` and `WriteFile` in parallel,
+with the wire recorded to `wire.jsonl` like in a real session. No network is used, so the
+numbers only reflect the overhead of the agent loop itself, unless `--ttft-ms` or
+`--tokens-per-second` shape the stream like a real provider would. The benchmark reports:
+
+- steps per second and wire messages per second of the scripted turns
+- the latency of appending a message to the context
+- the time to restore sessions of various sizes
+- the time to compact the context after the turns
+- the peak RSS of the process
+
+`--save-baseline` stores the results as JSON, and `--baseline` compares a run against stored
+results and exits with status 1 if any metric regressed by more than `--tolerance`.
+
+Usage:
+
+    python benchmarks/agent_loop.py
+    python benchmarks/agent_loop.py --turns 20 --steps 10 --tools 8
+    python benchmarks/agent_loop.py --restore-sizes 1000 10000 100000
+    python benchmarks/agent_loop.py --ttft-ms 300 --tokens-per-second 80
+    python benchmarks/agent_loop.py --save-baseline baseline.json
+    python benchmarks/agent_loop.py --baseline baseline.json --tolerance 0.25
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from kaos.path import KaosPath
+from kosong.chat_provider import ChatProvider
+from kosong.chat_provider.chaos import ChaosChatProvider, ChaosConfig, DelayDistribution
+from kosong.chat_provider.echo import ScriptedEchoChatProvider
+from kosong.message import Message
+
+from kimi_cli.agentspec import DEFAULT_AGENT_FILE
+from kimi_cli.auth.oauth import OAuthManager
+from kimi_cli.config import get_default_config
+from kimi_cli.llm import ALL_MODEL_CAPABILITIES, LLM
+from kimi_cli.session import Session
+from kimi_cli.soul import run_soul
+from kimi_cli.soul.agent import Runtime, load_agent
+from kimi_cli.soul.context import Context
+from kimi_cli.soul.kimisoul import KimiSoul
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.wire import Wire
+
+N_SOURCE_FILES = 20
+
+
+@dataclass(frozen=True, slots=True)
+class Metric:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool
+
+
+def _tool_call(call_id: str, name: str, arguments: dict[str, str]) -> str:
+    payload = {"id": call_id, "name": name, "arguments": json.dumps(arguments)}
+    return f"tool_call: {json.dumps(payload)}"
+
+
+def _turn_scripts(turn: int, n_steps: int, n_tools: int) -> list[str]:
+    scripts: list[str] = []
+    for step in range(n_steps - 1):
+        lines = [
+            f"usage: input_other={1000 * (step + 1)} output=50",
+            f"think: Turn {turn}, step {step}: let me look at the code.",
+            "text: Checking the files.",
+        ]
+        for i in range(n_tools):
+            call_id = f"call-{turn}-{step}-{i}"
+            match i % 3:
+                case 0:
+                    path = f"module_{(step + i) % N_SOURCE_FILES}.py"
+                    lines.append(_tool_call(call_id, "ReadFile", {"path": path}))
+                case 1:
+                    lines.append(_tool_call(call_id, "Glob", {"pattern": "*.py"}))
+                case _:
+                    content = f"turn {turn} step {step}\n" * 20
+                    arguments = {"path": f"out_{turn}_{step}_{i}.txt", "content": content}
+                    lines.append(_tool_call(call_id, "WriteFile", arguments))
+        scripts.append("\n".join(lines))
+    scripts.append(f"usage: input_other={1000 * n_steps} output=20\ntext: Turn {turn} is done.")
+    return scripts
+
+
+async def _create_soul(
+    work_dir: Path, scripts: list[str], chaos_config: ChaosConfig | None
+) -> KimiSoul:
+    for i in range(N_SOURCE_FILES):
+        source = "\n".join(f"def function_{j}(x):\n    return x * {j}\n" for j in range(100))
+        (work_dir / f"module_{i}.py").write_text(source)
+    config = get_default_config()
+    chat_provider: ChatProvider = ScriptedEchoChatProvider(scripts)
+    if chaos_config is not None:
+        chat_provider = ChaosChatProvider(chat_provider, chaos_config=chaos_config)
+    llm = LLM(
+        chat_provider=chat_provider,
+        max_context_size=10_000_000,
+        capabilities=set(ALL_MODEL_CAPABILITIES),
+    )
+    session = await Session.create(KaosPath.unsafe_from_local_path(work_dir))
+    runtime = await Runtime.create(config, OAuthManager(config), llm, session, yolo=True)
+    agent = await load_agent(DEFAULT_AGENT_FILE, runtime, mcp_configs=[])
+    return KimiSoul(agent, context=Context(session.context_file))
+
+
+async def _bench_loop(
+    work_dir: Path, n_turns: int, n_steps: int, n_tools: int, chaos_config: ChaosConfig | None
+) -> list[Metric]:
+    scripts = [s for turn in range(n_turns) for s in _turn_scripts(turn, n_steps, n_tools)]
+    soul = await _create_soul(work_dir, [*scripts, "text: Summary of the session."], chaos_config)
+    n_messages = 0
+
+    async def _ui_loop_fn(wire: Wire) -> None:
+        nonlocal n_messages
+        wire_ui = wire.ui_side(merge=False)
+        while True:
+            try:
+                await wire_ui.receive()
+            except QueueShutDown:
+                return
+            n_messages += 1
+
+    start = time.perf_counter()
+    for turn in range(n_turns):
+        await run_soul(
+            soul, f"Please work on task {turn}.", _ui_loop_fn, asyncio.Event(), soul.wire_file
+        )
+    elapsed = time.perf_counter() - start
+    messages_per_second = n_messages / elapsed
+
+    start = time.perf_counter()
+    await run_soul(soul, "/compact", _ui_loop_fn, asyncio.Event(), soul.wire_file)
+    compaction_s = time.perf_counter() - start
+    await soul.context.close()
+
+    n_total_steps = n_turns * n_steps
+    return [
+        Metric("steps_per_second", n_total_steps / elapsed, "steps/s", True),
+        Metric("wire_messages_per_second", messages_per_second, "msgs/s", True),
+        Metric("compaction_ms", compaction_s * 1000, "ms", False),
+    ]
+
+
+def _session_messages(n_messages: int) -> list[Message]:
+    body = "Some text in the conversation. " * 20
+    return [
+        Message(role="user" if i % 2 == 0 else "assistant", content=f"{i}: {body}")
+        for i in range(n_messages)
+    ]
+
+
+async def _bench_append(work_dir: Path, n_appends: int) -> list[Metric]:
+    context = Context(work_dir / "append.jsonl")
+    latencies: list[float] = []
+    for message in _session_messages(n_appends):
+        start = time.perf_counter()
+        await context.append_message(message)
+        latencies.append(time.perf_counter() - start)
+    await context.close()
+    latencies.sort()
+    return [
+        Metric("append_p50_us", statistics.median(latencies) * 1e6, "us", False),
+        Metric("append_p95_us", latencies[int(len(latencies) * 0.95)] * 1e6, "us", False),
+    ]
+
+
+async def _bench_restore(work_dir: Path, n_messages: int) -> Metric:
+    path = work_dir / f"restore_{n_messages}.jsonl"
+    context = Context(path)
+    async with context.batch():
+        for i, message in enumerate(_session_messages(n_messages)):
+            if i % 20 == 0:
+                await context.checkpoint(add_user_message=False)
+            await context.append_message(message)
+    await context.close()
+
+    start = time.perf_counter()
+    restored = Context(path)
+    await restored.restore()
+    elapsed = time.perf_counter() - start
+    assert len(restored.history) == n_messages
+    return Metric(f"restore_{n_messages}_ms", elapsed * 1000, "ms", False)
+
+
+def _peak_rss_mb() -> Metric | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return Metric("peak_rss_mb", peak_mb, "MB", False)
+
+
+async def _main(args: argparse.Namespace) -> list[Metric]:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        # keep the sessions of the benchmark out of the real share directory
+        os.environ["KIMI_SHARE_DIR"] = str(tmp_path / "share")
+        work_dir = tmp_path / "work"
+        work_dir.mkdir()
+
+        chaos_config = None
+        if args.ttft_ms or args.tokens_per_second:
+            chaos_config = ChaosConfig(
+                error_probability=0.0,
+                corrupt_tool_call_probability=0.0,
+                ttft_delay=DelayDistribution(kind="exponential", mean_ms=args.ttft_ms),
+                max_tokens_per_second=args.tokens_per_second,
+            )
+        metrics = await _bench_loop(work_dir, args.turns, args.steps, args.tools, chaos_config)
+        metrics += await _bench_append(tmp_path, args.appends)
+        for n_messages in args.restore_sizes:
+            metrics.append(await _bench_restore(tmp_path, n_messages))
+    if rss := _peak_rss_mb():
+        metrics.append(rss)
+    return metrics
+
+
+def _compare(metrics: list[Metric], baseline: dict[str, float], tolerance: float) -> bool:
+    regressed = False
+    for metric in metrics:
+        if metric.name not in baseline:
+            continue
+        base = baseline[metric.name]
+        change = (metric.value - base) / base if base else 0.0
+        worse = -change if metric.higher_is_better else change
+        flag = "REGRESSED" if worse > tolerance else ""
+        regressed |= bool(flag)
+        print(
+            f"  {metric.name:<28} {base:>12,.2f} -> {metric.value:>12,.2f} ({change:+7.1%}) {flag}"
+        )
+    return not regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline agent loop benchmark")
+    parser.add_argument("--turns", type=int, default=10, help="scripted turns to run")
+    parser.add_argument("--steps", type=int, default=5, help="steps per turn")
+    parser.add_argument("--tools", type=int, default=6, help="tool calls per step")
+    parser.add_argument("--appends", type=int, default=2000, help="messages to append")
+    parser.add_argument(
+        "--restore-sizes",
+        type=int,
+        nargs="*",
+        default=[1_000, 10_000],
+        help="numbers of messages of the restored sessions",
+    )
+    parser.add_argument(
+        "--ttft-ms", type=float, default=0.0, help="mean time to first token of each step"
+    )
+    parser.add_argument(
+        "--tokens-per-second", type=float, help="cap on the streaming speed of each step"
+    )
+    parser.add_argument("--save-baseline", type=Path, help="store the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against stored results")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    metrics = asyncio.run(_main(args))
+    for metric in metrics:
+        print(f"{metric.name:<30} {metric.value:>12,.2f} {metric.unit}")
+
+    if args.save_baseline:
+        results = {metric.name: metric.value for metric in metrics}
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline:
+        print(f"compared to {args.baseline} (tolerance {args.tolerance:.0%}):")
+        if not _compare(metrics, json.loads(args.baseline.read_text()), args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Offline benchmark of the compaction strategies.
+
+Every strategy compacts the history of each given context file, with a scripted echo provider
+standing in for the LLM, and the benchmark reports the estimated tokens before and after, the
+wall time, the number of LLM calls and the tokens sent to them. Without context files, a
+synthetic session made of coding turns with file reads and shell logs is used, and `--rounds`
+compacts it repeatedly as it grows, which shows how the cost of later compactions evolves. Only
+the strategy overhead is measured, since the scripted provider answers instantly.
+
+Usage:
+
+    python benchmarks/compaction.py ~/.kimi/sessions/<work-dir-hash>/<session-id>/context.jsonl
+    python benchmarks/compaction.py --turns 50 --max-context-size 128000
+    python benchmarks/compaction.py --turns 100 --rounds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import get_args
+
+from kosong.chat_provider import ThinkingEffort
+from kosong.chat_provider.echo import ScriptedEchoChatProvider, ScriptedEchoStreamedMessage
+from kosong.message import Message, ToolCall
+from kosong.tooling import Tool
+
+from kimi_cli.llm import LLM
+from kimi_cli.soul.compaction import CompactionStrategy, create_compaction
+from kimi_cli.soul.context import Context
+from kimi_cli.soul.tokens import estimate_message_tokens
+from kimi_cli.wire.types import TextPart, ThinkPart
+
+SUMMARY_SCRIPT = "text: " + "The user asked to fix a bug and the assistant did it. " * 40
+
+
+class CountingProvider(ScriptedEchoChatProvider):
+    def __init__(self) -> None:
+        super().__init__([])
+        self.n_calls = 0
+        self.n_input_tokens = 0
+
+    async def generate(
+        self,
+        system_prompt: str,
+        tools: Sequence[Tool],
+        history: Sequence[Message],
+    ) -> ScriptedEchoStreamedMessage:
+        self.n_calls += 1
+        self.n_input_tokens += sum(map(estimate_message_tokens, history))
+        self._scripts.append(SUMMARY_SCRIPT)
+        return await super().generate(system_prompt, tools, history)
+
+    def with_thinking(self, effort: ThinkingEffort) -> CountingProvider:
+        return self
+
+
+def synthetic_session(n_turns: int) -> list[Message]:
+    history: list[Message] = []
+    for turn in range(n_turns):
+        history.append(Message(role="user", content=f"Please fix bug #{turn} in module_{turn}.py"))
+        for step in range(4):
+            call_id = f"call-{turn}-{step}"
+            if step % 2 == 0:
+                tool_call = ToolCall(
+                    id=call_id,
+                    function=ToolCall.FunctionBody(
+                        name="ReadFile", arguments=json.dumps({"path": f"module_{turn}.py"})
+                    ),
+                )
+                output = "\n".join(
+                    f"{i:6}\tdef function_{i}(x): return x * {i}" for i in range(300)
+                )
+            else:
+                tool_call = ToolCall(
+                    id=call_id,
+                    function=ToolCall.FunctionBody(
+                        name="Shell", arguments=json.dumps({"command": "pytest -q"})
+                    ),
+                )
+                output = "\n".join(f"tests/test_{i}.py ....... [{i}%]" for i in range(200))
+            history.append(
+                Message(
+                    role="assistant",
+                    content=[
+                        ThinkPart(think="I should look at the code and run the tests. " * 10),
+                        TextPart(text="Let me check."),
+                    ],
+                    tool_calls=[tool_call],
+                )
+            )
+            history.append(Message(role="tool", content=output, tool_call_id=call_id))
+        history.append(Message(role="assistant", content=f"Bug #{turn} is fixed."))
+    return history
+
+
+async def _load(path: Path) -> list[Message]:
+    context = Context(path)
+    await context.restore()
+    return list(context.history)
+
+
+async def _run(name: str, rounds: list[list[Message]], max_context_size: int) -> None:
+    n_tokens = sum(estimate_message_tokens(m) for messages in rounds for m in messages)
+    n_messages = sum(map(len, rounds))
+    print(f"{name}: {n_messages} messages, ~{n_tokens:,} tokens, {len(rounds)} compactions")
+    for strategy in get_args(CompactionStrategy.__value__):
+        provider = CountingProvider()
+        llm = LLM(chat_provider=provider, max_context_size=max_context_size, capabilities=set())
+        compaction = create_compaction(strategy)
+        compacted: Sequence[Message] = []
+        elapsed = 0.0
+        for messages in rounds:
+            start = time.perf_counter()
+            compacted = await compaction.compact([*compacted, *messages], llm)
+            elapsed += time.perf_counter() - start
+        n_compacted = sum(map(estimate_message_tokens, compacted))
+        saved = 1 - n_compacted / n_tokens if n_tokens else 0.0
+        print(
+            f"  {strategy:<12} ~{n_compacted:>9,} tokens ({saved:6.1%} saved) "
+            f"in {elapsed * 1000:8.2f}ms with {provider.n_calls:>3} LLM calls "
+            f"reading ~{provider.n_input_tokens:,} tokens"
+        )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    if not args.context_files:
+        history = synthetic_session(args.turns)
+        # a synthetic turn is made of 10 messages
+        size = -(-args.turns // args.rounds) * 10
+        rounds = [history[i : i + size] for i in range(0, len(history), size)]
+        await _run(f"synthetic session of {args.turns} turns", rounds, args.max_context_size)
+    for path in args.context_files:
+        await _run(str(path), [await _load(path)], args.max_context_size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compaction strategy benchmark")
+    parser.add_argument("context_files", nargs="*", type=Path, help="context.jsonl files to replay")
+    parser.add_argument("--turns", type=int, default=20, help="turns of the synthetic session")
+    parser.add_argument(
+        "--rounds", type=int, default=1, help="compactions while the synthetic session grows"
+    )
+    parser.add_argument(
+        "--max-context-size", type=int, default=262_144, help="context window of the model"
+    )
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
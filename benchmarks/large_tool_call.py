@@ -0,0 +1,92 @@
+"""
+Benchmark of streaming a large tool call argument through `kosong.generate` and the `Wire`.
+
+A mock chat provider streams a `WriteFile` tool call whose arguments (1 MB by default) arrive
+in small `ToolCallPart` deltas, which are merged both by `generate` and by the merged side of
+the `Wire`. `--eager` merges with `merge_in_place` in the same loop for comparison, which
+copies the whole argument string on every delta.
+
+Usage:
+
+    python benchmarks/large_tool_call.py --size 1000000 --delta 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+import kosong
+from kosong.chat_provider import StreamedMessagePart
+from kosong.chat_provider.mock import MockChatProvider
+from kosong.message import ToolCall, ToolCallPart
+
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.wire import Wire, WireUISide
+
+
+def _deltas(size: int, delta: int) -> list[StreamedMessagePart]:
+    arguments = json.dumps({"path": "big.txt", "content": "x" * size})
+    parts: list[StreamedMessagePart] = [
+        ToolCall(id="call_1", function=ToolCall.FunctionBody(name="WriteFile", arguments=None))
+    ]
+    parts.extend(
+        ToolCallPart(arguments_part=arguments[i : i + delta])
+        for i in range(0, len(arguments), delta)
+    )
+    return parts
+
+
+async def _drain(ui_side: WireUISide) -> None:
+    while True:
+        try:
+            await ui_side.receive()
+        except QueueShutDown:
+            return
+
+
+async def _through_generate_and_wire(parts: list[StreamedMessagePart]) -> float:
+    wire = Wire()
+    drain = asyncio.create_task(_drain(wire.ui_side(merge=True)))
+    start = time.perf_counter()
+    result = await kosong.generate(
+        MockChatProvider(parts),
+        system_prompt="",
+        tools=[],
+        history=[],
+        on_message_part=wire.soul_side.send,
+    )
+    wire.shutdown()
+    await drain
+    assert result.message.tool_calls
+    return time.perf_counter() - start
+
+
+def _eager_merge(parts: list[StreamedMessagePart]) -> float:
+    start = time.perf_counter()
+    # one merge for `generate` and one for the wire, as before
+    for _ in range(2):
+        pending = parts[0].model_copy(deep=True)
+        for part in parts[1:]:
+            assert pending.merge_in_place(part)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Large tool call streaming benchmark")
+    parser.add_argument("--size", type=int, default=1_000_000, help="argument size in bytes")
+    parser.add_argument("--delta", type=int, default=8, help="bytes per streamed delta")
+    parser.add_argument("--eager", action="store_true", help="also time eager merge_in_place")
+    args = parser.parse_args()
+
+    parts = _deltas(args.size, args.delta)
+    elapsed = asyncio.run(_through_generate_and_wire(parts))
+    print(f"generate + wire: {len(parts)} deltas in {elapsed:.3f}s")
+    if args.eager:
+        print(f"eager merge_in_place: {len(parts)} deltas in {_eager_merge(parts):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
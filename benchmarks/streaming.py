@@ -0,0 +1,78 @@
+"""
+Benchmark of streaming throughput through `kosong.generate` and the `Wire`.
+
+A mock chat provider streams short text deltas, which `generate` forwards to the soul side of a
+`Wire` drained by several UI subscribers, the same way `KimiSoul` does during a step.
+`--copy-deltas` deep-copies every delta before it reaches the wire, as `generate` used to do.
+
+Usage:
+
+    python benchmarks/streaming.py --tokens 100000 --subscribers 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import kosong
+from kosong.chat_provider import StreamedMessagePart
+from kosong.chat_provider.mock import MockChatProvider
+from kosong.message import TextPart
+
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.wire import Wire, WireUISide
+
+
+async def _drain(ui_side: WireUISide) -> int:
+    received = 0
+    while True:
+        try:
+            await ui_side.receive()
+        except QueueShutDown:
+            return received
+        received += 1
+
+
+async def _run(tokens: int, subscribers: int, copy_deltas: bool) -> float:
+    parts: list[StreamedMessagePart] = [TextPart(text=f"tok{i % 10} ") for i in range(tokens)]
+    wire = Wire()
+    drains = [asyncio.create_task(_drain(wire.ui_side(merge=False))) for _ in range(subscribers)]
+    drains.append(asyncio.create_task(_drain(wire.ui_side(merge=True))))
+
+    def on_message_part(part: StreamedMessagePart) -> None:
+        wire.soul_side.send(part.model_copy(deep=True) if copy_deltas else part)
+
+    start = time.perf_counter()
+    await kosong.generate(
+        MockChatProvider(parts),
+        system_prompt="",
+        tools=[],
+        history=[],
+        on_message_part=on_message_part,
+    )
+    wire.shutdown()
+    await asyncio.gather(*drains)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Streaming throughput through generate + Wire")
+    parser.add_argument("--tokens", type=int, default=100_000, help="number of streamed deltas")
+    parser.add_argument("--subscribers", type=int, default=3, help="number of raw UI subscribers")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs, best is reported")
+    parser.add_argument(
+        "--copy-deltas", action="store_true", help="deep-copy every delta (previous behavior)"
+    )
+    args = parser.parse_args()
+
+    best = min(
+        asyncio.run(_run(args.tokens, args.subscribers, args.copy_deltas))
+        for _ in range(args.repeat)
+    )
+    print(f"{args.tokens} deltas in {best:.3f}s: {args.tokens / best:,.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark of the wire pipeline behind the web UI: soul -> `Wire` -> JSON-RPC on stdout ->
+web runner -> websocket.
+
+Text deltas of a given size are sent on the soul side of a `Wire`. They are encoded as JSON-RPC
+events like `WireServer` does, written to a socket standing in for the stdout of the worker,
+read back and parsed line by line like the web runner does, and forwarded to a fake websocket.
+`--legacy` encodes and parses the messages through the generic pydantic models, as the server
+and the runner used to do.
+
+Usage:
+
+    python benchmarks/wire_pipeline.py
+    python benchmarks/wire_pipeline.py --sizes 1000 100000 --messages 2000 --legacy
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.wire import Wire, WireUISide
+from kimi_cli.wire.jsonrpc import (
+    JSONRPCErrorResponse,
+    JSONRPCEventMessage,
+    JSONRPCSuccessResponse,
+    dump_jsonrpc_message,
+    parse_jsonrpc_response,
+)
+from kimi_cli.wire.serde import deserialize_wire_message
+from kimi_cli.wire.types import TextPart
+
+STREAM_LIMIT = 100 * 1024 * 1024
+
+
+class _FakeWebSocket:
+    def __init__(self) -> None:
+        self.received = 0
+
+    async def send_text(self, data: str) -> None:
+        self.received += 1
+
+
+def _legacy_parse(line: bytes) -> object:
+    msg = json.loads(line)
+    match msg.get("method"):
+        case "event":
+            msg["params"] = deserialize_wire_message(msg["params"])
+            return JSONRPCEventMessage.model_validate(msg)
+        case _:
+            if msg.get("error"):
+                return JSONRPCErrorResponse.model_validate(msg)
+            return JSONRPCSuccessResponse.model_validate(msg)
+
+
+async def _server(ui_side: WireUISide, writer: asyncio.StreamWriter, legacy: bool) -> None:
+    while True:
+        try:
+            msg = await ui_side.receive()
+        except QueueShutDown:
+            break
+        assert isinstance(msg, TextPart)
+        event = JSONRPCEventMessage(params=msg)
+        data = event.model_dump_json().encode("utf-8") if legacy else dump_jsonrpc_message(event)
+        writer.write(data + b"\n")
+        await writer.drain()
+    writer.close()
+
+
+async def _runner(reader: asyncio.StreamReader, ws: _FakeWebSocket, legacy: bool) -> None:
+    while line := await reader.readline():
+        await ws.send_text(line.decode("utf-8").rstrip("\n"))
+        if legacy:
+            _legacy_parse(line)
+        else:
+            parse_jsonrpc_response(line)
+
+
+async def _run(size: int, messages: int, legacy: bool) -> float:
+    server_sock, runner_sock = socket.socketpair()
+    _, writer = await asyncio.open_connection(sock=server_sock, limit=STREAM_LIMIT)
+    reader, _ = await asyncio.open_connection(sock=runner_sock, limit=STREAM_LIMIT)
+    wire = Wire()
+    ws = _FakeWebSocket()
+
+    start = time.perf_counter()
+    server = asyncio.create_task(_server(wire.ui_side(merge=False), writer, legacy))
+    runner = asyncio.create_task(_runner(reader, ws, legacy))
+    for i in range(messages):
+        wire.soul_side.send(TextPart(text=str(i % 10) * size))
+        if i % 100 == 0:
+            # let the pipeline drain, as the soul would while waiting on the model
+            await asyncio.sleep(0)
+    wire.shutdown()
+    await server
+    await runner
+    elapsed = time.perf_counter() - start
+    assert ws.received == messages
+    runner_sock.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Wire to websocket pipeline benchmark")
+    parser.add_argument(
+        "--sizes", type=int, nargs="*", default=[1_000, 100_000], help="sizes of the deltas"
+    )
+    parser.add_argument("--messages", type=int, default=2_000, help="messages per size")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs, best is reported")
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="encode and parse through the generic pydantic models",
+    )
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        best = min(asyncio.run(_run(size, args.messages, args.legacy)) for _ in range(args.repeat))
+        print(f"{size:>8} bytes: {args.messages / best:>10,.0f} msgs/s")
+
+
+if __name__ == "__main__":
+    main()
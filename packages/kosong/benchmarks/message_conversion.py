@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of the per-step history conversion of the Kimi chat provider.
+
+The history grows by one assistant message and one tool result per step. With the conversion
+cache, the time spent converting the history in each step stays flat as the history grows;
+`--no-cache` converts the whole history every step for comparison.
+
+Usage:
+
+    python benchmarks/message_conversion.py --steps 400
+"""
+
+import argparse
+import asyncio
+import contextlib
+import statistics
+import time
+from typing import Any
+
+from kosong.chat_provider.conversion_cache import MessageConversionCache
+from kosong.chat_provider.kimi import Kimi
+from kosong.message import Message, TextPart, ThinkPart, ToolCall
+
+
+class _Sent(Exception):
+    """Raised by the stub client once the request has been built."""
+
+
+async def _create(**_: Any) -> Any:
+    raise _Sent
+
+
+def _step_messages(step: int) -> list[Message]:
+    tool_call_id = f"call_{step}"
+    return [
+        Message(
+            role="assistant",
+            content=[
+                ThinkPart(think="Let me look at the next file. " * 20),
+                TextPart(text=f"Reading file {step}."),
+            ],
+            tool_calls=[
+                ToolCall(
+                    id=tool_call_id,
+                    function=ToolCall.FunctionBody(
+                        name="ReadFile", arguments=f'{{"path": "src/module_{step}.py"}}'
+                    ),
+                )
+            ],
+        ),
+        Message(
+            role="tool",
+            content=[TextPart(text=f"{i}\tline {i} of module {step}\n") for i in range(50)],
+            tool_call_id=tool_call_id,
+        ),
+    ]
+
+
+async def _run(steps: int, report_every: int, cache: bool) -> None:
+    provider = Kimi(model="kimi-k2-turbo-preview", api_key="benchmark")
+    provider.client.chat.completions.create = _create  # type: ignore[method-assign]
+    history = [Message(role="user", content="Refactor the project.")]
+    timings: list[float] = []
+    for step in range(1, steps + 1):
+        history.extend(_step_messages(step))
+        if not cache:
+            provider._conversion_cache = MessageConversionCache()  # pyright: ignore[reportPrivateUsage]
+        start = time.perf_counter()
+        with contextlib.suppress(_Sent):
+            await provider.generate("You are a helpful assistant.", [], history)
+        timings.append(time.perf_counter() - start)
+        if step % report_every == 0:
+            window = timings[-report_every:]
+            print(
+                f"step {step:5d}  messages {len(history):6d}  "
+                f"median {statistics.median(window) * 1000:8.3f} ms/step"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0] if __doc__ else None)
+    parser.add_argument("--steps", type=int, default=400, help="number of steps to simulate")
+    parser.add_argument("--report-every", type=int, default=50, help="steps per report line")
+    parser.add_argument("--no-cache", action="store_true", help="disable the conversion cache")
+    args = parser.parse_args()
+    asyncio.run(_run(args.steps, args.report_every, cache=not args.no_cache))
+
+
+if __name__ == "__main__":
+    main()
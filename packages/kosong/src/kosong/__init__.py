@@ -75,10 +75,11 @@ from dataclasses import dataclass
 
 from loguru import logger
 
-from kosong._generate import GenerateResult, generate
+from kosong._generate import GenerateResult, StreamTimeout, generate
 from kosong.chat_provider import ChatProvider, ChatProviderError, StreamedMessagePart, TokenUsage
 from kosong.message import Message, ToolCall
 from kosong.tooling import ToolResult, ToolResultFuture, Toolset
+from kosong.tracing import span
 from kosong.utils.aio import Callback
 
 # Explicitly import submodules
@@ -96,6 +97,7 @@ __all__ = [
     # classes and functions
     "generate",
     "GenerateResult",
+    "StreamTimeout",
     "step",
     "StepResult",
 ]
@@ -109,6 +111,7 @@ async def step(
     *,
     on_message_part: Callback[[StreamedMessagePart], None] | None = None,
     on_tool_result: Callable[[ToolResult], None] | None = None,
+    stream_timeout: StreamTimeout | None = None,
 ) -> "StepResult":
     """
     Run one agent "step". In one step, the function generates LLM response based on the given
@@ -120,6 +123,7 @@ async def step(
     The message history will NOT be modified in this function.
 
     The token usage will be returned in the `StepResult` if available.
+    If `stream_timeout` is given, a stream that stalls is aborted with `APITimeoutError`.
 
     Raises:
         APIConnectionError: If the API connection fails.
@@ -154,22 +158,26 @@ async def step(
             result.add_done_callback(future_done_callback)
             tool_result_futures[tool_call.id] = result
 
-    try:
-        result = await generate(
-            chat_provider,
-            system_prompt,
-            toolset.tools,
-            history,
-            on_message_part=on_message_part,
-            on_tool_call=on_tool_call,
-        )
-    except (ChatProviderError, asyncio.CancelledError):
-        # cancel all the futures to avoid hanging tasks
-        for future in tool_result_futures.values():
-            future.remove_done_callback(future_done_callback)
-            future.cancel()
-        await asyncio.gather(*tool_result_futures.values(), return_exceptions=True)
-        raise
+    with span("kosong.step") as current:
+        try:
+            result = await generate(
+                chat_provider,
+                system_prompt,
+                toolset.tools,
+                history,
+                on_message_part=on_message_part,
+                on_tool_call=on_tool_call,
+                stream_timeout=stream_timeout,
+            )
+        except (ChatProviderError, asyncio.CancelledError):
+            # cancel all the futures to avoid hanging tasks
+            for future in tool_result_futures.values():
+                future.remove_done_callback(future_done_callback)
+                future.cancel()
+            await asyncio.gather(*tool_result_futures.values(), return_exceptions=True)
+            raise
+        if current is not None:
+            current.set_attribute("n_tool_calls", len(tool_calls))
 
     return StepResult(
         result.id,
@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import Sequence
 from dataclasses import dataclass
 
@@ -5,13 +6,16 @@ from loguru import logger
 
 from kosong.chat_provider import (
     APIEmptyResponseError,
+    APITimeoutError,
     ChatProvider,
+    StreamedMessage,
     StreamedMessagePart,
     TokenUsage,
 )
-from kosong.message import ContentPart, Message, ToolCall
+from kosong.message import ContentPart, MergeBuffer, Message, ToolCall
 from kosong.tooling import Tool
-from kosong.utils.aio import Callback, callback
+from kosong.tracing import span
+from kosong.utils.aio import Callback, aclose, callback
 
 
 async def generate(
@@ -22,6 +26,7 @@ async def generate(
     *,
     on_message_part: Callback[[StreamedMessagePart], None] | None = None,
     on_tool_call: Callback[[ToolCall], None] | None = None,
+    stream_timeout: "StreamTimeout | None" = None,
 ) -> "GenerateResult":
     """
     Generate one message based on the given context.
@@ -33,7 +38,11 @@ async def generate(
         tools: The tools available for the model to call.
         history: The message history to use for generation.
         on_message_part: An optional callback to be called for each raw message part.
+            Parts are passed as received from the chat provider, without copying, and must be
+            treated as read-only by the callback.
         on_tool_call: An optional callback to be called for each complete tool call.
+        stream_timeout: Optional limits on how long to wait for the streamed parts. A stream that
+            exceeds them is aborted with `APITimeoutError`.
 
     Returns:
         A tuple of the generated message and the token usage (if available).
@@ -46,30 +55,90 @@ async def generate(
         APIEmptyResponseError: If the API returns an empty response.
         ChatProviderError: If any other recognized chat provider error occurs.
     """
+    with span("kosong.generate") as current:
+        result = await _generate(
+            chat_provider,
+            system_prompt,
+            tools,
+            history,
+            on_message_part,
+            on_tool_call,
+            stream_timeout or StreamTimeout(),
+        )
+        if current is not None:
+            current.set_attribute("message_id", result.id)
+            if result.usage is not None:
+                current.set_attribute("usage.input", result.usage.input)
+                current.set_attribute("usage.output", result.usage.output)
+        return result
+
+
+async def _generate(
+    chat_provider: ChatProvider,
+    system_prompt: str,
+    tools: Sequence[Tool],
+    history: Sequence[Message],
+    on_message_part: Callback[[StreamedMessagePart], None] | None,
+    on_tool_call: Callback[[ToolCall], None] | None,
+    stream_timeout: "StreamTimeout",
+) -> "GenerateResult":
     message = Message(role="assistant", content=[])
-    pending_part: StreamedMessagePart | None = None  # message part that is currently incomplete
+    # message part that is currently incomplete
+    pending: MergeBuffer[StreamedMessagePart] | None = None
 
     logger.trace("Generating with history: {history}", history=history)
-    stream = await chat_provider.generate(system_prompt, tools, history)
-    async for part in stream:
-        logger.trace("Received part: {part}", part=part)
-        if on_message_part:
-            await callback(on_message_part, part.model_copy(deep=True))
-
-        if pending_part is None:
-            pending_part = part
-        elif not pending_part.merge_in_place(part):  # try merge into the pending part
-            # unmergeable part must push the pending part to the buffer
-            _message_append(message, pending_part)
-            if isinstance(pending_part, ToolCall) and on_tool_call:
-                await callback(on_tool_call, pending_part)
-            pending_part = part
+    loop = asyncio.get_running_loop()
+    watchdog = asyncio.timeout(None)
+    # the limit being waited for, only armed while waiting on the chat provider so that slow
+    # callbacks are not mistaken for a stalled stream
+    limit, waiting_for = stream_timeout.first_part, "the first part"
+
+    def arm() -> None:
+        watchdog.reschedule(None if limit is None else loop.time() + limit)
+
+    stream: StreamedMessage | None = None
+    try:
+        async with watchdog:
+            arm()
+            with span(
+                "chat_provider.generate",
+                provider=chat_provider.name,
+                model=chat_provider.model_name,
+                n_messages=len(history),
+            ):
+                stream = await chat_provider.generate(system_prompt, tools, history)
+            async for part in stream:
+                watchdog.reschedule(None)
+                logger.trace("Received part: {part}", part=part)
+                if on_message_part:
+                    await callback(on_message_part, part)
+
+                # the pending part is merged into in place, so it must not alias the streamed
+                # part, which is shared with the callback; copy once per merged part instead of
+                # per delta
+                if pending is None:
+                    pending = MergeBuffer(part.model_copy(deep=True))
+                elif not pending.merge(part):  # try merge into the pending part
+                    # unmergeable part must push the pending part to the buffer
+                    await _finish_part(message, pending.finish(), on_tool_call)
+                    pending = MergeBuffer(part.model_copy(deep=True))
+
+                limit, waiting_for = stream_timeout.idle, "the next part"
+                arm()
+    except TimeoutError as e:
+        if not watchdog.expired():
+            raise
+        raise APITimeoutError(
+            f"The stream stalled: waited more than {limit} seconds for {waiting_for}."
+        ) from e
+    finally:
+        # release the connection of a stream that was abandoned before its end
+        if stream is not None:
+            await aclose(stream)
 
     # end of message
-    if pending_part is not None:
-        _message_append(message, pending_part)
-        if isinstance(pending_part, ToolCall) and on_tool_call:
-            await callback(on_tool_call, pending_part)
+    if pending is not None:
+        await _finish_part(message, pending.finish(), on_tool_call)
 
     if not message.content and not message.tool_calls:
         raise APIEmptyResponseError("The API returned an empty response.")
@@ -81,6 +150,16 @@ async def generate(
     )
 
 
+@dataclass(frozen=True, slots=True)
+class StreamTimeout:
+    """Limits on the gaps in a streamed response, to fail fast on stalled streams."""
+
+    first_part: float | None = None
+    """Seconds to wait for the first part, including the time to send the request."""
+    idle: float | None = None
+    """Seconds to wait for each following part, and for the end of the stream."""
+
+
 @dataclass(frozen=True, slots=True)
 class GenerateResult:
     """The result of a generation."""
@@ -93,6 +172,16 @@ class GenerateResult:
     """The token usage of the generated message."""
 
 
+async def _finish_part(
+    message: Message,
+    part: StreamedMessagePart,
+    on_tool_call: Callback[[ToolCall], None] | None,
+) -> None:
+    _message_append(message, part)
+    if isinstance(part, ToolCall) and on_tool_call:
+        await callback(on_tool_call, part)
+
+
 def _message_append(message: Message, part: StreamedMessagePart) -> None:
     match part:
         case ContentPart():
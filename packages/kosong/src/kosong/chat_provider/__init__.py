@@ -60,7 +60,12 @@ type StreamedMessagePart = ContentPart | ToolCall | ToolCallPart
 
 @runtime_checkable
 class StreamedMessage(Protocol):
-    """The interface of streamed messages."""
+    """
+    The interface of streamed messages.
+
+    A streamed message holding a connection may also define an async `aclose` method, which is
+    called when the stream is abandoned before its end.
+    """
 
     def __aiter__(self) -> AsyncIterator[StreamedMessagePart]:
         """Create an async iterator from the stream."""
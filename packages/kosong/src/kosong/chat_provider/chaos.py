@@ -1,13 +1,16 @@
+import asyncio
 import json
 import os
 import random
+import time
 from collections.abc import AsyncIterator, Sequence
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Literal
 
 import httpx
 from pydantic import BaseModel
 
 from kosong.chat_provider import (
+    APIConnectionError,
     ChatProvider,
     ChatProviderError,
     StreamedMessage,
@@ -15,8 +18,9 @@ from kosong.chat_provider import (
     ThinkingEffort,
     TokenUsage,
 )
-from kosong.message import Message, ToolCall, ToolCallPart
+from kosong.message import Message, TextPart, ThinkPart, ToolCall, ToolCallPart
 from kosong.tooling import Tool
+from kosong.utils.aio import aclose
 
 if TYPE_CHECKING:
 
@@ -26,6 +30,29 @@ if TYPE_CHECKING:
         _: ChatProvider = chaos
 
 
+class DelayDistribution(BaseModel):
+    """A random delay, in milliseconds."""
+
+    kind: Literal["constant", "uniform", "exponential"] = "constant"
+    """`constant` always waits `mean_ms`, `uniform` waits between `mean_ms - jitter_ms` and
+    `mean_ms + jitter_ms`, and `exponential` has a long tail with a mean of `mean_ms`."""
+    mean_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a delay, in seconds."""
+        if self.mean_ms <= 0:
+            return 0.0
+        match self.kind:
+            case "constant":
+                delay_ms = self.mean_ms
+            case "uniform":
+                delay_ms = rng.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+            case "exponential":
+                delay_ms = rng.expovariate(1 / self.mean_ms)
+        return max(0.0, delay_ms) / 1000
+
+
 class ChaosConfig(BaseModel):
     """Configuration for chaos provider."""
 
@@ -35,10 +62,26 @@ class ChaosConfig(BaseModel):
     seed: int | None = None
     corrupt_tool_call_probability: float = 0.1
 
+    ttft_delay: DelayDistribution = DelayDistribution()
+    """Delay before the first streamed part."""
+    inter_part_delay: DelayDistribution = DelayDistribution()
+    """Delay between two streamed parts."""
+    max_tokens_per_second: float | None = None
+    """Cap on the streaming speed, with tokens estimated as 4 bytes of text each."""
+    stall_probability: float = 0.0
+    """Probability for each streamed part to be held back for `stall_ms`."""
+    stall_ms: float = 30_000
+    drop_at_bytes: int | None = None
+    """Drop the connection with `APIConnectionError` once this many bytes were streamed."""
+    drop_probability: float = 1.0
+    """Probability for each stream to be dropped at `drop_at_bytes`."""
+
     @classmethod
     def from_env(cls) -> "ChaosConfig":
         """Create config from environment variables."""
         seed_str = os.getenv("CHAOS_SEED")
+        max_tps_str = os.getenv("CHAOS_MAX_TOKENS_PER_SECOND")
+        drop_at_str = os.getenv("CHAOS_DROP_AT_BYTES")
         return cls(
             error_probability=float(os.getenv("CHAOS_ERROR_PROBABILITY", "0.3")),
             error_types=[
@@ -49,6 +92,30 @@ class ChaosConfig(BaseModel):
             corrupt_tool_call_probability=float(
                 os.getenv("CHAOS_CORRUPT_TOOL_CALL_PROBABILITY", "0.1")
             ),
+            ttft_delay=DelayDistribution(
+                kind="exponential",
+                mean_ms=float(os.getenv("CHAOS_TTFT_MS", "0")),
+            ),
+            inter_part_delay=DelayDistribution(
+                kind="exponential",
+                mean_ms=float(os.getenv("CHAOS_INTER_PART_MS", "0")),
+            ),
+            max_tokens_per_second=float(max_tps_str) if max_tps_str else None,
+            stall_probability=float(os.getenv("CHAOS_STALL_PROBABILITY", "0")),
+            stall_ms=float(os.getenv("CHAOS_STALL_MS", "30000")),
+            drop_at_bytes=int(drop_at_str) if drop_at_str else None,
+            drop_probability=float(os.getenv("CHAOS_DROP_PROBABILITY", "1")),
+        )
+
+    @property
+    def shapes_stream(self) -> bool:
+        """Whether the streamed parts are delayed or dropped."""
+        return (
+            self.ttft_delay.mean_ms > 0
+            or self.inter_part_delay.mean_ms > 0
+            or self.max_tokens_per_second is not None
+            or self.stall_probability > 0
+            or self.drop_at_bytes is not None
         )
 
 
@@ -100,13 +167,19 @@ class ChaosTransport(httpx.AsyncBaseTransport):
 
 
 class ChaosChatProvider:
-    """Wrap a chat provider and inject chaos into its HTTP transport and streamed tool calls."""
+    """
+    Wrap a chat provider and inject chaos into its HTTP transport and streamed messages.
+
+    Error injection needs a provider backed by an httpx transport, while stream shaping and
+    tool call corruption work with any provider, including the echo and mock ones.
+    """
 
     def __init__(self, provider: ChatProvider, chaos_config: ChaosConfig | None = None):
         self._provider = provider
         self._chaos_config = chaos_config or ChaosConfig.from_env()
         self.name: str = provider.name
-        self._monkey_patch_client()
+        if self._chaos_config.error_probability > 0:
+            self._monkey_patch_client()
 
     async def generate(
         self,
@@ -171,6 +244,7 @@ class ChaosChatProvider:
         if (
             self._chaos_config.error_probability > 0
             or self._chaos_config.corrupt_tool_call_probability > 0
+            or self._chaos_config.shapes_stream
         ):
             return f"chaos({self._provider.model_name})"
         return self._provider.model_name
@@ -193,21 +267,55 @@ class ChaosChatProvider:
 
 
 class ChaosStreamedMessage:
-    """Stream wrapper that injects chaos into tool calls."""
+    """Stream wrapper that delays, stalls or drops the stream, and corrupts tool calls."""
 
     def __init__(self, wrapped: StreamedMessage, config: ChaosConfig):
         self._wrapped = wrapped
         self._config = config
         self._rng = random.Random(config.seed)
         self._iterator = wrapped.__aiter__()
+        self._first_part_at: float | None = None
+        self._n_bytes = 0
+        self._drop_at = (
+            config.drop_at_bytes
+            if config.drop_at_bytes is not None and self._rng.random() < config.drop_probability
+            else None
+        )
 
     def __aiter__(self) -> AsyncIterator[StreamedMessagePart]:
         return self
 
     async def __anext__(self) -> StreamedMessagePart:
         part = await self._iterator.__anext__()
+        if self._config.shapes_stream:
+            await self._shape(part)
         return self._maybe_corrupt_tool_call(part)
 
+    async def aclose(self) -> None:
+        await aclose(self._wrapped)
+
+    async def _shape(self, part: StreamedMessagePart) -> None:
+        config = self._config
+        size = _part_size(part)
+        if self._first_part_at is None:
+            delay = config.ttft_delay.sample(self._rng)
+        else:
+            delay = config.inter_part_delay.sample(self._rng)
+            if config.max_tokens_per_second:
+                # the part may only be delivered once the tokens so far fit in the rate
+                earliest = self._first_part_at + (self._n_bytes / 4) / config.max_tokens_per_second
+                delay = max(delay, earliest - time.monotonic())
+        if config.stall_probability > 0 and self._rng.random() < config.stall_probability:
+            delay += config.stall_ms / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._first_part_at is None:
+            self._first_part_at = time.monotonic()
+
+        self._n_bytes += size
+        if self._drop_at is not None and self._n_bytes > self._drop_at:
+            raise APIConnectionError(f"Connection dropped by chaos after {self._drop_at} bytes")
+
     @property
     def id(self) -> str | None:
         return self._wrapped.id
@@ -246,6 +354,21 @@ class ChaosStreamedMessage:
         return corrupted
 
 
+def _part_size(part: StreamedMessagePart) -> int:
+    """Size of the streamed payload of a part, in bytes."""
+    match part:
+        case TextPart(text=text):
+            return len(text.encode())
+        case ThinkPart(think=think):
+            return len(think.encode())
+        case ToolCall(function=function):
+            return len(function.name.encode()) + len((function.arguments or "").encode())
+        case ToolCallPart(arguments_part=arguments_part):
+            return len((arguments_part or "").encode())
+        case _:
+            return 0
+
+
 if __name__ == "__main__":
 
     async def _dev_main_anthropic():
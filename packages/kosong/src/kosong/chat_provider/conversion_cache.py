@@ -0,0 +1,66 @@
+import weakref
+from collections.abc import Callable
+
+from kosong.message import Message
+
+type _Fingerprint = tuple[int, int, int]
+
+
+def _fingerprint(message: Message) -> _Fingerprint:
+    # cheap guard against messages whose content was replaced or appended to after conversion
+    return (id(message.content), len(message.content), id(message.tool_calls))
+
+
+class MessageConversionCache[T]:
+    """
+    Cache of the provider-specific form of history messages, keyed by message identity.
+
+    A history only grows between two steps, so all but its last few messages were already
+    converted by the previous call to `generate`. Entries are dropped when their message is
+    garbage collected. Messages are expected not to be modified in place once they are part of
+    a history, and converted values are shared between calls, so they must not be mutated
+    either.
+
+    >>> cache = MessageConversionCache[str]()
+    >>> message = Message(role="user", content="Hi")
+    >>> cache.get_or_convert(message, lambda m: m.extract_text())
+    'Hi'
+    >>> cache.get_or_convert(message, lambda m: "converted again")
+    'Hi'
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[weakref.ref[Message], _Fingerprint, T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, message: Message) -> T | None:
+        """Get the cached conversion of the message, if it is still up to date."""
+        entry = self._entries.get(id(message))
+        if entry is None:
+            return None
+        ref, fingerprint, converted = entry
+        if ref() is not message or fingerprint != _fingerprint(message):
+            return None
+        return converted
+
+    def put(self, message: Message, converted: T) -> None:
+        """Remember the conversion of the message."""
+        key = id(message)
+        entries = self._entries
+
+        def _drop(ref: weakref.ref[Message]) -> None:
+            entry = entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del entries[key]
+
+        entries[key] = (weakref.ref(message, _drop), _fingerprint(message), converted)
+
+    def get_or_convert(self, message: Message, convert: Callable[[Message], T]) -> T:
+        """Get the cached conversion of the message, converting it on a miss."""
+        converted = self.get(message)
+        if converted is None:
+            converted = convert(message)
+            self.put(message, converted)
+        return converted
@@ -1,11 +1,15 @@
+import base64
+import binascii
 import copy
+import hashlib
 import mimetypes
 import os
 import uuid
 from collections.abc import AsyncIterator, Sequence
-from typing import TYPE_CHECKING, Any, Literal, Self, Unpack, cast
+from typing import TYPE_CHECKING, Any, Literal, Protocol, Self, Unpack, cast
 
 import httpx
+from loguru import logger
 from openai import AsyncOpenAI, AsyncStream, BaseModel, OpenAIError, omit
 from openai._types import RequestFiles, RequestOptions
 from openai.types.chat import (
@@ -19,15 +23,18 @@ from openai.types.completion_usage import CompletionUsage
 from typing_extensions import TypedDict
 
 from kosong.chat_provider import (
+    APIStatusError,
     ChatProvider,
     ChatProviderError,
     StreamedMessagePart,
     ThinkingEffort,
     TokenUsage,
 )
+from kosong.chat_provider.conversion_cache import MessageConversionCache
 from kosong.chat_provider.openai_common import convert_error, tool_to_openai
 from kosong.message import (
     ContentPart,
+    ImageURLPart,
     Message,
     TextPart,
     ThinkPart,
@@ -92,6 +99,8 @@ class Kimi:
         api_key: str | None = None,
         base_url: str | None = None,
         stream: bool = True,
+        upload_images: bool = False,
+        file_cache: "KimiFileCache | None" = None,
         **client_kwargs: Any,
     ):
         if api_key is None:
@@ -107,6 +116,11 @@ class Kimi:
         """The name of the model to use."""
         self.stream: bool = stream
         """Whether to generate responses as a stream."""
+        self.upload_images: bool = upload_images
+        """
+        Whether to upload inline `data:` images via the files API once and reference them by
+        `ms://` URL, instead of sending them as base64 in every request.
+        """
         self.client: AsyncOpenAI = AsyncOpenAI(
             api_key=api_key,
             base_url=base_url,
@@ -114,6 +128,11 @@ class Kimi:
         )
         """The underlying `AsyncOpenAI` client."""
         self._generation_kwargs: Kimi.GenerationKwargs = {}
+        self._file_cache: KimiFileCache = (
+            file_cache if file_cache is not None else InMemoryKimiFileCache()
+        )
+        """`ms://` URLs of the files uploaded by this provider, keyed by content SHA-256."""
+        self._conversion_cache = MessageConversionCache[ChatCompletionMessageParam]()
 
     @property
     def model_name(self) -> str:
@@ -143,7 +162,20 @@ class Kimi:
         messages: list[ChatCompletionMessageParam] = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
-        messages.extend(_convert_message(message) for message in history)
+        upload_images = self.upload_images
+        for message in history:
+            converted = self._conversion_cache.get(message)
+            if converted is None:
+                source, complete = message, True
+                if upload_images:
+                    source, complete = await self._upload_inline_images(message)
+                    # after a failed upload, send the other images of this request inline too
+                    upload_images = complete and self.upload_images
+                converted = _convert_message(source)
+                if complete:
+                    # images sent inline after a failure are uploaded again by a later request
+                    self._conversion_cache.put(message, converted)
+            messages.append(converted)
 
         generation_kwargs: dict[str, Any] = {
             # default kimi generation kwargs
@@ -222,12 +254,84 @@ class Kimi:
 
     @property
     def files(self) -> "KimiFiles":
-        return KimiFiles(self.client)
+        return KimiFiles(self.client, cache=self._file_cache)
+
+    async def _upload_inline_images(self, message: Message) -> tuple[Message, bool]:
+        """
+        Replace inline `data:` images by references to their uploaded files.
+        Returns the message and whether all its images were uploaded.
+        """
+        content: list[ContentPart] | None = None
+        complete = True
+        for i, part in enumerate(message.content):
+            if not isinstance(part, ImageURLPart):
+                continue
+            decoded = _decode_data_url(part.image_url.url)
+            if decoded is None:
+                continue
+            mime_type, data = decoded
+            try:
+                image = await self.files.upload_image(data=data, mime_type=mime_type)
+            except ChatProviderError as e:
+                if isinstance(e, APIStatusError) and e.status_code in _FILES_API_UNSUPPORTED:
+                    # the endpoint has no files API, send images inline from now on
+                    logger.warning("Image uploads are not supported, sending images inline")
+                    self.upload_images = False
+                else:
+                    logger.warning("Failed to upload image, sending it inline: {error}", error=e)
+                complete = False
+                break
+            if content is None:
+                content = list(message.content)
+            content[i] = part.model_copy(
+                update={"image_url": part.image_url.model_copy(update={"url": image.image_url.url})}
+            )
+        if content is not None:
+            message = message.model_copy(update={"content": content})
+        return message, complete
+
+
+_FILES_API_UNSUPPORTED = (404, 405, 501)
+"""Status codes of upload failures which mean that the endpoint has no files API."""
+
+
+class KimiFileCache(Protocol):
+    """Storage for the `ms://` URLs of uploaded files, keyed by content SHA-256."""
+
+    async def get(self, digest: str) -> str | None: ...
+
+    async def put(self, digest: str, url: str) -> None: ...
+
+
+class InMemoryKimiFileCache:
+    """A `KimiFileCache` that lives as long as the chat provider."""
+
+    def __init__(self) -> None:
+        self._urls: dict[str, str] = {}
+
+    async def get(self, digest: str) -> str | None:
+        return self._urls.get(digest)
+
+    async def put(self, digest: str, url: str) -> None:
+        self._urls[digest] = url
 
 
 class KimiFiles:
-    def __init__(self, client: AsyncOpenAI) -> None:
+    def __init__(self, client: AsyncOpenAI, *, cache: KimiFileCache | None = None) -> None:
         self._client = client
+        self._cache = cache if cache is not None else InMemoryKimiFileCache()
+        """`ms://` URLs of the uploaded files, keyed by content SHA-256."""
+
+    async def upload_image(self, *, data: bytes, mime_type: str) -> ImageURLPart:
+        """
+        Upload an image to Kimi files API and return an image URL content part.
+
+        Uploading the same content again reuses the previously uploaded file.
+        """
+        if not mime_type.startswith("image/"):
+            raise ChatProviderError(f"Expected an image mime type, got {mime_type}")
+        url = await self._upload_file(data=data, mime_type=mime_type, purpose="image")
+        return ImageURLPart(image_url=ImageURLPart.ImageURL(url=url))
 
     async def upload_video(self, *, data: bytes, mime_type: str) -> VideoURLPart:
         """Upload a video to Kimi files API and return a video URL content part."""
@@ -237,6 +341,9 @@ class KimiFiles:
         return VideoURLPart(video_url=VideoURLPart.VideoURL(url=url))
 
     async def _upload_file(self, *, data: bytes, mime_type: str, purpose: "KimiFilePurpose") -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        if (url := await self._cache.get(digest)) is not None:
+            return url
         filename = _guess_filename(mime_type)
         files: RequestFiles = {"file": (filename, data, mime_type)}
         options: RequestOptions = {"headers": {"Content-Type": "multipart/form-data"}}
@@ -250,7 +357,9 @@ class KimiFiles:
             )
         except (OpenAIError, httpx.HTTPError) as e:
             raise convert_error(e) from e
-        return f"ms://{response.id}"
+        url = f"ms://{response.id}"
+        await self._cache.put(digest, url)
+        return url
 
 
 class KimiFileObject(BaseModel):
@@ -265,8 +374,21 @@ def _guess_filename(mime_type: str) -> str:
     return f"upload{extension}"
 
 
+def _decode_data_url(url: str) -> tuple[str, bytes] | None:
+    """Decode a base64 `data:` URL into its MIME type and payload."""
+    if not url.startswith("data:"):
+        return None
+    header, sep, payload = url.removeprefix("data:").partition(",")
+    if not sep or not header.endswith(";base64"):
+        return None
+    try:
+        return header.removesuffix(";base64"), base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
 def _convert_message(message: Message) -> ChatCompletionMessageParam:
-    message = message.model_copy(deep=True)
+    message = message.model_copy()
     reasoning_content: str = ""
     content: list[ContentPart] = []
     for part in message.content:
@@ -302,6 +424,7 @@ class KimiStreamedMessage:
     """The streamed message of the Kimi chat provider."""
 
     def __init__(self, response: ChatCompletion | AsyncStream[ChatCompletionChunk]):
+        self._response = response
         if isinstance(response, ChatCompletion):
             self._iter = self._convert_non_stream_response(response)
         else:
@@ -315,6 +438,11 @@ class KimiStreamedMessage:
     async def __anext__(self) -> StreamedMessagePart:
         return await self._iter.__anext__()
 
+    async def aclose(self) -> None:
+        """Close the underlying HTTP response, if the message is streamed."""
+        if isinstance(self._response, AsyncStream):
+            await self._response.close()
+
     @property
     def id(self) -> str | None:
         return self._id
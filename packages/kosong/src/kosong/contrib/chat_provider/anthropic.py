@@ -73,6 +73,7 @@ from kosong.chat_provider import (
     ThinkingEffort,
     TokenUsage,
 )
+from kosong.chat_provider.conversion_cache import MessageConversionCache
 from kosong.contrib.chat_provider.common import ToolMessageConversion
 from kosong.message import (
     ContentPart,
@@ -137,6 +138,7 @@ class Anthropic:
             "max_tokens": default_max_tokens,
             "beta_features": ["interleaved-thinking-2025-05-14"],
         }
+        self._conversion_cache = MessageConversionCache[MessageParam]()
 
     @property
     def model_name(self) -> str:
@@ -177,7 +179,7 @@ class Anthropic:
         )
         messages: list[MessageParam] = []
         for message in history:
-            messages.append(self._convert_message(message))
+            messages.append(self._conversion_cache.get_or_convert(message, self._convert_message))
         if messages:
             last_message = messages[-1]
             last_content = last_message["content"]
@@ -185,8 +187,10 @@ class Anthropic:
             # inject cache control in the last content.
             # https://docs.claude.com/en/docs/build-with-claude/prompt-caching
             if isinstance(last_content, list) and last_content:
-                content_blocks = cast(list[ContentBlockParam], last_content)
-                last_block = content_blocks[-1]
+                # converted messages are cached, so patch a copy of the last block
+                content_blocks = list(cast(list[ContentBlockParam], last_content))
+                last_block = content_blocks[-1] = cast(ContentBlockParam, {**content_blocks[-1]})
+                messages[-1] = MessageParam(role=last_message["role"], content=content_blocks)
                 match last_block["type"]:
                     case (
                         "text"
@@ -332,6 +336,7 @@ class Anthropic:
 
 class AnthropicStreamedMessage:
     def __init__(self, response: AnthropicMessage | AsyncStream[RawMessageStreamEvent]):
+        self._response = response
         if isinstance(response, AnthropicMessage):
             self._iter = self._convert_non_stream_response(response)
         else:
@@ -345,6 +350,11 @@ class AnthropicStreamedMessage:
     async def __anext__(self) -> StreamedMessagePart:
         return await self._iter.__anext__()
 
+    async def aclose(self) -> None:
+        """Close the underlying HTTP response, if the message is streamed."""
+        if isinstance(self._response, AsyncStream):
+            await self._response.close()
+
     @property
     def id(self) -> str | None:
         return self._id
@@ -43,6 +43,7 @@ from kosong.chat_provider import (
     ThinkingEffort,
     TokenUsage,
 )
+from kosong.chat_provider.conversion_cache import MessageConversionCache
 from kosong.message import (
     AudioURLPart,
     ContentPart,
@@ -100,6 +101,7 @@ class GoogleGenAI:
             **client_kwargs,
         )
         self._generation_kwargs: GoogleGenAI.GenerationKwargs = {}
+        self._conversion_cache = MessageConversionCache[Content]()
 
     @property
     def model_name(self) -> str:
@@ -142,7 +144,7 @@ class GoogleGenAI:
         tools: Sequence[KosongTool],
         history: Sequence[Message],
     ) -> "GoogleGenAIStreamedMessage":
-        contents = messages_to_google_genai_contents(history)
+        contents = messages_to_google_genai_contents(history, cache=self._conversion_cache)
 
         config = GenerateContentConfig(**self._generation_kwargs)
         config.system_instruction = system_prompt
@@ -551,14 +553,26 @@ def _tool_messages_to_google_genai_content(
     return Content(role="user", parts=parts)
 
 
-def messages_to_google_genai_contents(messages: Sequence[Message]) -> list[Content]:
+def messages_to_google_genai_contents(
+    messages: Sequence[Message],
+    *,
+    cache: MessageConversionCache[Content] | None = None,
+) -> list[Content]:
     """Convert internal messages into a Gemini contents list.
 
     Tool results for a tool-calling turn are packed into a single "user" message
     with N `functionResponse` parts matching the preceding "model" message's
     N `functionCall` parts. This avoids ordering issues from parallel tool
     execution and satisfies VertexAI's stricter validation.
+
+    If a cache is given, the conversion of non-tool messages is reused across calls.
     """
+
+    def convert(message: Message) -> Content:
+        if cache is None:
+            return message_to_google_genai(message)
+        return cache.get_or_convert(message, message_to_google_genai)
+
     contents: list[Content] = []
     tool_name_by_id: dict[str, str] = {}
 
@@ -567,7 +581,7 @@ def messages_to_google_genai_contents(messages: Sequence[Message]) -> list[Conte
         message = messages[i]
 
         if message.role == "assistant" and message.tool_calls:
-            contents.append(message_to_google_genai(message))
+            contents.append(convert(message))
             expected_tool_call_ids: list[str] = []
             for tool_call in message.tool_calls:
                 tool_name_by_id[tool_call.id] = tool_call.function.name
@@ -604,7 +618,7 @@ def messages_to_google_genai_contents(messages: Sequence[Message]) -> list[Conte
             i += 1
             continue
 
-        contents.append(message_to_google_genai(message))
+        contents.append(convert(message))
         if message.role == "assistant" and message.tool_calls:
             for tool_call in message.tool_calls:
                 tool_name_by_id[tool_call.id] = tool_call.function.name
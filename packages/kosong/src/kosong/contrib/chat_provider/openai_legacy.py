@@ -15,6 +15,7 @@ from openai.types.chat import (
 from typing_extensions import TypedDict
 
 from kosong.chat_provider import ChatProvider, StreamedMessagePart, ThinkingEffort, TokenUsage
+from kosong.chat_provider.conversion_cache import MessageConversionCache
 from kosong.chat_provider.openai_common import (
     convert_error,
     reasoning_effort_to_thinking_effort,
@@ -88,6 +89,7 @@ class OpenAILegacy:
         self._reasoning_key = reasoning_key
         self._tool_message_conversion: ToolMessageConversion | None = tool_message_conversion
         self._generation_kwargs: OpenAILegacy.GenerationKwargs = {}
+        self._conversion_cache = MessageConversionCache[ChatCompletionMessageParam]()
 
     @property
     def model_name(self) -> str:
@@ -109,7 +111,10 @@ class OpenAILegacy:
         if system_prompt:
             # `system` vs `developer`: see `message_to_openai` comments
             messages.append({"role": "system", "content": system_prompt})
-        messages.extend(self._convert_message(message) for message in history)
+        messages.extend(
+            self._conversion_cache.get_or_convert(message, self._convert_message)
+            for message in history
+        )
 
         generation_kwargs: dict[str, Any] = {}
         generation_kwargs.update(self._generation_kwargs)
@@ -164,7 +169,7 @@ class OpenAILegacy:
         # And many openai-compatible models do not accept `developer` role.
         # So we use `system` role here. OpenAIResponses will use `developer` role.
         # See https://cdn.openai.com/spec/model-spec-2024-05-08.html#definitions
-        message = message.model_copy(deep=True)
+        message = message.model_copy()
         reasoning_content: str = ""
         content: list[ContentPart] = []
         for part in message.content:
@@ -191,6 +196,7 @@ class OpenAILegacyStreamedMessage:
     def __init__(
         self, response: ChatCompletion | AsyncStream[ChatCompletionChunk], reasoning_key: str | None
     ):
+        self._response = response
         self._reasoning_key: str | None = reasoning_key
         if isinstance(response, ChatCompletion):
             self._iter = self._convert_non_stream_response(response)
@@ -205,6 +211,11 @@ class OpenAILegacyStreamedMessage:
     async def __anext__(self) -> StreamedMessagePart:
         return await self._iter.__anext__()
 
+    async def aclose(self) -> None:
+        """Close the underlying HTTP response, if the message is streamed."""
+        if isinstance(self._response, AsyncStream):
+            await self._response.close()
+
     @property
     def id(self) -> str | None:
         return self._id
@@ -31,6 +31,7 @@ from openai.types.shared.reasoning_effort import ReasoningEffort
 from openai.types.shared_params.responses_model import ResponsesModel
 
 from kosong.chat_provider import ChatProvider, StreamedMessagePart, ThinkingEffort, TokenUsage
+from kosong.chat_provider.conversion_cache import MessageConversionCache
 from kosong.chat_provider.openai_common import (
     convert_error,
     reasoning_effort_to_thinking_effort,
@@ -125,6 +126,7 @@ class OpenAIResponses:
             **client_kwargs,
         )
         self._generation_kwargs: OpenAIResponses.GenerationKwargs = {}
+        self._conversion_cache = MessageConversionCache[list[ResponseInputItemParam]]()
 
     @property
     def model_name(self) -> str:
@@ -152,7 +154,7 @@ class OpenAIResponses:
         # The `Message` type is OpenAI-compatible for Responses API `input` messages.
 
         for message in history:
-            inputs.extend(self._convert_message(message))
+            inputs.extend(self._conversion_cache.get_or_convert(message, self._convert_message))
 
         generation_kwargs: dict[str, Any] = {}
         generation_kwargs.update(self._generation_kwargs)
@@ -433,6 +435,7 @@ def _map_audio_url_to_file_content(url: str) -> ResponseInputFileContentParam |
 
 class OpenAIResponsesStreamedMessage:
     def __init__(self, response: Response | AsyncStream[ResponseStreamEvent]):
+        self._response = response
         if isinstance(response, Response):
             self._iter = self._convert_non_stream_response(response)
         else:
@@ -446,6 +449,11 @@ class OpenAIResponsesStreamedMessage:
     async def __anext__(self) -> StreamedMessagePart:
         return await self._iter.__anext__()
 
+    async def aclose(self) -> None:
+        """Close the underlying HTTP response, if the message is streamed."""
+        if isinstance(self._response, AsyncStream):
+            await self._response.close()
+
     @property
     def id(self) -> str | None:
         return self._id
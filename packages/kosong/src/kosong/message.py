@@ -227,6 +227,75 @@ class ToolCallPart(BaseModel, MergeableMixin):
         return True
 
 
+class MergeBuffer[T: MergeableMixin]:
+    """
+    An in-flight part that the following streamed parts are merged into in linear time.
+
+    `merge_in_place` grows a string attribute of the part on every merge, which copies the whole
+    string each time. The buffer collects the merged text in a chunk list instead, and
+    materializes it into the part once, when `finish` is called. Parts other than text, think
+    and tool call (part) are merged in place as usual.
+
+    >>> buffer = MergeBuffer(TextPart(text="Hello"))
+    >>> buffer.merge(TextPart(text=", ")), buffer.merge(TextPart(text="world!"))
+    (True, True)
+    >>> buffer.finish()
+    TextPart(type='text', text='Hello, world!')
+    """
+
+    __slots__ = ("_part", "_chunks")
+
+    def __init__(self, part: T) -> None:
+        self._part = part
+        self._chunks: list[str] = []
+
+    def merge(self, other: Any) -> bool:
+        """Merge the other part into the buffered part. Return True if the merge is successful."""
+        part = self._part
+        match part, other:
+            case TextPart(), TextPart():
+                self._chunks.append(other.text)
+            case ThinkPart(), ThinkPart():
+                if part.encrypted:
+                    return False
+                self._chunks.append(other.think)
+                if other.encrypted:
+                    part.encrypted = other.encrypted
+            case ToolCall(), ToolCallPart():
+                if other.arguments_part is not None:
+                    if part.function.arguments is None:
+                        part.function.arguments = ""
+                    self._chunks.append(other.arguments_part)
+            case ToolCallPart(), ToolCallPart():
+                if other.arguments_part is not None:
+                    if part.arguments_part is None:
+                        part.arguments_part = ""
+                    self._chunks.append(other.arguments_part)
+            case _:
+                return part.merge_in_place(other)
+        return True
+
+    def finish(self) -> T:
+        """Materialize the merged text into the buffered part and return it."""
+        chunks = self._chunks
+        if not chunks:
+            return self._part
+        self._chunks = []
+        part = self._part
+        match part:
+            case TextPart():
+                part.text = "".join([part.text, *chunks])
+            case ThinkPart():
+                part.think = "".join([part.think, *chunks])
+            case ToolCall():
+                part.function.arguments = "".join([part.function.arguments or "", *chunks])
+            case ToolCallPart():
+                part.arguments_part = "".join([part.arguments_part or "", *chunks])
+            case _:
+                raise AssertionError(f"unexpected chunks for {type(part).__name__}")
+        return part
+
+
 type Role = Literal[
     # for OpenAI API, this should be converted to `developer`
     # OpenAI & Kimi support system messages in the middle of the conversation.
@@ -316,6 +316,40 @@ class CallableTool2[Params: BaseModel](ABC):
         ...
 
 
+class ToolCallStats(BaseModel):
+    """Execution statistics of a tool call, as measured by the toolset."""
+
+    queue_ms: float
+    """Time spent waiting for other tool calls before running, in milliseconds."""
+    run_ms: float
+    """Time spent running the tool, in milliseconds."""
+    output_bytes: int
+    """Size of the text output given to the model, in UTF-8 bytes."""
+    truncated: bool = False
+    """Whether the tool truncated its output."""
+    error: str | None = None
+    """The class name of the error, if the tool call failed."""
+
+
+class ToolStatsSummary(BaseModel):
+    """Execution statistics of all calls to one tool in a session."""
+
+    n_calls: int
+    """Number of calls."""
+    n_errors: int
+    """Number of calls that failed."""
+    n_truncated: int
+    """Number of calls whose output was truncated."""
+    run_ms_p50: float
+    """Median run time, in milliseconds."""
+    run_ms_p95: float
+    """95th percentile of the run time, in milliseconds."""
+    queue_ms_p95: float
+    """95th percentile of the time spent waiting for other tool calls, in milliseconds."""
+    output_bytes: int
+    """Total size of the outputs, in UTF-8 bytes."""
+
+
 class ToolResult(BaseModel):
     """The result of a tool call."""
 
@@ -323,6 +357,8 @@ class ToolResult(BaseModel):
     """The ID of the tool call."""
     return_value: ToolReturnValue
     """The actual return value of the tool call."""
+    stats: ToolCallStats | None = None
+    """Execution statistics of the tool call, if the toolset measures them."""
 
 
 ToolResultFuture = Future[ToolResult]
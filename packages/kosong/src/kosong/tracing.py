@@ -0,0 +1,162 @@
+"""
+Lightweight span tracing, with spans modeled after OpenTelemetry.
+
+Kosong records spans around `kosong.step`, `kosong.generate` and chat provider calls, and
+applications can add their own with `span`. Nothing is recorded until an exporter is installed,
+for the whole process with `set_exporter` or for the current context with `use_exporter`, so
+tracing only costs two lookups per span when it is off.
+
+Spans opened within another span, including in tasks created inside it, are its children:
+
+```python
+from kosong.tracing import Span, set_exporter, span
+
+
+class PrintExporter:
+    def export(self, span: Span) -> None:
+        print(span.to_dict())
+
+    async def flush(self) -> None:
+        pass
+
+
+set_exporter(PrintExporter())
+with span("outer", user="alice"):
+    with span("inner") as inner:
+        if inner is not None:
+            inner.set_attribute("n_items", 3)
+```
+"""
+
+import random
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Literal, Protocol
+
+type AttributeValue = str | bool | int | float
+"""The types of span attribute values, as supported by OpenTelemetry."""
+
+type SpanStatus = Literal["unset", "ok", "error"]
+
+
+@dataclass(slots=True)
+class Span:
+    """A timed operation, with the same identifiers and fields as an OpenTelemetry span."""
+
+    name: str
+    trace_id: str
+    """32 hex digits, shared by all the spans of a trace."""
+    span_id: str
+    """16 hex digits."""
+    parent_span_id: str | None
+    start_time_unix_nano: int
+    end_time_unix_nano: int = 0
+    attributes: dict[str, AttributeValue] = field(default_factory=dict[str, AttributeValue])
+    status: SpanStatus = "unset"
+    status_message: str | None = None
+
+    def set_attribute(self, key: str, value: AttributeValue | None) -> None:
+        """Set an attribute. `None` values are ignored."""
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = "error"
+        self.status_message = message
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "status": self.status,
+            "status_message": self.status_message,
+        }
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None:
+        """Receive a finished span. Must not block, since it is called from the event loop."""
+        ...
+
+    async def flush(self) -> None:
+        """Deliver all the spans received so far."""
+        ...
+
+
+_exporter: SpanExporter | None = None
+_context_exporter = ContextVar[SpanExporter | None]("span_exporter", default=None)
+_current_span = ContextVar[Span | None]("current_span", default=None)
+
+
+def set_exporter(exporter: SpanExporter | None) -> None:
+    """
+    Install the exporter that receives the finished spans of the whole process, or turn tracing
+    off with `None`. An exporter installed with `use_exporter` takes precedence.
+    """
+    global _exporter
+    _exporter = exporter
+
+
+def get_exporter() -> SpanExporter | None:
+    """The exporter that receives the spans finished in the current context, if any."""
+    return _context_exporter.get() or _exporter
+
+
+@contextmanager
+def use_exporter(exporter: SpanExporter | None) -> Generator[None]:
+    """
+    Send the spans finished within the block, including in tasks created inside it, to
+    `exporter` instead of the one installed with `set_exporter`. This lets several sessions in
+    one process trace to their own exporters. `None` keeps the process-wide exporter.
+    """
+    token = _context_exporter.set(exporter)
+    try:
+        yield
+    finally:
+        _context_exporter.reset(token)
+
+
+def current_span() -> Span | None:
+    """The innermost span open in the current context, if tracing is on."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: AttributeValue | None) -> Generator[Span | None]:
+    """
+    Record the enclosed block as a span, a child of the current span if any.
+    Yields `None` when tracing is off. Exceptions mark the span as failed and are re-raised.
+    """
+    exporter = _context_exporter.get() or _exporter
+    if exporter is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}",
+        span_id=f"{random.getrandbits(64):016x}",
+        parent_span_id=parent.span_id if parent is not None else None,
+        start_time_unix_nano=time.time_ns(),
+    )
+    for key, value in attributes.items():
+        current.set_attribute(key, value)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_time_unix_nano = time.time_ns()
+        exporter.export(current)
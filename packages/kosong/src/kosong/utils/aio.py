@@ -1,6 +1,6 @@
 import inspect
 from collections.abc import Awaitable, Callable
-from typing import cast
+from typing import Any, cast
 
 type Callback[**Params, Return] = Callable[Params, Awaitable[Return] | Return]
 
@@ -12,3 +12,13 @@ async def callback[**Params, Return](
     if inspect.isawaitable(ret):
         return await cast(Awaitable[Return], ret)
     return ret
+
+
+async def aclose(obj: object) -> None:
+    """Close `obj` with its `aclose` or `close` method, if it has one."""
+    close: Callable[[], Any] | None = getattr(obj, "aclose", None) or getattr(obj, "close", None)
+    if close is None:
+        return
+    ret = close()
+    if inspect.isawaitable(ret):
+        await ret
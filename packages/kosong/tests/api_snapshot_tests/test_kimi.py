@@ -8,7 +8,7 @@ from httpx import Response
 from inline_snapshot import snapshot
 
 from kosong.chat_provider.kimi import Kimi
-from kosong.message import Message, TextPart, ThinkPart
+from kosong.message import ImageURLPart, Message, TextPart, ThinkPart
 from kosong.tooling import Tool
 
 BUILTIN_TOOL = Tool(
@@ -317,3 +317,120 @@ async def test_kimi_with_thinking():
             pass
         body = json.loads(mock.calls.last.request.content.decode())
         assert body["reasoning_effort"] == snapshot("high")
+
+
+def _image_message(text: str) -> Message:
+    return Message(
+        role="user",
+        content=[
+            TextPart(text=text),
+            ImageURLPart(image_url=ImageURLPart.ImageURL(url="data:image/png;base64,aGVsbG8=")),
+        ],
+    )
+
+
+async def test_kimi_upload_images_once():
+    with respx.mock(base_url="https://api.moonshot.ai") as mock:
+        files_route = mock.post("/v1/files").mock(
+            return_value=Response(200, json={"id": "file-abc"})
+        )
+        chat_route = mock.post("/v1/chat/completions").mock(
+            return_value=Response(200, json=make_chat_completion_response())
+        )
+        provider = Kimi(
+            model="kimi-k2-turbo-preview", api_key="test-key", stream=False, upload_images=True
+        ).with_thinking("off")
+
+        history = [_image_message("First")]
+        for text in ("Second", "Third"):
+            stream = await provider.generate("", [], history)
+            async for _ in stream:
+                pass
+            history.append(_image_message(text))
+
+        assert files_route.call_count == 1
+        assert b'name="purpose"\r\n\r\nimage' in files_route.calls.last.request.content
+        body = json.loads(chat_route.calls.last.request.content.decode())
+        assert body["messages"] == snapshot(
+            [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "First"},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": "ms://file-abc", "id": None},
+                        },
+                    ],
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "Second"},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": "ms://file-abc", "id": None},
+                        },
+                    ],
+                },
+            ]
+        )
+
+
+async def test_kimi_upload_images_falls_back_to_inline():
+    with respx.mock(base_url="https://api.moonshot.ai") as mock:
+        files_route = mock.post("/v1/files").mock(return_value=Response(404, json={}))
+        chat_route = mock.post("/v1/chat/completions").mock(
+            return_value=Response(200, json=make_chat_completion_response())
+        )
+        provider = Kimi(
+            model="kimi-k2-turbo-preview",
+            api_key="test-key",
+            stream=False,
+            upload_images=True,
+            max_retries=0,
+        )
+
+        for _ in range(2):
+            stream = await provider.generate("", [], [_image_message("Hi")])
+            async for _ in stream:
+                pass
+
+        assert files_route.call_count == 1
+        body = json.loads(chat_route.calls.last.request.content.decode())
+        assert body["messages"][0]["content"][1] == snapshot(
+            {
+                "type": "image_url",
+                "image_url": {"url": "data:image/png;base64,aGVsbG8=", "id": None},
+            }
+        )
+
+
+async def test_kimi_upload_images_retries_after_transient_failure():
+    with respx.mock(base_url="https://api.moonshot.ai") as mock:
+        files_route = mock.post("/v1/files").mock(
+            side_effect=[Response(503, json={}), Response(200, json={"id": "file-abc"})]
+        )
+        chat_route = mock.post("/v1/chat/completions").mock(
+            return_value=Response(200, json=make_chat_completion_response())
+        )
+        provider = Kimi(
+            model="kimi-k2-turbo-preview",
+            api_key="test-key",
+            stream=False,
+            upload_images=True,
+            max_retries=0,
+        )
+        history = [_image_message("Hi")]
+
+        image_urls: list[str] = []
+        for _ in range(2):
+            stream = await provider.generate("", [], history)
+            async for _ in stream:
+                pass
+            body = json.loads(chat_route.calls.last.request.content.decode())
+            image_urls.append(body["messages"][0]["content"][1]["image_url"]["url"])
+
+        assert files_route.call_count == 2
+        assert image_urls == ["data:image/png;base64,aGVsbG8=", "ms://file-abc"]
+        assert provider.upload_images
@@ -1,7 +1,10 @@
 import asyncio
+import time
 
-from kosong.chat_provider import APIStatusError, StreamedMessagePart
-from kosong.chat_provider.chaos import ChaosChatProvider, ChaosConfig
+import pytest
+
+from kosong.chat_provider import APIConnectionError, APIStatusError, StreamedMessagePart
+from kosong.chat_provider.chaos import ChaosChatProvider, ChaosConfig, DelayDistribution
 from kosong.chat_provider.kimi import Kimi
 from kosong.chat_provider.mock import MockChatProvider
 from kosong.message import Message, TextPart
@@ -41,3 +44,47 @@ async def test_chaos_chat_provider():
             raise AssertionError("Expected APIStatusError")
         except APIStatusError:
             pass
+
+
+async def _stream_parts(chat_provider: ChaosChatProvider) -> list[StreamedMessagePart]:
+    parts: list[StreamedMessagePart] = []
+    async for part in await chat_provider.generate(system_prompt="", tools=[], history=[]):
+        parts.append(part)
+    return parts
+
+
+async def test_chaos_chat_provider_shapes_stream():
+    input_parts: list[StreamedMessagePart] = [TextPart(text="x" * 40) for _ in range(5)]
+    chat_provider = ChaosChatProvider(
+        MockChatProvider(message_parts=input_parts),
+        chaos_config=ChaosConfig(
+            error_probability=0.0,
+            corrupt_tool_call_probability=0.0,
+            ttft_delay=DelayDistribution(mean_ms=50),
+            # 10 tokens per part, so each part after the first waits 10ms
+            max_tokens_per_second=1000,
+        ),
+    )
+    assert chat_provider.model_name == "chaos(mock)"
+
+    start = time.monotonic()
+    assert await _stream_parts(chat_provider) == input_parts
+    assert time.monotonic() - start >= 0.09
+
+
+async def test_chaos_chat_provider_drops_connection():
+    input_parts: list[StreamedMessagePart] = [TextPart(text="x" * 40) for _ in range(5)]
+    chat_provider = ChaosChatProvider(
+        MockChatProvider(message_parts=input_parts),
+        chaos_config=ChaosConfig(
+            error_probability=0.0,
+            corrupt_tool_call_probability=0.0,
+            drop_at_bytes=100,
+        ),
+    )
+
+    received: list[StreamedMessagePart] = []
+    with pytest.raises(APIConnectionError):
+        async for part in await chat_provider.generate(system_prompt="", tools=[], history=[]):
+            received.append(part)
+    assert len(received) == 2
@@ -0,0 +1,49 @@
+import gc
+
+from kosong.chat_provider.conversion_cache import MessageConversionCache
+from kosong.message import Message, TextPart
+
+
+def _convert(message: Message) -> str:
+    return message.extract_text()
+
+
+def test_conversion_cache_reuses_conversion():
+    cache = MessageConversionCache[str]()
+    converted: list[str] = []
+
+    def convert(message: Message) -> str:
+        converted.append(message.extract_text())
+        return message.extract_text()
+
+    history = [Message(role="user", content="a"), Message(role="assistant", content="b")]
+    for _ in range(3):
+        texts = [cache.get_or_convert(message, convert) for message in history]
+        assert texts == [message.extract_text() for message in history]
+        history.append(Message(role="user", content=str(len(history))))
+
+    assert converted == ["a", "b", "2", "3"]
+
+
+def test_conversion_cache_detects_replaced_parts():
+    cache = MessageConversionCache[str]()
+    message = Message(role="user", content=[TextPart(text="a")])
+    assert cache.get_or_convert(message, _convert) == "a"
+
+    message.content.append(TextPart(text="b"))
+    assert cache.get(message) is None
+    assert cache.get_or_convert(message, _convert) == "ab"
+
+    message.content = [TextPart(text="c")]
+    assert cache.get_or_convert(message, _convert) == "c"
+
+
+def test_conversion_cache_drops_collected_messages():
+    cache = MessageConversionCache[str]()
+    message = Message(role="user", content="a")
+    cache.put(message, "a")
+    assert len(cache) == 1
+
+    del message
+    gc.collect()
+    assert len(cache) == 0
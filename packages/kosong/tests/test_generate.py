@@ -1,10 +1,15 @@
 import asyncio
+from collections.abc import Sequence
 from copy import deepcopy
 
-from kosong import generate
-from kosong.chat_provider import StreamedMessagePart
-from kosong.chat_provider.mock import MockChatProvider
-from kosong.message import ImageURLPart, TextPart, ToolCall, ToolCallPart
+import pytest
+
+from kosong import StreamTimeout, generate
+from kosong.chat_provider import APITimeoutError, StreamedMessagePart
+from kosong.chat_provider.chaos import ChaosChatProvider, ChaosConfig, DelayDistribution
+from kosong.chat_provider.mock import MockChatProvider, MockStreamedMessage
+from kosong.message import ImageURLPart, Message, TextPart, ToolCall, ToolCallPart
+from kosong.tooling import Tool
 
 
 def test_generate():
@@ -82,3 +87,134 @@ def test_generate_with_callbacks():
     ).message
     assert output_parts == input_parts
     assert output_tool_calls == message.tool_calls
+
+
+def test_generate_passes_parts_without_copying():
+    input_parts: list[StreamedMessagePart] = [
+        TextPart(text="Hello, "),
+        TextPart(text="world"),
+        ToolCall(
+            id="get_weather#123",
+            function=ToolCall.FunctionBody(name="get_weather", arguments="{"),
+        ),
+        ToolCallPart(arguments_part="}"),
+    ]
+    chat_provider = MockChatProvider(message_parts=input_parts)
+
+    output_parts: list[StreamedMessagePart] = []
+    message = asyncio.run(
+        generate(
+            chat_provider,
+            system_prompt="",
+            tools=[],
+            history=[],
+            on_message_part=output_parts.append,
+        )
+    ).message
+
+    assert all(out is part for out, part in zip(output_parts, input_parts, strict=True))
+    # merging must not touch the streamed parts
+    assert output_parts == [
+        TextPart(text="Hello, "),
+        TextPart(text="world"),
+        ToolCall(
+            id="get_weather#123",
+            function=ToolCall.FunctionBody(name="get_weather", arguments="{"),
+        ),
+        ToolCallPart(arguments_part="}"),
+    ]
+    assert message.content == [TextPart(text="Hello, world")]
+    assert message.tool_calls == [
+        ToolCall(
+            id="get_weather#123",
+            function=ToolCall.FunctionBody(name="get_weather", arguments="{}"),
+        )
+    ]
+
+
+def _delayed_provider(
+    *, ttft_ms: float, inter_part_ms: float, mock: type[MockChatProvider] = MockChatProvider
+) -> ChaosChatProvider:
+    return ChaosChatProvider(
+        mock(message_parts=[TextPart(text="Hello, "), TextPart(text="world!")]),
+        chaos_config=ChaosConfig(
+            error_probability=0.0,
+            corrupt_tool_call_probability=0.0,
+            ttft_delay=DelayDistribution(mean_ms=ttft_ms),
+            inter_part_delay=DelayDistribution(mean_ms=inter_part_ms),
+        ),
+    )
+
+
+def test_generate_aborts_stalled_stream():
+    received: list[StreamedMessagePart] = []
+
+    with pytest.raises(APITimeoutError, match="first part"):
+        asyncio.run(
+            generate(
+                _delayed_provider(ttft_ms=1000, inter_part_ms=0),
+                system_prompt="",
+                tools=[],
+                history=[],
+                stream_timeout=StreamTimeout(first_part=0.05),
+            )
+        )
+
+    with pytest.raises(APITimeoutError, match="next part"):
+        asyncio.run(
+            generate(
+                _delayed_provider(ttft_ms=0, inter_part_ms=1000),
+                system_prompt="",
+                tools=[],
+                history=[],
+                on_message_part=received.append,
+                stream_timeout=StreamTimeout(first_part=0.05, idle=0.05),
+            )
+        )
+    assert received == [TextPart(text="Hello, ")]
+
+
+def test_generate_closes_stalled_stream():
+    closed: list[MockStreamedMessage] = []
+
+    class ClosableStreamedMessage(MockStreamedMessage):
+        async def aclose(self) -> None:
+            closed.append(self)
+
+    class ClosableChatProvider(MockChatProvider):
+        async def generate(
+            self, system_prompt: str, tools: Sequence[Tool], history: Sequence[Message]
+        ) -> MockStreamedMessage:
+            return ClosableStreamedMessage(
+                self._message_parts  # pyright: ignore[reportPrivateUsage]
+            )
+
+    provider = _delayed_provider(ttft_ms=0, inter_part_ms=1000, mock=ClosableChatProvider)
+    with pytest.raises(APITimeoutError, match="next part"):
+        asyncio.run(
+            generate(
+                provider,
+                system_prompt="",
+                tools=[],
+                history=[],
+                stream_timeout=StreamTimeout(first_part=0.05, idle=0.05),
+            )
+        )
+    assert len(closed) == 1
+
+
+def test_generate_stream_timeout_ignores_slow_callbacks():
+    async def on_message_part(part: StreamedMessagePart) -> None:
+        await asyncio.sleep(0.1)
+
+    result = asyncio.run(
+        generate(
+            _delayed_provider(ttft_ms=10, inter_part_ms=10),
+            system_prompt="",
+            tools=[],
+            history=[],
+            on_message_part=on_message_part,
+            stream_timeout=StreamTimeout(first_part=0.05, idle=0.05),
+        )
+    )
+    assert result.message.content == [TextPart(text="Hello, world!")]
@@ -1,12 +1,16 @@
+from typing import Any
+
 from inline_snapshot import snapshot
 
 from kosong.message import (
     AudioURLPart,
     ImageURLPart,
+    MergeBuffer,
     Message,
     TextPart,
     ThinkPart,
     ToolCall,
+    ToolCallPart,
     VideoURLPart,
 )
 
@@ -297,3 +301,30 @@ Hello, \n\
 world
 !\
 """)
+
+
+def test_merge_buffer_matches_merge_in_place():
+    sequences: list[list[Any]] = [
+        [TextPart(text="a"), TextPart(text="b"), TextPart(text="")],
+        [ThinkPart(think="a"), ThinkPart(think="b", encrypted="sig"), ThinkPart(think="c")],
+        [
+            ToolCall(id="1", function=ToolCall.FunctionBody(name="f", arguments=None)),
+            ToolCallPart(arguments_part=None),
+            ToolCallPart(arguments_part='{"a":'),
+            ToolCallPart(arguments_part=None),
+            ToolCallPart(arguments_part="1}"),
+        ],
+        [
+            ToolCall(id="1", function=ToolCall.FunctionBody(name="f", arguments=None)),
+            ToolCallPart(arguments_part=None),
+        ],
+        [ToolCallPart(arguments_part=None), ToolCallPart(arguments_part="x")],
+        [TextPart(text="a"), ThinkPart(think="b")],
+    ]
+    for sequence in sequences:
+        eager = sequence[0].model_copy(deep=True)
+        eager_results = [eager.merge_in_place(part) for part in sequence[1:]]
+        buffer = MergeBuffer(sequence[0].model_copy(deep=True))
+        buffered_results = [buffer.merge(part) for part in sequence[1:]]
+        assert buffered_results == eager_results
+        assert buffer.finish() == eager
@@ -0,0 +1,104 @@
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+
+from kosong import step
+from kosong.chat_provider.mock import MockChatProvider
+from kosong.message import TextPart
+from kosong.tooling.simple import SimpleToolset
+from kosong.tracing import Span, set_exporter, span, use_exporter
+
+
+class RecordingExporter:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    async def flush(self) -> None:
+        pass
+
+
+@pytest.fixture
+def exporter() -> Iterator[RecordingExporter]:
+    exporter = RecordingExporter()
+    set_exporter(exporter)
+    yield exporter
+    set_exporter(None)
+
+
+def test_span_is_noop_without_exporter():
+    with span("noop") as current:
+        assert current is None
+
+
+def test_spans_are_nested_across_tasks(exporter: RecordingExporter):
+    async def child() -> None:
+        with span("child", index=1):
+            await asyncio.sleep(0)
+
+    async def run() -> None:
+        with span("parent", skipped=None):
+            await asyncio.create_task(child())
+        with span("sibling"):
+            pass
+
+    asyncio.run(run())
+
+    child_span, parent_span, sibling_span = exporter.spans
+    assert [s.name for s in exporter.spans] == ["child", "parent", "sibling"]
+    assert child_span.parent_span_id == parent_span.span_id
+    assert child_span.trace_id == parent_span.trace_id
+    assert child_span.attributes == {"index": 1}
+    assert parent_span.attributes == {}
+    assert sibling_span.parent_span_id is None
+    assert sibling_span.trace_id != parent_span.trace_id
+    assert parent_span.start_time_unix_nano <= child_span.start_time_unix_nano
+    assert child_span.end_time_unix_nano <= parent_span.end_time_unix_nano
+
+
+def test_span_records_error(exporter: RecordingExporter):
+    with pytest.raises(ValueError), span("failing"):
+        raise ValueError("boom")
+
+    (failing,) = exporter.spans
+    assert failing.status == "error"
+    assert failing.status_message == "ValueError: boom"
+
+
+def test_step_records_spans(exporter: RecordingExporter):
+    chat_provider = MockChatProvider(message_parts=[TextPart(text="Hello")])
+
+    asyncio.run(step(chat_provider, system_prompt="", toolset=SimpleToolset(), history=[]))
+
+    provider_span, generate_span, step_span = exporter.spans
+    assert [s.name for s in exporter.spans] == [
+        "chat_provider.generate",
+        "kosong.generate",
+        "kosong.step",
+    ]
+    assert provider_span.attributes["provider"] == chat_provider.name
+    assert provider_span.parent_span_id == generate_span.span_id
+    assert generate_span.parent_span_id == step_span.span_id
+    assert step_span.attributes == {"n_tool_calls": 0}
+
+
+def test_context_exporter_takes_precedence(exporter: RecordingExporter):
+    session_exporter = RecordingExporter()
+
+    async def child() -> None:
+        with span("child"):
+            await asyncio.sleep(0)
+
+    async def run() -> None:
+        with use_exporter(session_exporter), span("session"):
+            await asyncio.create_task(child())
+        with span("process"):
+            pass
+
+    asyncio.run(run())
+
+    assert [s.name for s in session_exporter.spans] == ["child", "session"]
+    assert [s.name for s in exporter.spans] == ["process"]
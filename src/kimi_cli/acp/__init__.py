@@ -8,6 +8,13 @@ def acp_main() -> None:
     from kimi_cli.app import enable_logging
     from kimi_cli.utils.logging import logger
 
+    async def _run() -> None:
+        server = ACPServer()
+        try:
+            await acp.run_agent(server, use_unstable_protocol=True)
+        finally:
+            await server.close()
+
     enable_logging()
     logger.info("Starting ACP server on stdio")
-    asyncio.run(acp.run_agent(ACPServer(), use_unstable_protocol=True))
+    asyncio.run(_run())
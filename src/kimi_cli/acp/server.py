@@ -34,6 +34,13 @@ class ACPServer:
         logger.info("ACP client connected")
         self.conn = conn
 
+    async def close(self) -> None:
+        """Close all sessions, once the client is gone."""
+        sessions = list(self.sessions.values())
+        self.sessions.clear()
+        for acp_session, _ in sessions:
+            await acp_session.cli.close()
+
     async def initialize(
         self,
         protocol_version: int,
@@ -264,6 +271,7 @@ class ACPServer:
             new_provider,
             new_model,
             session_id=acp_session.id,
+            session_dir=cli_instance.session.dir,
             thinking=model_id_conv.thinking,
             oauth=cli_instance.soul.runtime.oauth,
         )
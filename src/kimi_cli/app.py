@@ -9,6 +9,8 @@ from typing import TYPE_CHECKING, Any
 
 import kaos
 from kaos.path import KaosPath
+from kosong.tracing import SpanExporter
+from kosong.tracing import use_exporter as use_span_exporter
 from pydantic import SecretStr
 
 from kimi_cli.agentspec import DEFAULT_AGENT_FILE
@@ -25,6 +27,7 @@ from kimi_cli.soul.kimisoul import KimiSoul
 from kimi_cli.utils.aioqueue import QueueShutDown
 from kimi_cli.utils.logging import logger, redirect_stderr_to_logger
 from kimi_cli.utils.path import shorten_home
+from kimi_cli.utils.tracing import create_span_exporter
 from kimi_cli.wire import Wire, WireUISide
 from kimi_cli.wire.types import ContentPart, WireMessage
 
@@ -139,6 +142,7 @@ class KimiCLI:
             model,
             thinking=thinking,
             session_id=session.id,
+            session_dir=session.dir,
             oauth=oauth,
         )
         if llm is not None:
@@ -146,27 +150,32 @@ class KimiCLI:
             logger.info("Using LLM model: {model}", model=model)
             logger.info("Thinking mode: {thinking}", thinking=thinking)
 
-        runtime = await Runtime.create(config, oauth, llm, session, yolo, skills_dir)
+        # each session traces to its own exporter, several may run in one process (ACP)
+        span_exporter = create_span_exporter(config.tracing, session.dir, session.id)
+        with use_span_exporter(span_exporter):
+            runtime = await Runtime.create(config, oauth, llm, session, yolo, skills_dir)
 
-        if agent_file is None:
-            agent_file = DEFAULT_AGENT_FILE
-        agent = await load_agent(agent_file, runtime, mcp_configs=mcp_configs or [])
+            if agent_file is None:
+                agent_file = DEFAULT_AGENT_FILE
+            agent = await load_agent(agent_file, runtime, mcp_configs=mcp_configs or [])
 
-        context = Context(session.context_file)
-        await context.restore()
+            context = Context(session.context_file, sync_mode=config.context.sync_mode)
+            await context.restore()
 
         soul = KimiSoul(agent, context=context)
-        return KimiCLI(soul, runtime, env_overrides)
+        return KimiCLI(soul, runtime, env_overrides, span_exporter)
 
     def __init__(
         self,
         _soul: KimiSoul,
         _runtime: Runtime,
         _env_overrides: dict[str, str],
+        _span_exporter: SpanExporter | None = None,
     ) -> None:
         self._soul = _soul
         self._runtime = _runtime
         self._env_overrides = _env_overrides
+        self._span_exporter = _span_exporter
 
     @property
     def soul(self) -> KimiSoul:
@@ -178,16 +187,33 @@ class KimiCLI:
         """Get the Session instance."""
         return self._runtime.session
 
+    async def close(self) -> None:
+        """
+        Shut down the instance: cancel the work the soul left running in the background and
+        close the context. Only needed after `run`, the other `run_*` methods close on exit.
+        """
+        await self._soul.close()
+        if self._span_exporter is not None:
+            await self._span_exporter.flush()
+
     @contextlib.asynccontextmanager
-    async def _env(self) -> AsyncGenerator[None]:
+    async def _env(self, *, shutdown: bool = True) -> AsyncGenerator[None]:
         original_cwd = KaosPath.cwd()
         await kaos.chdir(self._runtime.session.work_dir)
         try:
             # to ignore possible warnings from dateparser
             warnings.filterwarnings("ignore", category=DeprecationWarning)
-            async with self._runtime.oauth.refreshing(self._runtime):
-                yield
+            with use_span_exporter(self._span_exporter):
+                async with self._runtime.oauth.refreshing(self._runtime):
+                    yield
         finally:
+            if shutdown:
+                await self._soul.close()
+            else:
+                # the soul may keep compacting in the background until the next run
+                await self._soul.context.close()
+            if self._span_exporter is not None:
+                await self._span_exporter.flush()
             await kaos.chdir(original_cwd)
 
     async def run(
@@ -198,6 +224,7 @@ class KimiCLI:
     ) -> AsyncGenerator[WireMessage]:
         """
         Run the Kimi Code CLI instance without any UI and yield Wire messages directly.
+        Call `close` once the instance is no longer used.
 
         Args:
             user_input (str | list[ContentPart]): The user input to the agent.
@@ -214,7 +241,7 @@ class KimiCLI:
             MaxStepsReached: When the maximum number of steps is reached.
             RunCancelled: When the run is cancelled by the cancel event.
         """
-        async with self._env():
+        async with self._env(shutdown=False):
             wire_future = asyncio.Future[WireUISide]()
             stop_ui_loop = asyncio.Event()
 
@@ -38,6 +38,14 @@ class LLMProvider(BaseModel):
     """Custom headers to include in API requests"""
     oauth: OAuthRef | None = None
     """OAuth credential reference (do not store tokens here)."""
+    first_token_timeout: float | None = Field(default=None, gt=0)
+    """Seconds to wait for the first streamed token of a response before retrying the request.
+    Unlimited by default, since some models think for minutes without streaming anything."""
+    stream_idle_timeout: float | None = Field(default=60, gt=0)
+    """Seconds to wait between two streamed chunks of a response before retrying the request."""
+    upload_images: bool | None = None
+    """Whether to upload images through the files API of a `kimi` provider instead of sending them
+    inline in every request. By default only the official Kimi endpoints upload images."""
 
     @field_serializer("api_key", when_used="json")
     def dump_secret(self, v: SecretStr):
@@ -69,6 +77,48 @@ class LoopControl(BaseModel):
     reserved_context_size: int = Field(default=50_000, ge=1000)
     """Reserved token count for LLM response generation. Auto-compaction triggers when
     context_tokens + reserved_context_size >= max_context_size. Default is 50000."""
+    background_compaction_ratio: float = Field(default=0.8, gt=0, le=1)
+    """Fraction of the auto-compaction threshold at which the context starts being compacted in
+    the background, so the compacted context is ready before the threshold is reached. Set to 1
+    to disable background compaction."""
+    compaction_strategy: Literal["elision", "simple", "rolling", "last-turns"] = "elision"
+    """How the context is compacted. `elision` elides stale tool output and thinking without
+    calling the LLM and falls back to `simple` if that is not enough or on `/compact`, `simple`
+    summarizes all but the last messages with the LLM, `rolling` only summarizes the messages
+    since the previous compaction and keeps a chain of summaries, and `last-turns` drops all but
+    the last few turns."""
+
+
+class ContextConfig(BaseModel):
+    """Context persistence configuration."""
+
+    sync_mode: Literal["none", "per-step", "always"] = "none"
+    """When to fsync context writes to disk. `none` leaves it to the OS, `per-step` syncs once
+    per agent step, and `always` syncs after every write."""
+
+
+class ToolConcurrencyConfig(BaseModel):
+    """Maximum number of tool calls of each kind running at the same time in one agent."""
+
+    write: int = Field(default=8, ge=1)
+    """Tools writing files, like `WriteFile`. Writes to the same file always run one at a time."""
+    process: int = Field(default=4, ge=1)
+    """Tools running local processes, like `Shell`."""
+    network: int = Field(default=8, ge=1)
+    """Tools calling remote services, like `FetchURL`, `SearchWeb` and MCP tools."""
+
+
+class TracingConfig(BaseModel):
+    """Span tracing configuration."""
+
+    enabled: bool = False
+    """Record spans of turns, steps, LLM calls, tool calls and context writes to `traces.jsonl`
+    in the session directory."""
+    otlp_endpoint: str | None = None
+    """Base URL of an OpenTelemetry collector to also send the spans to with OTLP/HTTP JSON,
+    like `http://localhost:4318`. Only used when tracing is enabled."""
+    otlp_headers: dict[str, str] | None = None
+    """Extra HTTP headers for the OTLP requests, like authentication."""
 
 
 class MoonshotSearchConfig(BaseModel):
@@ -144,6 +194,15 @@ class Config(BaseModel):
         default_factory=dict, description="List of LLM providers"
     )
     loop_control: LoopControl = Field(default_factory=LoopControl, description="Agent loop control")
+    context: ContextConfig = Field(
+        default_factory=ContextConfig, description="Context persistence configuration"
+    )
+    tool_concurrency: ToolConcurrencyConfig = Field(
+        default_factory=ToolConcurrencyConfig, description="Tool call concurrency limits"
+    )
+    tracing: TracingConfig = Field(
+        default_factory=TracingConfig, description="Span tracing configuration"
+    )
     services: Services = Field(default_factory=Services, description="Services configuration")
     mcp: MCPConfig = Field(default_factory=MCPConfig, description="MCP configuration")
 
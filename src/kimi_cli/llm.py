@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING, Literal, cast, get_args
+from urllib.parse import urlparse
 
+from kosong import StreamTimeout
 from kosong.chat_provider import ChatProvider
 from pydantic import SecretStr
 
 from kimi_cli.constant import USER_AGENT
+from kimi_cli.utils.logging import logger
 
 if TYPE_CHECKING:
     from kimi_cli.auth.oauth import OAuthManager
@@ -39,6 +43,7 @@ class LLM:
     capabilities: set[ModelCapability]
     model_config: LLMModel | None = None
     provider_config: LLMProvider | None = None
+    stream_timeout: StreamTimeout | None = None
 
     @property
     def model_name(self) -> str:
@@ -94,6 +99,66 @@ def augment_provider_with_env_vars(provider: LLMProvider, model: LLMModel) -> di
     return applied
 
 
+KIMI_UPLOADS_FILE_NAME = "kimi_uploads.jsonl"
+
+_KIMI_FILES_API_HOSTS = {"api.kimi.com", "api.moonshot.ai", "api.moonshot.cn"}
+"""Hosts of the official Kimi endpoints, which have a files API to upload images to."""
+
+
+class _KimiUploadCache:
+    """
+    The `ms://` URLs of the files uploaded in a session, kept in a JSON Lines file in the session
+    directory so that a resumed session does not upload the same images again.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._urls: dict[str, str] | None = None
+
+    async def get(self, digest: str) -> str | None:
+        return (await self._load()).get(digest)
+
+    async def put(self, digest: str, url: str) -> None:
+        (await self._load())[digest] = url
+        line = json.dumps({"digest": digest, "url": url}) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+    async def _load(self) -> dict[str, str]:
+        if self._urls is None:
+            self._urls = await asyncio.to_thread(self._read)
+        return self._urls
+
+    def _read(self) -> dict[str, str]:
+        urls: dict[str, str] = {}
+        try:
+            with self._path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        urls[record["digest"]] = record["url"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception("Failed to read uploaded files cache: {file}", file=self._path)
+        return urls
+
+    def _append(self, line: str) -> None:
+        try:
+            with self._path.open("a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            logger.exception("Failed to write uploaded files cache: {file}", file=self._path)
+
+
+def _kimi_upload_images(provider: LLMProvider) -> bool:
+    if provider.upload_images is not None:
+        return provider.upload_images
+    # endpoints of other vendors speaking the Kimi API may have no files API
+    return urlparse(provider.base_url).hostname in _KIMI_FILES_API_HOSTS
+
+
 def _kimi_default_headers(provider: LLMProvider, oauth: OAuthManager | None) -> dict[str, str]:
     headers = {"User-Agent": USER_AGENT}
     if oauth:
@@ -109,6 +174,7 @@ def create_llm(
     *,
     thinking: bool | None = None,
     session_id: str | None = None,
+    session_dir: Path | None = None,
     oauth: OAuthManager | None = None,
 ) -> LLM | None:
     if provider.type not in {"_echo", "_scripted_echo"} and (
@@ -131,6 +197,13 @@ def create_llm(
                 base_url=provider.base_url,
                 api_key=resolved_api_key,
                 default_headers=_kimi_default_headers(provider, oauth),
+                # send pasted or read images once instead of inline in every request
+                upload_images=_kimi_upload_images(provider),
+                file_cache=(
+                    _KimiUploadCache(session_dir / KIMI_UPLOADS_FILE_NAME)
+                    if session_dir is not None
+                    else None
+                ),
             )
 
             gen_kwargs: Kimi.GenerationKwargs = {}
@@ -233,6 +306,9 @@ def create_llm(
         capabilities=capabilities,
         model_config=model,
         provider_config=provider,
+        stream_timeout=StreamTimeout(
+            first_part=provider.first_token_timeout, idle=provider.stream_idle_timeout
+        ),
     )
 
 
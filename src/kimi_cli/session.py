@@ -9,12 +9,10 @@ from pathlib import Path
 from textwrap import shorten
 
 from kaos.path import KaosPath
-from kosong.message import Message
 
 from kimi_cli.metadata import WorkDirMeta, load_metadata, save_metadata
 from kimi_cli.utils.logging import logger
 from kimi_cli.wire.file import WireFile
-from kimi_cli.wire.types import TurnBegin
 
 
 @dataclass(slots=True, kw_only=True)
@@ -67,15 +65,8 @@ class Session:
         self.updated_at = self.context_file.stat().st_mtime if self.context_file.exists() else 0.0
 
         try:
-            async for record in self.wire_file.iter_records():
-                wire_msg = record.to_wire_message()
-                if isinstance(wire_msg, TurnBegin):
-                    title = shorten(
-                        Message(role="user", content=wire_msg.user_input).extract_text(" "),
-                        width=50,
-                    )
-                    self.title = f"{title} ({self.id})"
-                    return
+            if (title := await self.wire_file.first_turn_title()) is not None:
+                self.title = f"{shorten(title, width=50)} ({self.id})"
         except Exception:
             logger.exception(
                 "Failed to derive session title from wire file {file}:",
@@ -220,7 +220,7 @@ async def load_agent(
         )
         runtime.labor_market.add_fixed_subagent(subagent_name, subagent, subagent_spec.description)
 
-    toolset = KimiToolset()
+    toolset = KimiToolset(runtime.config.tool_concurrency)
     tool_deps = {
         KimiToolset: toolset,
         Runtime: runtime,
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import weakref
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+from kosong.message import ContentPart, Message
+
+from kimi_cli.soul.message import system
+from kimi_cli.utils.logging import logger
+from kimi_cli.wire.types import AudioURLPart, ImageURLPart, VideoURLPart
+
+BLOB_URL_SCHEME = "blob://"
+PINS_FILE_NAME = "pins"
+"""File in the blob store listing the blobs referenced by rotated context files."""
+
+type MediaPart = ImageURLPart | AudioURLPart | VideoURLPart
+
+
+def blob_url(digest: str, mime_type: str) -> str:
+    """Build a blob reference URL like `blob://<sha256>/image/png`."""
+    return f"{BLOB_URL_SCHEME}{digest}/{mime_type}"
+
+
+def parse_blob_url(url: str) -> tuple[str, str] | None:
+    """Split a blob reference URL into its digest and MIME type."""
+    if not url.startswith(BLOB_URL_SCHEME):
+        return None
+    digest, sep, mime_type = url[len(BLOB_URL_SCHEME) :].partition("/")
+    if not sep or len(digest) != 64:
+        return None
+    return digest, mime_type
+
+
+def _parse_data_url(url: str) -> tuple[str, bytes] | None:
+    """Decode a base64 `data:` URL into its MIME type and payload."""
+    if not url.startswith("data:"):
+        return None
+    header, sep, payload = url[len("data:") :].partition(",")
+    if not sep or not header.endswith(";base64"):
+        return None
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return header.removesuffix(";base64"), data
+
+
+def _media_url(part: ContentPart) -> str | None:
+    match part:
+        case ImageURLPart():
+            return part.image_url.url
+        case AudioURLPart():
+            return part.audio_url.url
+        case VideoURLPart():
+            return part.video_url.url
+        case _:
+            return None
+
+
+def _with_media_url(part: MediaPart, url: str) -> MediaPart:
+    match part:
+        case ImageURLPart():
+            return part.model_copy(
+                update={"image_url": part.image_url.model_copy(update={"url": url})}
+            )
+        case AudioURLPart():
+            return part.model_copy(
+                update={"audio_url": part.audio_url.model_copy(update={"url": url})}
+            )
+        case VideoURLPart():
+            return part.model_copy(
+                update={"video_url": part.video_url.model_copy(update={"url": url})}
+            )
+
+
+def _blob_digests(messages: Iterable[Message]) -> Iterable[str]:
+    for message in messages:
+        for part in message.content:
+            if (url := _media_url(part)) and (parsed := parse_blob_url(url)):
+                yield parsed[0]
+
+
+class BlobStore:
+    """
+    Content-addressed storage for the media embedded in a context.
+
+    Inline `data:` URLs are moved into files named by their SHA-256 digest and replaced by
+    `blob://` references, so the context file and the in-memory history only carry the
+    reference. The references are resolved back to `data:` URLs right before the history is
+    sent to the LLM. Blobs are reference-counted against the live history and removed by
+    `collect()` once nothing refers to them anymore. Blobs referenced by a rotated context file
+    are pinned with `pin()` and kept as long as that file exists, so that it can be restored.
+
+    Resolved messages are remembered per source message, so that a history resolved on every
+    step keeps handing the same message objects to the chat provider, whose conversion cache
+    is keyed by message identity.
+    """
+
+    def __init__(self, root: Path):
+        self._root = root
+        self._refcounts: Counter[str] = Counter()
+        self._dirty = True
+        """Whether some blobs may have become unreferenced since the last collection."""
+        self._resolved: dict[int, tuple[weakref.ref[Message], Message]] = {}
+        """Maps the ids of messages with blob references to their resolved form."""
+        self._pins: dict[str, set[str]] | None = None
+        """Maps pinned blobs to the names of the rotated context files referencing them."""
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def path_of(self, digest: str) -> Path:
+        return self._root / digest
+
+    async def intern(self, message: Message) -> Message:
+        """
+        Replace the inline media of a message by blob references and retain them.
+
+        Returns the message itself if it does not embed any inline media.
+        """
+        new_content: list[ContentPart] | None = None
+        for i, part in enumerate(message.content):
+            url = _media_url(part)
+            if url is None or not url.startswith("data:"):
+                continue
+            assert isinstance(part, ImageURLPart | AudioURLPart | VideoURLPart)
+            ref = await asyncio.to_thread(self._put, url)
+            if ref is None:
+                continue
+            if new_content is None:
+                new_content = list(message.content)
+            new_content[i] = _with_media_url(part, ref)
+        if new_content is not None:
+            message = message.model_copy(update={"content": new_content})
+        self.retain([message])
+        return message
+
+    async def resolve(self, messages: Sequence[Message]) -> list[Message]:
+        """
+        Return the messages with all blob references turned back into `data:` URLs.
+
+        Messages without blob references are returned as-is, and the resolved form of a message
+        is reused as long as the message is alive and not released.
+        """
+        resolved: list[Message] = []
+        for message in messages:
+            entry = self._resolved.get(id(message))
+            if entry is not None and entry[0]() is message:
+                resolved.append(entry[1])
+                continue
+            resolved.append(await self._resolve_message(message))
+        return resolved
+
+    async def _resolve_message(self, message: Message) -> Message:
+        new_content: list[ContentPart] | None = None
+        missing = False
+        for i, part in enumerate(message.content):
+            url = _media_url(part)
+            if url is None or (parsed := parse_blob_url(url)) is None:
+                continue
+            assert isinstance(part, ImageURLPart | AudioURLPart | VideoURLPart)
+            if new_content is None:
+                new_content = list(message.content)
+            try:
+                data_url = await asyncio.to_thread(self._read_data_url, *parsed)
+            except OSError:
+                logger.warning("Blob {digest} is missing, dropping it", digest=parsed[0])
+                new_content[i] = system(f"The {part.type.removesuffix('_url')} is missing.")
+                missing = True
+                continue
+            new_content[i] = _with_media_url(part, data_url)
+        if new_content is None:
+            return message
+        resolved = message.model_copy(update={"content": new_content})
+        if not missing:
+            self._remember(message, resolved)
+        return resolved
+
+    def _remember(self, message: Message, resolved: Message) -> None:
+        key = id(message)
+        entries = self._resolved
+
+        def _drop(ref: weakref.ref[Message]) -> None:
+            entry = entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del entries[key]
+
+        entries[key] = (weakref.ref(message, _drop), resolved)
+
+    def _forget(self, messages: Iterable[Message]) -> None:
+        for message in messages:
+            entry = self._resolved.get(id(message))
+            if entry is not None and entry[0]() is message:
+                del self._resolved[id(message)]
+
+    def retain(self, messages: Iterable[Message]) -> None:
+        """Count the blob references held by the given messages."""
+        self._refcounts.update(_blob_digests(messages))
+
+    def release(self, messages: Iterable[Message]) -> None:
+        """Drop the blob references held by the given messages."""
+        messages = list(messages)
+        self._refcounts.subtract(_blob_digests(messages))
+        self._forget(messages)
+        self._dirty = True
+
+    def reset(self) -> None:
+        """Drop all blob references."""
+        self._refcounts.clear()
+        self._resolved.clear()
+        self._dirty = True
+
+    async def pin(self, messages: Iterable[Message], context_file: Path) -> None:
+        """
+        Keep the blobs referenced by the given messages as long as `context_file` exists,
+        instead of the blobs pinned by a previous file of the same name.
+        `context_file` must be in the same directory as the blob store.
+        """
+        await asyncio.to_thread(self._pin, set(_blob_digests(messages)), context_file.name)
+
+    async def collect(self) -> None:
+        """Delete the blobs that are no longer referenced."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        await asyncio.to_thread(self._collect)
+
+    def _put(self, data_url: str) -> str | None:
+        parsed = _parse_data_url(data_url)
+        if parsed is None:
+            return None
+        mime_type, data = parsed
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_of(digest)
+        if not path.exists():
+            self._root.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{digest}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        return blob_url(digest, mime_type)
+
+    def _read_data_url(self, digest: str, mime_type: str) -> str:
+        encoded = base64.b64encode(self.path_of(digest).read_bytes()).decode("ascii")
+        return f"data:{mime_type};base64,{encoded}"
+
+    def _load_pins(self) -> dict[str, set[str]]:
+        if self._pins is None:
+            self._pins = {}
+            try:
+                lines = (self._root / PINS_FILE_NAME).read_text(encoding="utf-8").splitlines()
+            except FileNotFoundError:
+                lines = []
+            for line in lines:
+                digest, _, file_name = line.partition(" ")
+                if file_name:
+                    self._pins.setdefault(digest, set()).add(file_name)
+        return self._pins
+
+    def _pin(self, digests: set[str], file_name: str) -> None:
+        pins = self._load_pins()
+        stale = False
+        for digest, file_names in pins.items():
+            if digest not in digests and file_name in file_names:
+                file_names.discard(file_name)
+                stale = True
+        new_digests = sorted(digest for digest in digests if file_name not in pins.get(digest, ()))
+        for digest in new_digests:
+            pins.setdefault(digest, set()).add(file_name)
+        if stale:
+            self._write_pins()
+        elif new_digests:
+            self._root.mkdir(parents=True, exist_ok=True)
+            with (self._root / PINS_FILE_NAME).open("a", encoding="utf-8") as f:
+                f.write("".join(f"{digest} {file_name}\n" for digest in new_digests))
+
+    def _write_pins(self) -> None:
+        pins = self._load_pins()
+        data = "".join(
+            f"{digest} {file_name}\n"
+            for digest, file_names in sorted(pins.items())
+            for file_name in sorted(file_names)
+        )
+        self._root.mkdir(parents=True, exist_ok=True)
+        path = self._root / PINS_FILE_NAME
+        tmp_path = path.with_name(f"{PINS_FILE_NAME}.{os.getpid()}.tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        tmp_path.replace(path)
+
+    def _is_pinned(self, digest: str) -> bool:
+        file_names = self._load_pins().get(digest, ())
+        return any((self._root.parent / file_name).exists() for file_name in file_names)
+
+    def _collect(self) -> None:
+        if not self._root.is_dir():
+            return
+        for path in self._root.iterdir():
+            if path.name in self._refcounts and self._refcounts[path.name] > 0:
+                continue
+            if path.name == PINS_FILE_NAME or self._is_pinned(path.name):
+                continue
+            logger.debug("Removing unreferenced blob: {path}", path=path)
+            path.unlink(missing_ok=True)
+        self._refcounts = +self._refcounts
@@ -1,15 +1,17 @@
 from __future__ import annotations
 
+import json
 from collections.abc import Sequence
-from typing import TYPE_CHECKING, NamedTuple, Protocol, runtime_checkable
+from typing import TYPE_CHECKING, Literal, NamedTuple, Protocol, runtime_checkable
 
 import kosong
-from kosong.message import Message
+from kosong.message import Message, ToolCall
 from kosong.tooling.empty import EmptyToolset
 
 import kimi_cli.prompts as prompts
 from kimi_cli.llm import LLM
 from kimi_cli.soul.message import system
+from kimi_cli.soul.tokens import TokenCalibration, estimate_message_tokens
 from kimi_cli.utils.logging import logger
 from kimi_cli.wire.types import ContentPart, TextPart, ThinkPart
 
@@ -33,10 +35,50 @@ class Compaction(Protocol):
         ...
 
 
+type CompactionStrategy = Literal["elision", "simple", "rolling", "last-turns"]
+
+
+def create_compaction(
+    strategy: CompactionStrategy,
+    *,
+    manual: bool = False,
+    token_calibration: TokenCalibration | None = None,
+) -> Compaction:
+    """
+    Create the compaction of the given strategy.
+
+    A `manual` compaction is one explicitly asked for by the user, which always summarizes the
+    history even if eliding stale content alone would have been enough. The `token_calibration`
+    of the context corrects the token estimates of compactions that check the size of their
+    result.
+    """
+    match strategy:
+        case "elision":
+            return ElisionCompaction(
+                fallback=SimpleCompaction(),
+                target_ratio=0 if manual else 0.4,
+                token_calibration=token_calibration,
+            )
+        case "simple":
+            return SimpleCompaction()
+        case "rolling":
+            return RollingCompaction()
+        case "last-turns":
+            return KeepLastTurnsCompaction()
+
+
 if TYPE_CHECKING:
 
-    def type_check(simple: SimpleCompaction):
+    def type_check(
+        simple: SimpleCompaction,
+        elision: ElisionCompaction,
+        rolling: RollingCompaction,
+        last_turns: KeepLastTurnsCompaction,
+    ):
         _: Compaction = simple
+        _: Compaction = elision
+        _: Compaction = rolling
+        _: Compaction = last_turns
 
 
 class SimpleCompaction:
@@ -48,6 +90,16 @@ class SimpleCompaction:
         if compact_message is None:
             return to_preserve
 
+        content: list[ContentPart] = [
+            system("Previous context has been compacted. Here is the compaction output:")
+        ]
+        content.extend(await self._summarize(compact_message, llm))
+        compacted_messages: list[Message] = [Message(role="user", content=content)]
+        compacted_messages.extend(to_preserve)
+        return compacted_messages
+
+    @staticmethod
+    async def _summarize(compact_message: Message, llm: LLM) -> list[ContentPart]:
         # Call kosong.step to get the compacted context
         # TODO: set max completion tokens
         logger.debug("Compacting context...")
@@ -56,6 +108,7 @@ class SimpleCompaction:
             system_prompt="You are a helpful assistant that compacts conversation context.",
             toolset=EmptyToolset(),
             history=[compact_message],
+            stream_timeout=llm.stream_timeout,
         )
         if result.usage:
             logger.debug(
@@ -63,17 +116,8 @@ class SimpleCompaction:
                 input=result.usage.input,
                 output=result.usage.output,
             )
-
-        content: list[ContentPart] = [
-            system("Previous context has been compacted. Here is the compaction output:")
-        ]
-        compacted_msg = result.message
-
         # drop thinking parts if any
-        content.extend(part for part in compacted_msg.content if not isinstance(part, ThinkPart))
-        compacted_messages: list[Message] = [Message(role="user", content=content)]
-        compacted_messages.extend(to_preserve)
-        return compacted_messages
+        return [part for part in result.message.content if not isinstance(part, ThinkPart)]
 
     class PrepareResult(NamedTuple):
         compact_message: Message | None
@@ -103,14 +147,242 @@ class SimpleCompaction:
             # Let's hope this won't exceed the context size limit
             return self.PrepareResult(compact_message=None, to_preserve=to_preserve)
 
-        # Create input message for compaction
-        compact_message = Message(role="user", content=[])
-        for i, msg in enumerate(to_compact):
-            compact_message.content.append(
-                TextPart(text=f"## Message {i + 1}\nRole: {msg.role}\nContent:\n")
-            )
-            compact_message.content.extend(
-                part for part in msg.content if not isinstance(part, ThinkPart)
+        return self.PrepareResult(
+            compact_message=_build_compact_message(to_compact), to_preserve=to_preserve
+        )
+
+
+def _build_compact_message(to_compact: Sequence[Message]) -> Message:
+    """Create the input message asking the LLM to compact the given messages."""
+    compact_message = Message(role="user", content=[])
+    for i, msg in enumerate(to_compact):
+        compact_message.content.append(
+            TextPart(text=f"## Message {i + 1}\nRole: {msg.role}\nContent:\n")
+        )
+        compact_message.content.extend(
+            part for part in msg.content if not isinstance(part, ThinkPart)
+        )
+    compact_message.content.append(TextPart(text="\n" + prompts.COMPACT))
+    return compact_message
+
+
+_SEGMENT_SUMMARY_HEADER = system("Summary of an earlier part of the conversation:")
+
+
+def _is_segment_summary(message: Message) -> bool:
+    return (
+        message.role == "user"
+        and bool(message.content)
+        and message.content[0] == _SEGMENT_SUMMARY_HEADER
+    )
+
+
+class RollingCompaction(SimpleCompaction):
+    """
+    Compaction that keeps a chain of summaries, one per compacted segment of the conversation.
+
+    Each compaction only summarizes the messages after the existing summaries, so its cost is
+    bounded by the segment rather than the whole session. The summaries stay at the start of the
+    history as separate messages, and once their total exceeds `summary_budget` tokens, all but
+    the latest one are merged into a single summary.
+    """
+
+    def __init__(self, max_preserved_messages: int = 2, summary_budget: int = 8_000) -> None:
+        super().__init__(max_preserved_messages)
+        self.summary_budget = summary_budget
+
+    async def compact(self, messages: Sequence[Message], llm: LLM) -> Sequence[Message]:
+        n_summaries = 0
+        while n_summaries < len(messages) and _is_segment_summary(messages[n_summaries]):
+            n_summaries += 1
+        summaries = list(messages[:n_summaries])
+
+        compact_message, to_preserve = self.prepare(messages[n_summaries:])
+        if compact_message is None:
+            return messages
+        summaries.append(await self._summarize_segment(compact_message, llm))
+
+        n_summary_tokens = sum(estimate_message_tokens(summary) for summary in summaries)
+        if len(summaries) > 2 and n_summary_tokens > self.summary_budget:
+            logger.debug(
+                "Merging {n} summaries of about {n_tokens} tokens",
+                n=len(summaries) - 1,
+                n_tokens=n_summary_tokens,
             )
-        compact_message.content.append(TextPart(text="\n" + prompts.COMPACT))
-        return self.PrepareResult(compact_message=compact_message, to_preserve=to_preserve)
+            merged = await self._summarize_segment(_build_compact_message(summaries[:-1]), llm)
+            summaries = [merged, summaries[-1]]
+        return [*summaries, *to_preserve]
+
+    async def _summarize_segment(self, compact_message: Message, llm: LLM) -> Message:
+        content = [_SEGMENT_SUMMARY_HEADER, *await self._summarize(compact_message, llm)]
+        return Message(role="user", content=content)
+
+
+class KeepLastTurnsCompaction:
+    """Compaction that drops all but the last `max_turns` turns, without calling the LLM."""
+
+    def __init__(self, max_turns: int = 3) -> None:
+        self.max_turns = max_turns
+
+    async def compact(self, messages: Sequence[Message], llm: LLM) -> Sequence[Message]:
+        # a turn starts with a user message, which never splits a tool call from its result
+        n_turns = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if not _is_turn_start(messages[index]):
+                continue
+            n_turns += 1
+            if n_turns == self.max_turns:
+                if index == 0:
+                    break
+                note = Message(
+                    role="user",
+                    content=[
+                        system(
+                            f"Previous context has been compacted. {index} earlier messages "
+                            "were dropped."
+                        )
+                    ],
+                )
+                return [note, *messages[index:]]
+        return messages
+
+
+def _is_turn_start(message: Message) -> bool:
+    """Whether the message is a user input, as opposed to checkpoints and other system notes."""
+    if message.role != "user":
+        return False
+    return not all(
+        isinstance(part, TextPart) and part.text.startswith("<system>") for part in message.content
+    )
+
+
+_READ_FILE_TOOL_NAME = "ReadFile"
+
+
+class ElisionCompaction:
+    """
+    Rule-based compaction that elides stale content from older messages without calling the LLM.
+
+    Large outputs of old tool calls are replaced by stubs with the tool name, arguments, size and
+    first and last lines of the output, file reads repeated later in the history are dropped, and
+    thinking parts are stripped. If the result is still above `target_ratio` of the context
+    window, as estimated with the `token_calibration` of the context, it is passed on to the
+    `fallback` compaction.
+    """
+
+    def __init__(
+        self,
+        fallback: Compaction | None = None,
+        *,
+        max_preserved_messages: int = 4,
+        target_ratio: float = 0.4,
+        max_output_chars: int = 2_000,
+        n_stub_lines: int = 3,
+        token_calibration: TokenCalibration | None = None,
+    ) -> None:
+        self.fallback = fallback
+        self.max_preserved_messages = max_preserved_messages
+        self.target_ratio = target_ratio
+        self.max_output_chars = max_output_chars
+        self.n_stub_lines = n_stub_lines
+        self.token_calibration = token_calibration
+
+    async def compact(self, messages: Sequence[Message], llm: LLM) -> Sequence[Message]:
+        elided = self.elide(messages)
+        n_tokens = sum(estimate_message_tokens(message) for message in elided)
+        if self.token_calibration is not None:
+            # the same estimate as the one that triggers the compaction
+            n_tokens = self.token_calibration.apply(n_tokens, model=llm.chat_provider.model_name)
+        if self.fallback is None or n_tokens <= llm.max_context_size * self.target_ratio:
+            logger.debug("Elided context down to about {n_tokens} tokens", n_tokens=n_tokens)
+            return elided
+        logger.debug(
+            "Elided context is still about {n_tokens} tokens, falling back to {fallback}",
+            n_tokens=n_tokens,
+            fallback=type(self.fallback).__name__,
+        )
+        return await self.fallback.compact(elided, llm)
+
+    def elide(self, messages: Sequence[Message]) -> list[Message]:
+        """
+        Elide stale content from all but the last `max_preserved_messages` user inputs and
+        assistant messages. Checkpoints and other system notes do not count towards them. Messages
+        left untouched are returned as-is.
+        """
+        preserve_start_index = 0
+        n_preserved = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index].role == "assistant" or _is_turn_start(messages[index]):
+                n_preserved += 1
+                if n_preserved == self.max_preserved_messages:
+                    preserve_start_index = index
+                    break
+
+        tool_calls: dict[str, ToolCall] = {}
+        superseded: set[str] = set()
+        seen_reads: set[str] = set()
+        for message in reversed(messages):
+            for tool_call in reversed(message.tool_calls or ()):
+                tool_calls[tool_call.id] = tool_call
+                if tool_call.function.name != _READ_FILE_TOOL_NAME:
+                    continue
+                read_key = _normalize_arguments(tool_call.function.arguments)
+                if read_key in seen_reads:
+                    superseded.add(tool_call.id)
+                seen_reads.add(read_key)
+
+        elided: list[Message] = []
+        for message in messages[:preserve_start_index]:
+            if message.role == "assistant":
+                if any(isinstance(part, ThinkPart) for part in message.content):
+                    content = [part for part in message.content if not isinstance(part, ThinkPart)]
+                    message = message.model_copy(update={"content": content})
+            elif message.role == "tool" and message.tool_call_id is not None:
+                tool_call = tool_calls.get(message.tool_call_id)
+                if tool_call is not None:
+                    message = self._elide_tool_output(
+                        message, tool_call, superseded=tool_call.id in superseded
+                    )
+            elided.append(message)
+        elided.extend(messages[preserve_start_index:])
+        return elided
+
+    def _elide_tool_output(
+        self, message: Message, tool_call: ToolCall, *, superseded: bool
+    ) -> Message:
+        text_parts = [part for part in message.content if isinstance(part, TextPart)]
+        output = "\n".join(part.text for part in text_parts)
+        call = f"{tool_call.function.name}({_truncate(tool_call.function.arguments or '', 200)})"
+        if superseded:
+            stub = [
+                system(f"The output of `{call}` was dropped since the file was read again later.")
+            ]
+        elif len(output) > self.max_output_chars:
+            lines = output.splitlines()
+            stub = [
+                system(
+                    f"The output of `{call}` was elided to save context: {len(lines):,} lines, "
+                    f"{len(output):,} characters. Call the tool again if you need it."
+                )
+            ]
+            n = self.n_stub_lines
+            if len(lines) > 2 * n:
+                excerpt = [*lines[:n], "...", *lines[-n:]]
+            else:
+                excerpt = [_truncate(output, self.max_output_chars // 2)]
+            stub.append(TextPart(text="\n".join(_truncate(line, 200) for line in excerpt)))
+        else:
+            return message
+        other_parts = [part for part in message.content if not isinstance(part, TextPart)]
+        return message.model_copy(update={"content": [*stub, *other_parts]})
+
+
+def _normalize_arguments(arguments: str | None) -> str:
+    try:
+        return json.dumps(json.loads(arguments or "{}"), sort_keys=True)
+    except json.JSONDecodeError:
+        return arguments or ""
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
@@ -1,25 +1,187 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from collections.abc import Sequence
+import os
+from collections.abc import AsyncGenerator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO, Literal
 
 import aiofiles
 import aiofiles.os
 from kosong.message import Message
+from kosong.tracing import span
 
+from kimi_cli.soul.blobs import BlobStore
 from kimi_cli.soul.message import system
+from kimi_cli.soul.tokens import TokenCalibration, estimate_message_tokens
 from kimi_cli.utils.logging import logger
 from kimi_cli.utils.path import next_available_rotation
 
+type SyncMode = Literal["none", "per-step", "always"]
+"""
+When context writes are fsync-ed to disk:
+
+- `none`: never, leave it to the OS.
+- `per-step`: once when a write batch (usually one agent step) is committed.
+- `always`: after every write, which also disables batching.
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class CheckpointIndexEntry:
+    """Where a checkpoint starts in the context file, and the context state right before it."""
+
+    id: int
+    """The checkpoint ID."""
+    offset: int
+    """Byte offset of the checkpoint record in the context file."""
+    n_messages: int
+    """Number of messages in the history before the checkpoint."""
+    token_count: int
+    """Token count of the context before the checkpoint."""
+    n_counted_messages: int
+    """Number of messages covered by `token_count`."""
+
+
+class _ContextWriter:
+    """
+    A long-lived append handle for the context file.
+    Staged records are written with a single write call when flushed.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._file: BinaryIO | None = None
+        self._pending: list[bytes] = []
+        self._size: int | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def size(self) -> int:
+        """Size of the context file in bytes, including staged records."""
+        if self._size is None:
+            self._size = self._path.stat().st_size if self._path.exists() else 0
+        return self._size
+
+    def stage(self, line: str) -> int:
+        """Stage a record and return its byte offset in the context file."""
+        offset = self.size
+        data = line.encode("utf-8")
+        self._pending.append(data)
+        self._size = offset + len(data)
+        return offset
+
+    async def flush(self, *, sync: bool) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            n_pending = len(self._pending)
+            data = b"".join(self._pending)
+            with span("context.write", bytes=len(data), sync=sync):
+                await asyncio.to_thread(self._write, data, sync)
+            # records staged while writing are kept for the next flush
+            del self._pending[:n_pending]
+
+    async def close(self, *, sync: bool) -> None:
+        await self.flush(sync=sync)
+        async with self._lock:
+            file, self._file = self._file, None
+            # the file may be replaced once closed
+            self._size = None
+            if file is not None:
+                await asyncio.to_thread(file.close)
+
+    def _write(self, data: bytes, sync: bool) -> None:
+        if self._file is None:
+            self._file = open(self._path, "ab")  # noqa: SIM115
+        _write_file(self._file, data, sync)
+
+
+@dataclass(slots=True)
+class _LoadedContext:
+    history: list[Message]
+    checkpoints: list[CheckpointIndexEntry]
+    token_count: int
+    n_counted_messages: int
+
+
+def _load_context_file(path: Path) -> _LoadedContext:
+    """Parse a context file into its history, checkpoint index and token count."""
+    history: list[Message] = []
+    checkpoints: list[CheckpointIndexEntry] = []
+    token_count = 0
+    n_counted_messages = 0
+    offset = 0
+    with path.open("rb") as f:
+        for line in f:
+            line_offset, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            line_json = json.loads(line)
+            if line_json["role"] == "_usage":
+                token_count = line_json["token_count"]
+                n_counted_messages = len(history)
+                continue
+            if line_json["role"] == "_checkpoint":
+                checkpoints.append(
+                    CheckpointIndexEntry(
+                        id=line_json["id"],
+                        offset=line_offset,
+                        n_messages=len(history),
+                        token_count=token_count,
+                        n_counted_messages=n_counted_messages,
+                    )
+                )
+                continue
+            history.append(Message.model_validate(line_json))
+    return _LoadedContext(history, checkpoints, token_count, n_counted_messages)
+
+
+def _write_file(file: BinaryIO, data: bytes, sync: bool) -> None:
+    file.write(data)
+    file.flush()
+    if sync:
+        os.fsync(file.fileno())
+
+
+def _copy_file_prefix(src: Path, dst: Path, length: int) -> None:
+    with src.open("rb") as fsrc, dst.open("wb") as fdst:
+        remaining = length
+        while remaining > 0:
+            chunk = fsrc.read(min(remaining, _COPY_CHUNK_SIZE))
+            if not chunk:
+                break
+            fdst.write(chunk)
+            remaining -= len(chunk)
+
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
 
 class Context:
-    def __init__(self, file_backend: Path):
+    def __init__(self, file_backend: Path, *, sync_mode: SyncMode = "none"):
         self._file_backend = file_backend
         self._history: list[Message] = []
         self._token_count: int = 0
+        """Token count of the context as last reported by the LLM."""
+        self._token_model: str = ""
+        """Name of the model that reported `_token_count`, whose calibration is applied."""
+        self._n_counted_messages: int = 0
+        """Number of messages covered by `_token_count`, the rest are only estimated."""
+        self._message_tokens: list[int] = []
+        """Local token estimate of every message in the history."""
+        self._token_calibration = TokenCalibration()
         self._next_checkpoint_id: int = 0
         """The ID of the next checkpoint, starting from 0, incremented after each checkpoint."""
+        self._checkpoints: list[CheckpointIndexEntry] = []
+        """Index entry of every checkpoint, used to revert without re-reading the file."""
+        self._sync_mode: SyncMode = sync_mode
+        self._writer = _ContextWriter(file_backend)
+        self._batch_depth: int = 0
+        self._blobs = BlobStore(file_backend.with_name(f"{file_backend.stem}.blobs"))
 
     async def restore(self) -> bool:
         logger.debug("Restoring context from file: {file_backend}", file_backend=self._file_backend)
@@ -33,20 +195,17 @@ class Context:
             logger.debug("Empty context file, skipping restoration")
             return False
 
-        async with aiofiles.open(self._file_backend, encoding="utf-8") as f:
-            async for line in f:
-                if not line.strip():
-                    continue
-                line_json = json.loads(line)
-                if line_json["role"] == "_usage":
-                    self._token_count = line_json["token_count"]
-                    continue
-                if line_json["role"] == "_checkpoint":
-                    self._next_checkpoint_id = line_json["id"] + 1
-                    continue
-                message = Message.model_validate(line_json)
-                self._history.append(message)
-
+        # parse the whole file in one worker thread instead of one thread hop per line
+        loaded = await asyncio.to_thread(_load_context_file, self._file_backend)
+        self._history = loaded.history
+        self._checkpoints = loaded.checkpoints
+        self._token_count = loaded.token_count
+        self._n_counted_messages = loaded.n_counted_messages
+        self._message_tokens = [estimate_message_tokens(message) for message in self._history]
+        if self._checkpoints:
+            self._next_checkpoint_id = self._checkpoints[-1].id + 1
+        self._blobs.retain(self._history)
+        await self._blobs.collect()
         return True
 
     @property
@@ -55,8 +214,24 @@ class Context:
 
     @property
     def token_count(self) -> int:
+        """Token count of the context as last reported by the LLM."""
         return self._token_count
 
+    @property
+    def estimated_token_count(self) -> int:
+        """
+        Token count of the context including the messages appended since the LLM last reported
+        it, such as tool results, which are estimated locally.
+        """
+        unreported = sum(self._message_tokens[self._n_counted_messages :])
+        calibrated = self._token_calibration.apply(unreported, model=self._token_model)
+        return self._token_count + calibrated
+
+    @property
+    def token_calibration(self) -> TokenCalibration:
+        """Correction factor of the local token estimates, learned from the LLM reports."""
+        return self._token_calibration
+
     @property
     def n_checkpoints(self) -> int:
         return self._next_checkpoint_id
@@ -65,13 +240,65 @@ class Context:
     def file_backend(self) -> Path:
         return self._file_backend
 
+    @property
+    def blobs(self) -> BlobStore:
+        """The store of the media referenced by the history."""
+        return self._blobs
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncGenerator[None]:
+        """
+        Group all writes made within the block into a single write to the file backend,
+        which is committed when the outermost block exits, even on error or cancellation.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                await asyncio.shield(self._commit(sync=self._sync_mode != "none"))
+
+    async def flush(self) -> None:
+        """Write all pending records to the file backend."""
+        await self._writer.flush(sync=self._sync_mode != "none")
+
+    async def close(self) -> None:
+        """Flush pending records and release the file handle. The context stays usable."""
+        await self._writer.close(sync=self._sync_mode != "none")
+
+    async def _write(self, *lines: str) -> None:
+        for line in lines:
+            self._writer.stage(line)
+        await self._commit_if_needed()
+
+    async def _commit_if_needed(self) -> None:
+        if self._sync_mode == "always":
+            await self._writer.flush(sync=True)
+        elif self._batch_depth == 0:
+            await self._commit(sync=self._sync_mode == "per-step")
+
+    async def _commit(self, sync: bool) -> None:
+        await self._writer.flush(sync=sync)
+        # blobs released by a revert may be referenced again by what is appended right after
+        # it, so they are only collected once the outermost batch is committed
+        await self._blobs.collect()
+
     async def checkpoint(self, add_user_message: bool):
         checkpoint_id = self._next_checkpoint_id
         self._next_checkpoint_id += 1
         logger.debug("Checkpointing, ID: {id}", id=checkpoint_id)
 
-        async with aiofiles.open(self._file_backend, "a", encoding="utf-8") as f:
-            await f.write(json.dumps({"role": "_checkpoint", "id": checkpoint_id}) + "\n")
+        offset = self._writer.stage(json.dumps({"role": "_checkpoint", "id": checkpoint_id}) + "\n")
+        entry = CheckpointIndexEntry(
+            id=checkpoint_id,
+            offset=offset,
+            n_messages=len(self._history),
+            token_count=self._token_count,
+            n_counted_messages=self._n_counted_messages,
+        )
+        self._checkpoints.append(entry)
+        await self._commit_if_needed()
         if add_user_message:
             await self.append_message(
                 Message(role="user", content=[system(f"CHECKPOINT {checkpoint_id}")])
@@ -96,40 +323,20 @@ class Context:
             logger.error("Checkpoint {checkpoint_id} does not exist", checkpoint_id=checkpoint_id)
             raise ValueError(f"Checkpoint {checkpoint_id} does not exist")
 
-        # rotate the context file
-        rotated_file_path = await next_available_rotation(self._file_backend)
-        if rotated_file_path is None:
-            logger.error("No available rotation path found")
-            raise RuntimeError("No available rotation path found")
-        await aiofiles.os.replace(self._file_backend, rotated_file_path)
-        logger.debug(
-            "Rotated context file: {rotated_file_path}", rotated_file_path=rotated_file_path
-        )
+        entry = self._checkpoints[checkpoint_id]
+        rotated_file_path = await self._rotate()
 
-        # restore the context until the specified checkpoint
-        self._history.clear()
-        self._token_count = 0
-        self._next_checkpoint_id = 0
-        async with (
-            aiofiles.open(rotated_file_path, encoding="utf-8") as old_file,
-            aiofiles.open(self._file_backend, "w", encoding="utf-8") as new_file,
-        ):
-            async for line in old_file:
-                if not line.strip():
-                    continue
-
-                line_json = json.loads(line)
-                if line_json["role"] == "_checkpoint" and line_json["id"] == checkpoint_id:
-                    break
-
-                await new_file.write(line)
-                if line_json["role"] == "_usage":
-                    self._token_count = line_json["token_count"]
-                elif line_json["role"] == "_checkpoint":
-                    self._next_checkpoint_id = line_json["id"] + 1
-                else:
-                    message = Message.model_validate(line_json)
-                    self._history.append(message)
+        # keep the content before the checkpoint, which is already in memory
+        await asyncio.to_thread(
+            _copy_file_prefix, rotated_file_path, self._file_backend, entry.offset
+        )
+        self._blobs.release(self._history[entry.n_messages :])
+        del self._history[entry.n_messages :]
+        del self._message_tokens[entry.n_messages :]
+        del self._checkpoints[checkpoint_id:]
+        self._token_count = entry.token_count
+        self._n_counted_messages = entry.n_counted_messages
+        self._next_checkpoint_id = checkpoint_id
 
     async def clear(self):
         """
@@ -144,33 +351,64 @@ class Context:
 
         logger.debug("Clearing context")
 
-        # rotate the context file
+        await self._rotate()
+        self._file_backend.touch()
+
+        self._history.clear()
+        self._message_tokens.clear()
+        self._blobs.reset()
+        self._checkpoints.clear()
+        self._token_count = 0
+        self._n_counted_messages = 0
+        self._next_checkpoint_id = 0
+
+    async def _rotate(self) -> Path:
+        # pending records belong to the file being rotated
+        await self.close()
+
         rotated_file_path = await next_available_rotation(self._file_backend)
         if rotated_file_path is None:
             logger.error("No available rotation path found")
             raise RuntimeError("No available rotation path found")
+        # the rotated file keeps referring to the blobs of the history, it may be restored
+        await self._blobs.pin(self._history, rotated_file_path)
         await aiofiles.os.replace(self._file_backend, rotated_file_path)
-        self._file_backend.touch()
         logger.debug(
             "Rotated context file: {rotated_file_path}", rotated_file_path=rotated_file_path
         )
-
-        self._history.clear()
-        self._token_count = 0
-        self._next_checkpoint_id = 0
+        return rotated_file_path
 
     async def append_message(self, message: Message | Sequence[Message]):
         logger.debug("Appending message(s) to context: {message}", message=message)
         messages = [message] if isinstance(message, Message) else message
+        # inline media are moved to the blob store, only their references are kept
+        messages = [await self._blobs.intern(message) for message in messages]
         self._history.extend(messages)
+        self._message_tokens.extend(estimate_message_tokens(message) for message in messages)
 
-        async with aiofiles.open(self._file_backend, "a", encoding="utf-8") as f:
-            for message in messages:
-                await f.write(message.model_dump_json(exclude_none=True) + "\n")
+        await self._write(
+            *(message.model_dump_json(exclude_none=True) + "\n" for message in messages)
+        )
 
-    async def update_token_count(self, token_count: int):
+    async def update_token_count(self, token_count: int, *, model: str = ""):
+        """
+        Record the token count of the context reported by the LLM.
+
+        Args:
+            token_count (int): The token count reported by the LLM.
+            model (str): The name of the model that reported it.
+        """
         logger.debug("Updating token count in context: {token_count}", token_count=token_count)
+        # the first count after a clear also covers the system prompt and tools, and the growth
+        # since a count of another model mixes two tokenizers
+        if self._token_count > 0 and model == self._token_model:
+            self._token_calibration.observe(
+                estimated=sum(self._message_tokens[self._n_counted_messages :]),
+                reported=token_count - self._token_count,
+                model=model,
+            )
         self._token_count = token_count
+        self._token_model = model
+        self._n_counted_messages = len(self._history)
 
-        async with aiofiles.open(self._file_backend, "a", encoding="utf-8") as f:
-            await f.write(json.dumps({"role": "_usage", "token_count": token_count}) + "\n")
+        await self._write(json.dumps({"role": "_usage", "token_count": token_count}) + "\n")
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from collections.abc import Awaitable, Callable, Sequence
 from contextlib import suppress
 from dataclasses import dataclass
@@ -15,8 +16,11 @@ from kosong.chat_provider import (
     APIEmptyResponseError,
     APIStatusError,
     APITimeoutError,
+    StreamedMessagePart,
+    TokenUsage,
 )
 from kosong.message import Message
+from kosong.tracing import span
 from tenacity import RetryCallState, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
 from kimi_cli.llm import ModelCapability
@@ -31,10 +35,11 @@ from kimi_cli.soul import (
     wire_send,
 )
 from kimi_cli.soul.agent import Agent, Runtime
-from kimi_cli.soul.compaction import SimpleCompaction
+from kimi_cli.soul.compaction import create_compaction
 from kimi_cli.soul.context import Context
 from kimi_cli.soul.message import check_message, system, tool_result_to_message
 from kimi_cli.soul.slash import registry as soul_slash_registry
+from kimi_cli.soul.tokens import estimate_message_tokens
 from kimi_cli.soul.toolset import KimiToolset
 from kimi_cli.tools.dmail import NAME as SendDMail_NAME
 from kimi_cli.tools.utils import ToolRejectedError
@@ -86,6 +91,44 @@ class TurnOutcome:
     step_count: int
 
 
+@dataclass(frozen=True, slots=True)
+class _BackgroundCompaction:
+    prefix: Sequence[Message]
+    """The history being compacted, which must still prefix the context when spliced in."""
+    task: asyncio.Task[Sequence[Message] | None]
+
+
+@dataclass(slots=True)
+class _StepClock:
+    """Timestamps of a step, from `time.perf_counter`, to break down where its time goes."""
+
+    started_at: float
+    attempt_started_at: float = 0.0
+    first_part_at: float = 0.0
+    streamed_at: float = 0.0
+
+    def start_attempt(self) -> None:
+        self.attempt_started_at = time.perf_counter()
+        self.first_part_at = 0.0
+
+    def mark_part(self) -> None:
+        if not self.first_part_at:
+            self.first_part_at = time.perf_counter()
+
+    def stream_latency(self, usage: TokenUsage | None) -> StatusUpdate:
+        self.streamed_at = time.perf_counter()
+        first_part_at = self.first_part_at or self.streamed_at
+        stream_s = self.streamed_at - first_part_at
+        return StatusUpdate(
+            retry_ms=(self.attempt_started_at - self.started_at) * 1000,
+            ttft_ms=(first_part_at - self.attempt_started_at) * 1000,
+            stream_ms=stream_s * 1000,
+            output_tokens_per_second=(
+                usage.output / stream_s if usage is not None and stream_s > 0 else None
+            ),
+        )
+
+
 class KimiSoul:
     """The soul of Kimi Code CLI."""
 
@@ -108,7 +151,21 @@ class KimiSoul:
         self._approval = agent.runtime.approval
         self._context = context
         self._loop_control = agent.runtime.config.loop_control
-        self._compaction = SimpleCompaction()  # TODO: maybe configurable and composable
+        self._compaction = create_compaction(
+            self._loop_control.compaction_strategy, token_calibration=context.token_calibration
+        )
+        self._manual_compaction = create_compaction(
+            self._loop_control.compaction_strategy,
+            manual=True,
+            token_calibration=context.token_calibration,
+        )
+        self._background_compaction: _BackgroundCompaction | None = None
+        self._background_compaction_tokens: int | None = None
+        """Context usage when the last background compaction that was not spliced in started."""
+        self._persist_status: tuple[StatusUpdate, float] | None = None
+        """The status update of the current step, sent once its context writes are committed."""
+        self._tool_stats_changed = False
+        """Whether tools were called since the tool statistics were last sent."""
 
         for tool in agent.toolset.tools:
             if tool.name == SendDMail_NAME:
@@ -165,7 +222,7 @@ class KimiSoul:
     @property
     def _context_usage(self) -> float:
         if self._runtime.llm is not None:
-            return self._context.token_count / self._runtime.llm.max_context_size
+            return self._context.estimated_token_count / self._runtime.llm.max_context_size
         return 0.0
 
     @property
@@ -180,44 +237,54 @@ class KimiSoul:
         return self._slash_commands
 
     async def run(self, user_input: str | list[ContentPart]):
-        # Refresh OAuth tokens on each turn to avoid idle-time expirations.
-        await self._runtime.oauth.ensure_fresh(self._runtime)
-
-        wire_send(TurnBegin(user_input=user_input))
-        user_message = Message(role="user", content=user_input)
-        text_input = user_message.extract_text(" ").strip()
-
-        if command_call := parse_slash_command_call(text_input):
-            command = self._find_slash_command(command_call.name)
-            if command is None:
-                # this should not happen actually, the shell should have filtered it out
-                wire_send(TextPart(text=f'Unknown slash command "/{command_call.name}".'))
+        with span("soul.run", agent=self._agent.name):
+            # Refresh OAuth tokens on each turn to avoid idle-time expirations.
+            await self._runtime.oauth.ensure_fresh(self._runtime)
+
+            wire_send(TurnBegin(user_input=user_input))
+            user_message = Message(role="user", content=user_input)
+            text_input = user_message.extract_text(" ").strip()
+
+            if command_call := parse_slash_command_call(text_input):
+                command = self._find_slash_command(command_call.name)
+                if command is None:
+                    # this should not happen actually, the shell should have filtered it out
+                    wire_send(TextPart(text=f'Unknown slash command "/{command_call.name}".'))
+                else:
+                    ret = command.func(self, command_call.args)
+                    if isinstance(ret, Awaitable):
+                        await ret
+            elif self._loop_control.max_ralph_iterations != 0:
+                runner = FlowRunner.ralph_loop(
+                    user_message,
+                    self._loop_control.max_ralph_iterations,
+                )
+                await runner.run(self, "")
             else:
-                ret = command.func(self, command_call.args)
-                if isinstance(ret, Awaitable):
-                    await ret
-        elif self._loop_control.max_ralph_iterations != 0:
-            runner = FlowRunner.ralph_loop(
-                user_message,
-                self._loop_control.max_ralph_iterations,
-            )
-            await runner.run(self, "")
-        else:
-            await self._turn(user_message)
+                await self._turn(user_message)
 
-        wire_send(TurnEnd())
+            if self._tool_stats_changed and isinstance(self._agent.toolset, KimiToolset):
+                self._tool_stats_changed = False
+                wire_send(StatusUpdate(tool_stats=self._agent.toolset.stats.summary()))
+            wire_send(TurnEnd())
 
     async def _turn(self, user_message: Message) -> TurnOutcome:
-        if self._runtime.llm is None:
-            raise LLMNotSet()
+        with span("soul.turn") as current:
+            if self._runtime.llm is None:
+                raise LLMNotSet()
 
-        if missing_caps := check_message(user_message, self._runtime.llm.capabilities):
-            raise LLMNotSupported(self._runtime.llm, list(missing_caps))
+            if missing_caps := check_message(user_message, self._runtime.llm.capabilities):
+                raise LLMNotSupported(self._runtime.llm, list(missing_caps))
 
-        await self._checkpoint()  # this creates the checkpoint 0 on first run
-        await self._context.append_message(user_message)
-        logger.debug("Appended user message to context")
-        return await self._agent_loop()
+            async with self._context.batch():
+                await self._checkpoint()  # this creates the checkpoint 0 on first run
+                await self._context.append_message(user_message)
+            logger.debug("Appended user message to context")
+            outcome = await self._agent_loop()
+            if current is not None:
+                current.set_attribute("stop_reason", outcome.stop_reason)
+                current.set_attribute("n_steps", outcome.step_count)
+            return outcome
 
     def _build_slash_commands(self) -> list[SlashCommand[Any]]:
         commands: list[SlashCommand[Any]] = list(soul_slash_registry.list_commands())
@@ -337,20 +404,30 @@ class KimiSoul:
             back_to_the_future: BackToTheFuture | None = None
             step_outcome: StepOutcome | None = None
             try:
-                # compact the context if needed
-                reserved = self._loop_control.reserved_context_size
-                if self._context.token_count + reserved >= self._runtime.llm.max_context_size:
-                    logger.info("Context too long, compacting...")
-                    await self.compact_context()
-
-                logger.debug("Beginning step {step_no}", step_no=step_no)
-                await self._checkpoint()
-                self._denwa_renji.set_n_checkpoints(self._context.n_checkpoints)
-                step_outcome = await self._step()
+                # all context writes in one step are committed together
+                async with self._context.batch():
+                    # splice in the compaction finished in the background, if any
+                    await self._splice_background_compaction(wait=False)
+                    # compact the context if needed
+                    if self._context_too_long():
+                        # the compaction running in the background is already ahead
+                        await self._splice_background_compaction(wait=True)
+                    if self._context_too_long():
+                        logger.info("Context too long, compacting...")
+                        await self.compact_context()
+
+                    logger.debug("Beginning step {step_no}", step_no=step_no)
+                    await self._checkpoint()
+                    self._denwa_renji.set_n_checkpoints(self._context.n_checkpoints)
+                    with span("soul.step", step=step_no):
+                        step_outcome = await self._step()
+                self._send_persist_status()
             except BackToTheFuture as e:
+                self._send_persist_status()
                 back_to_the_future = e
             except Exception:
                 # any other exception should interrupt the step
+                self._persist_status = None
                 wire_send(StepInterrupted())
                 # break the agent loop
                 raise
@@ -376,14 +453,32 @@ class KimiSoul:
 
             if back_to_the_future is not None:
                 await self._context.revert_to(back_to_the_future.checkpoint_id)
-                await self._checkpoint()
-                await self._context.append_message(back_to_the_future.messages)
+                async with self._context.batch():
+                    await self._checkpoint()
+                    await self._context.append_message(back_to_the_future.messages)
+
+    def _send_persist_status(self) -> None:
+        """Send the status update of the step, timing its context writes up to the commit."""
+        if self._persist_status is None:
+            return
+        status_update, tools_done_at = self._persist_status
+        self._persist_status = None
+        status_update.persist_ms = (time.perf_counter() - tools_done_at) * 1000
+        wire_send(status_update)
 
     async def _step(self) -> StepOutcome | None:
         """Run a single step and return a stop outcome, or None to continue."""
         # already checked in `run`
         assert self._runtime.llm is not None
         chat_provider = self._runtime.llm.chat_provider
+        stream_timeout = self._runtime.llm.stream_timeout
+        # inline media are only kept as blob references in the context
+        history = await self._context.blobs.resolve(self._context.history)
+        clock = _StepClock(started_at=time.perf_counter())
+
+        def on_message_part(part: StreamedMessagePart) -> None:
+            clock.mark_part()
+            wire_send(part)
 
         @tenacity.retry(
             retry=retry_if_exception(self._is_retryable_error),
@@ -394,30 +489,42 @@ class KimiSoul:
         )
         async def _kosong_step_with_retry() -> StepResult:
             # run an LLM step (may be interrupted)
+            clock.start_attempt()
             return await kosong.step(
                 chat_provider,
                 self._agent.system_prompt,
                 self._agent.toolset,
-                self._context.history,
-                on_message_part=wire_send,
+                history,
+                on_message_part=on_message_part,
                 on_tool_result=wire_send,
+                stream_timeout=stream_timeout,
             )
 
         result = await _kosong_step_with_retry()
         logger.debug("Got step result: {result}", result=result)
-        status_update = StatusUpdate(token_usage=result.usage, message_id=result.id)
+        status_update = clock.stream_latency(result.usage)
+        status_update.token_usage = result.usage
+        status_update.message_id = result.id
         if result.usage is not None:
             # mark the token count for the context before the step
-            await self._context.update_token_count(result.usage.input)
+            await self._context.update_token_count(result.usage.input, model=self.model_name)
             status_update.context_usage = self.status.context_usage
         wire_send(status_update)
+        # compact ahead of time while the tools run and the user types the next input
+        self._maybe_start_background_compaction()
 
         # wait for all tool results (may be interrupted)
         results = await result.tool_results()
         logger.debug("Got tool results: {results}", results=results)
+        tools_done_at = time.perf_counter()
 
         # shield the context manipulation from interruption
         await asyncio.shield(self._grow_context(result, results))
+        # sent by `_send_persist_status` once the batch of the step is committed
+        status_update = StatusUpdate(tool_ms=(tools_done_at - clock.streamed_at) * 1000)
+        self._persist_status = (status_update, tools_done_at)
+        # the statistics of the tools are sent once at the end of the turn
+        self._tool_stats_changed |= bool(results)
 
         rejected = any(isinstance(result.return_value, ToolRejectedError) for result in results)
         if rejected:
@@ -469,23 +576,47 @@ class KimiSoul:
 
         await self._context.append_message(result.message)
         if result.usage is not None:
-            await self._context.update_token_count(result.usage.total)
+            await self._context.update_token_count(result.usage.total, model=self.model_name)
 
         logger.debug(
             "Appending tool messages to context: {tool_messages}", tool_messages=tool_messages
         )
         await self._context.append_message(tool_messages)
-        # token count of tool results are not available yet
+        # token count of tool results is estimated until the next step reports the usage
 
-    async def compact_context(self) -> None:
+    def _context_too_long(self) -> bool:
+        assert self._runtime.llm is not None
+        reserved = self._loop_control.reserved_context_size
+        # tool results are only estimated until the next step reports the usage
+        estimated = self._context.estimated_token_count
+        return estimated + reserved >= self._runtime.llm.max_context_size
+
+    async def compact_context(self, *, manual: bool = False) -> None:
         """
         Compact the context.
 
+        Args:
+            manual (bool): Whether the compaction was asked for by the user.
+
         Raises:
             LLMNotSet: When the LLM is not set.
             ChatProviderError: When the chat provider returns an error.
         """
+        self._cancel_background_compaction()
+        wire_send(CompactionBegin())
+        with span("soul.compact", n_messages=len(self._context.history)):
+            compacted_messages = await self._compact(self._context.history, manual=manual)
+            await self._replace_context(compacted_messages)
+        wire_send(CompactionEnd())
 
+    async def close(self) -> None:
+        """Cancel the compaction running in the background, if any, and close the context."""
+        self._cancel_background_compaction()
+        await self._context.close()
+
+    async def _compact(
+        self, history: Sequence[Message], *, manual: bool = False
+    ) -> Sequence[Message]:
         @tenacity.retry(
             retry=retry_if_exception(self._is_retryable_error),
             before_sleep=partial(self._retry_log, "compaction"),
@@ -496,14 +627,117 @@ class KimiSoul:
         async def _compact_with_retry() -> Sequence[Message]:
             if self._runtime.llm is None:
                 raise LLMNotSet()
-            return await self._compaction.compact(self._context.history, self._runtime.llm)
+            resolved = await self._context.blobs.resolve(history)
+            compaction = self._manual_compaction if manual else self._compaction
+            return await compaction.compact(resolved, self._runtime.llm)
 
-        wire_send(CompactionBegin())
-        compacted_messages = await _compact_with_retry()
+        return await _compact_with_retry()
+
+    async def _replace_context(self, messages: Sequence[Message]) -> None:
         await self._context.clear()
-        await self._checkpoint()
-        await self._context.append_message(compacted_messages)
+        async with self._context.batch():
+            await self._checkpoint()
+            await self._context.append_message(messages)
+
+    def _maybe_start_background_compaction(self) -> None:
+        """
+        Start compacting the current history in the background if the context usage crossed the
+        soft watermark. The result is spliced in by the agent loop at the next step boundary.
+        """
+        ratio = self._loop_control.background_compaction_ratio
+        if self._background_compaction is not None or ratio >= 1 or self._runtime.llm is None:
+            return
+        threshold = self._runtime.llm.max_context_size - self._loop_control.reserved_context_size
+        watermark = threshold * ratio
+        if (last_tokens := self._background_compaction_tokens) is not None:
+            # back off after a failed or discarded attempt, until the usage has grown by half of
+            # the room that was left below the hard limit
+            watermark = max(watermark, last_tokens + (threshold - last_tokens) / 2)
+        n_tokens = self._context.estimated_token_count
+        if n_tokens < watermark:
+            return
+
+        prefix = list(self._context.history)
+
+        async def _compact_in_background() -> Sequence[Message] | None:
+            try:
+                return await self._compact(prefix)
+            except Exception:
+                logger.exception("Background compaction failed")
+                return None
+
+        logger.info("Context usage crossed the soft watermark, compacting in the background...")
+        self._background_compaction = _BackgroundCompaction(
+            prefix=prefix, task=asyncio.create_task(_compact_in_background())
+        )
+        self._background_compaction_tokens = n_tokens
+
+    def _cancel_background_compaction(self) -> None:
+        if self._background_compaction is not None:
+            self._background_compaction.task.cancel()
+            self._background_compaction = None
+        self._background_compaction_tokens = None
+
+    async def _splice_background_compaction(self, *, wait: bool) -> bool:
+        """
+        Replace the compacted prefix of the context by the result of the background compaction,
+        keeping the messages appended since it started.
+
+        Args:
+            wait (bool): Whether to wait for the background compaction to finish.
+
+        Returns:
+            bool: Whether the context was compacted.
+        """
+        background = self._background_compaction
+        if background is None:
+            return False
+        if background.task.done():
+            self._background_compaction = None
+            compacted_messages = background.task.result()
+            if not self._can_splice(background.prefix, compacted_messages):
+                return False
+            wire_send(CompactionBegin())
+        elif wait:
+            logger.info("Context too long, waiting for the background compaction...")
+            wire_send(CompactionBegin())
+            try:
+                compacted_messages = await asyncio.shield(background.task)
+            except BaseException:
+                wire_send(CompactionEnd())
+                raise
+            self._background_compaction = None
+            if not self._can_splice(background.prefix, compacted_messages):
+                wire_send(CompactionEnd())
+                return False
+        else:
+            return False
+
+        assert compacted_messages is not None
+        n_compacted = len(background.prefix)
+        logger.info("Splicing in the background compaction of {n} messages", n=n_compacted)
+        tail = self._context.history[n_compacted:]
+        await self._replace_context([*compacted_messages, *tail])
+        self._background_compaction_tokens = None
         wire_send(CompactionEnd())
+        return True
+
+    def _can_splice(
+        self, prefix: Sequence[Message], compacted_messages: Sequence[Message] | None
+    ) -> bool:
+        if compacted_messages is None:
+            return False
+        n_tokens_before = sum(map(estimate_message_tokens, prefix))
+        if sum(map(estimate_message_tokens, compacted_messages)) >= n_tokens_before:
+            return False
+        history = self._context.history
+        if len(history) < len(prefix) or any(
+            a is not b for a, b in zip(prefix, history, strict=False)
+        ):
+            # the context was reverted or compacted meanwhile
+            logger.info("Context changed during the background compaction, discarding it")
+            return False
+        return True
 
     @staticmethod
     def _is_retryable_error(exception: BaseException) -> bool:
@@ -38,7 +38,10 @@ async def init(soul: KimiSoul, args: str):
     with tempfile.TemporaryDirectory() as temp_dir:
         tmp_context = Context(file_backend=Path(temp_dir) / "context.jsonl")
         tmp_soul = KimiSoul(soul.agent, context=tmp_context)
-        await tmp_soul.run(prompts.INIT)
+        try:
+            await tmp_soul.run(prompts.INIT)
+        finally:
+            await tmp_soul.close()
 
     agents_md = load_agents_md(soul.runtime.builtin_args.KIMI_WORK_DIR)
     system_message = system(
@@ -57,10 +60,34 @@ async def compact(soul: KimiSoul, args: str):
         return
 
     logger.info("Running `/compact`")
-    await soul.compact_context()
+    await soul.compact_context(manual=True)
     wire_send(TextPart(text="The context has been compacted."))
 
 
+@registry.command
+def stats(soul: KimiSoul, args: str):
+    """Show execution statistics of the tools called in this session"""
+    from kimi_cli.soul.toolset import KimiToolset
+
+    toolset = soul.agent.toolset
+    if not isinstance(toolset, KimiToolset) or not toolset.stats:
+        wire_send(TextPart(text="No tool has been called yet."))
+        return
+
+    lines = ["| Tool | Calls | Errors | Truncated | p50 | p95 | p95 queue | Output |"]
+    lines.append("| --- | ---: | ---: | ---: | ---: | ---: | ---: | ---: |")
+    summaries = sorted(
+        toolset.stats.summary().items(), key=lambda item: item[1].run_ms_p95, reverse=True
+    )
+    for name, summary in summaries:
+        lines.append(
+            f"| {name} | {summary.n_calls} | {summary.n_errors} | {summary.n_truncated} "
+            f"| {summary.run_ms_p50:,.0f} ms | {summary.run_ms_p95:,.0f} ms "
+            f"| {summary.queue_ms_p95:,.0f} ms | {summary.output_bytes:,} B |"
+        )
+    wire_send(TextPart(text="\n".join(lines)))
+
+
 @registry.command(aliases=["reset"])
 async def clear(soul: KimiSoul, args: str):
     """Clear the context"""
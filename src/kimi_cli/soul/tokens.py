@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from kosong.message import AudioURLPart, ImageURLPart, Message, TextPart, ThinkPart, VideoURLPart
+
+MESSAGE_OVERHEAD_TOKENS = 4
+"""Tokens taken by the role and delimiters of every message."""
+IMAGE_TOKENS = 1_000
+AUDIO_TOKENS = 1_000
+VIDEO_TOKENS = 5_000
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens of a text.
+
+    Byte-pair tokenizers take about 4 ASCII characters per token, while CJK and other non-ASCII
+    characters take about 1.5 characters per token. The number of non-ASCII characters is derived
+    from the UTF-8 length, assuming they are 3 bytes long.
+    """
+    n_chars = len(text)
+    if n_chars == 0:
+        return 0
+    n_non_ascii = min(n_chars, (len(text.encode("utf-8", errors="replace")) - n_chars) // 2)
+    return (n_chars - n_non_ascii + 3) // 4 + (n_non_ascii * 2 + 2) // 3
+
+
+def estimate_message_tokens(message: Message) -> int:
+    """Roughly estimate the number of tokens of a message, as counted by the LLM."""
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    for part in message.content:
+        match part:
+            case TextPart():
+                tokens += estimate_text_tokens(part.text)
+            case ThinkPart():
+                tokens += estimate_text_tokens(part.think)
+            case ImageURLPart():
+                tokens += IMAGE_TOKENS
+            case AudioURLPart():
+                tokens += AUDIO_TOKENS
+            case VideoURLPart():
+                tokens += VIDEO_TOKENS
+            case _:
+                pass
+    for tool_call in message.tool_calls or ():
+        tokens += MESSAGE_OVERHEAD_TOKENS + estimate_text_tokens(tool_call.function.name)
+        tokens += estimate_text_tokens(tool_call.function.arguments or "")
+    return tokens
+
+
+class TokenCalibration:
+    """
+    Correction factor between the local estimates and the token counts reported by the LLM.
+
+    Every time the LLM reports a token count, the growth since the previous report is compared
+    with the estimate of the messages appended in between, and the ratio is folded into a moving
+    average. The factor therefore converges to the tokenizer of the model. It is kept per model
+    name, so that switching models neither applies nor disturbs the factor of another tokenizer.
+    """
+
+    MIN_RATIO = 0.25
+    MAX_RATIO = 4.0
+    SMOOTHING = 0.3
+    MIN_SAMPLE_TOKENS = 64
+    """Growths smaller than this are too noisy to calibrate on."""
+
+    def __init__(self) -> None:
+        self._ratios: dict[str, float] = {}
+
+    def ratio(self, model: str = "") -> float:
+        return self._ratios.get(model, 1.0)
+
+    def observe(self, estimated: int, reported: int, *, model: str = "") -> None:
+        """Fold in a sample of estimated tokens and the tokens reported by `model` for them."""
+        if estimated < self.MIN_SAMPLE_TOKENS or reported <= 0:
+            return
+        sample = min(max(reported / estimated, self.MIN_RATIO), self.MAX_RATIO)
+        ratio = self.ratio(model)
+        self._ratios[model] = ratio + (sample - ratio) * self.SMOOTHING
+
+    def apply(self, estimated: int, *, model: str = "") -> int:
+        return round(estimated * self.ratio(model))
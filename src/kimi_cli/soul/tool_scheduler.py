@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Literal
+
+from kaos.path import KaosPath
+
+from kimi_cli.config import ToolConcurrencyConfig
+
+type ToolEffect = Literal["read", "write", "process", "network"]
+"""
+The side effect of a tool, declared by tools as an `effect` class attribute.
+
+- `read`: only reads local state, runs with no limit. Reads of the file given by its `path`
+  argument run together, but after the writes to it that were called before them.
+- `write`: writes the file given by its `path` argument. Writes to the same file run one at
+  a time, in the order they were called, however the path is spelled, and after the reads of
+  it that were called before them.
+- `process`: runs local processes.
+- `network`: calls remote services.
+
+Tools without a declared effect run with no limit.
+"""
+
+
+class _PathLock:
+    """Lock of a path, shared by reads and exclusive for writes, taken in the order asked for."""
+
+    __slots__ = ("last_write", "reads", "n_users")
+
+    def __init__(self) -> None:
+        self.last_write: asyncio.Future[None] | None = None
+        """Done once the last write asked for is released."""
+        self.reads: list[asyncio.Future[None]] = []
+        """Done once each read asked for since the last write is released."""
+        self.n_users = 0
+
+
+class ToolScheduler:
+    """Schedules concurrent tool calls according to their side effects."""
+
+    def __init__(self, concurrency: ToolConcurrencyConfig) -> None:
+        self._semaphores: dict[ToolEffect, asyncio.Semaphore] = {
+            "write": asyncio.Semaphore(concurrency.write),
+            "process": asyncio.Semaphore(concurrency.process),
+            "network": asyncio.Semaphore(concurrency.network),
+        }
+        self._path_locks: dict[str, _PathLock] = {}
+
+    @asynccontextmanager
+    async def slot(
+        self, effect: ToolEffect | None, path: str | None = None
+    ) -> AsyncGenerator[None]:
+        """Wait until a tool call with the given effect can run, and hold its slot meanwhile."""
+        async with AsyncExitStack() as stack:
+            if (effect == "read" or effect == "write") and path is not None:
+                await stack.enter_async_context(
+                    self._lock_path(_canonical_path(path), shared=effect == "read")
+                )
+            if effect is not None and (semaphore := self._semaphores.get(effect)) is not None:
+                await stack.enter_async_context(semaphore)
+            yield
+
+    @asynccontextmanager
+    async def _lock_path(self, path: str, *, shared: bool) -> AsyncGenerator[None]:
+        path_lock = self._path_locks.get(path)
+        if path_lock is None:
+            path_lock = self._path_locks[path] = _PathLock()
+        path_lock.n_users += 1
+        released = asyncio.get_running_loop().create_future()
+        # a read waits for the earlier writes, a write for all the earlier calls
+        waits = [path_lock.last_write] if path_lock.last_write is not None else []
+        if shared:
+            path_lock.reads.append(released)
+        else:
+            waits.extend(path_lock.reads)
+            path_lock.last_write, path_lock.reads = released, []
+        try:
+            if waits:
+                # unlike awaiting the futures, a cancelled wait leaves them to the other waiters
+                await asyncio.wait(waits)
+            yield
+        finally:
+            if pending := [waiter for waiter in waits if not waiter.done()]:
+                # cancelled while waiting, the later calls must still wait for the earlier ones
+                asyncio.gather(*pending).add_done_callback(lambda _: released.set_result(None))
+            else:
+                released.set_result(None)
+            path_lock.n_users -= 1
+            if path_lock.n_users == 0:
+                del self._path_locks[path]
+
+
+def _canonical_path(path: str) -> str:
+    # the same canonical form as the file tools, relative paths are in the working directory
+    return str(KaosPath(path).expanduser().canonical())
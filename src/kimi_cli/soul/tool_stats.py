@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import math
+import random
+
+from kimi_cli.tools.utils import is_truncated
+from kimi_cli.wire.types import TextPart, ToolCallStats, ToolReturnValue, ToolStatsSummary
+
+
+def measure_tool_call(
+    return_value: ToolReturnValue, *, queue_s: float, run_s: float
+) -> ToolCallStats:
+    """Build the statistics of a finished tool call."""
+    match return_value.output:
+        case str(text):
+            output_bytes = len(text.encode("utf-8"))
+        case parts:
+            output_bytes = sum(
+                len(part.text.encode("utf-8")) for part in parts if isinstance(part, TextPart)
+            )
+    error: str | None = None
+    if return_value.is_error:
+        # errors built by `ToolResultBuilder` are plain return values
+        cls = type(return_value)
+        error = "ToolError" if cls is ToolReturnValue else cls.__name__
+    return ToolCallStats(
+        queue_ms=queue_s * 1000,
+        run_ms=run_s * 1000,
+        output_bytes=output_bytes,
+        truncated=is_truncated(return_value),
+        error=error,
+    )
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty sorted list."""
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class _ToolAggregate:
+    """Running totals of the calls of a tool, with a uniform sample of their timings."""
+
+    __slots__ = ("n_calls", "n_errors", "n_truncated", "output_bytes", "samples")
+
+    def __init__(self) -> None:
+        self.n_calls = 0
+        self.n_errors = 0
+        self.n_truncated = 0
+        self.output_bytes = 0
+        self.samples: list[tuple[float, float]] = []
+        """`(run_ms, queue_ms)` of a reservoir sample of the calls."""
+
+
+class ToolStats:
+    """
+    Execution statistics of the tool calls in a session, aggregated by tool name.
+
+    Counts and sums are exact, while percentiles are computed over a fixed-size uniform sample
+    of the calls of each tool, so memory and summary time do not grow with the session.
+
+    >>> stats = ToolStats()
+    >>> for ms in (10, 20, 30, 400):
+    ...     stats.record("Shell", ToolCallStats(queue_ms=0, run_ms=ms, output_bytes=1))
+    >>> summary = stats.summary()["Shell"]
+    >>> summary.n_calls, summary.run_ms_p50, summary.run_ms_p95
+    (4, 20.0, 400.0)
+    """
+
+    max_samples: int = 256
+
+    def __init__(self) -> None:
+        self._tools: dict[str, _ToolAggregate] = {}
+        self._random = random.Random(0)
+
+    def __bool__(self) -> bool:
+        return bool(self._tools)
+
+    def record(self, tool_name: str, stats: ToolCallStats) -> None:
+        aggregate = self._tools.get(tool_name)
+        if aggregate is None:
+            aggregate = self._tools[tool_name] = _ToolAggregate()
+        aggregate.n_calls += 1
+        aggregate.n_errors += stats.error is not None
+        aggregate.n_truncated += stats.truncated
+        aggregate.output_bytes += stats.output_bytes
+        sample = (stats.run_ms, stats.queue_ms)
+        if len(aggregate.samples) < self.max_samples:
+            aggregate.samples.append(sample)
+        elif (i := self._random.randrange(aggregate.n_calls)) < self.max_samples:
+            aggregate.samples[i] = sample
+
+    def summary(self) -> dict[str, ToolStatsSummary]:
+        summaries: dict[str, ToolStatsSummary] = {}
+        for tool_name, aggregate in self._tools.items():
+            run_ms = sorted(run for run, _ in aggregate.samples)
+            queue_ms = sorted(queue for _, queue in aggregate.samples)
+            summaries[tool_name] = ToolStatsSummary(
+                n_calls=aggregate.n_calls,
+                n_errors=aggregate.n_errors,
+                n_truncated=aggregate.n_truncated,
+                run_ms_p50=_percentile(run_ms, 0.5),
+                run_ms_p95=_percentile(run_ms, 0.95),
+                queue_ms_p95=_percentile(queue_ms, 0.95),
+                output_bytes=aggregate.output_bytes,
+            )
+        return summaries
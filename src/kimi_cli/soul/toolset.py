@@ -5,6 +5,7 @@ import contextlib
 import importlib
 import inspect
 import json
+import time
 from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import timedelta
@@ -25,10 +26,14 @@ from kosong.tooling.error import (
     ToolRuntimeError,
 )
 from kosong.tooling.mcp import convert_mcp_content
+from kosong.tracing import span
 from kosong.utils.typing import JsonType
 from loguru import logger
 
+from kimi_cli.config import ToolConcurrencyConfig
 from kimi_cli.exception import InvalidToolError, MCPRuntimeError
+from kimi_cli.soul.tool_scheduler import ToolEffect, ToolScheduler
+from kimi_cli.soul.tool_stats import ToolStats, measure_tool_call
 from kimi_cli.tools import SkipThisTool
 from kimi_cli.tools.utils import ToolRejectedError
 from kimi_cli.wire.types import (
@@ -69,8 +74,10 @@ if TYPE_CHECKING:
 
 
 class KimiToolset:
-    def __init__(self) -> None:
+    def __init__(self, concurrency: ToolConcurrencyConfig | None = None) -> None:
         self._tool_dict: dict[str, ToolType] = {}
+        self._scheduler = ToolScheduler(concurrency or ToolConcurrencyConfig())
+        self._stats = ToolStats()
         self._mcp_servers: dict[str, MCPServerInfo] = {}
         self._mcp_loading_task: asyncio.Task[None] | None = None
 
@@ -94,6 +101,11 @@ class KimiToolset:
     def tools(self) -> list[Tool]:
         return [tool.base for tool in self._tool_dict.values()]
 
+    @property
+    def stats(self) -> ToolStats:
+        """Execution statistics of the tool calls handled by this toolset."""
+        return self._stats
+
     def handle(self, tool_call: ToolCall) -> HandleResult:
         token = current_tool_call.set(tool_call)
         try:
@@ -110,14 +122,36 @@ class KimiToolset:
             except json.JSONDecodeError as e:
                 return ToolResult(tool_call_id=tool_call.id, return_value=ToolParseError(str(e)))
 
+            effect: ToolEffect | None = getattr(tool, "effect", None)
+            path = arguments.get("path") if isinstance(arguments, dict) else None
+
+            handled_at = time.perf_counter()
+
             async def _call():
-                try:
-                    ret = await tool.call(arguments)
-                    return ToolResult(tool_call_id=tool_call.id, return_value=ret)
-                except Exception as e:
-                    return ToolResult(
-                        tool_call_id=tool_call.id, return_value=ToolRuntimeError(str(e))
-                    )
+                with span(
+                    "tool.call", tool=tool.name, tool_call_id=tool_call.id, effect=effect
+                ) as current:
+                    # conflicting calls wait for each other, independent ones run in parallel
+                    async with self._scheduler.slot(
+                        effect, path if isinstance(path, str) else None
+                    ):
+                        started_at = time.perf_counter()
+                        try:
+                            ret = await tool.call(arguments)
+                        except Exception as e:
+                            ret = ToolRuntimeError(str(e))
+                        stats = measure_tool_call(
+                            ret,
+                            queue_s=started_at - handled_at,
+                            run_s=time.perf_counter() - started_at,
+                        )
+                    self._stats.record(tool.name, stats)
+                    if current is not None:
+                        current.set_attribute("queue_ms", stats.queue_ms)
+                        current.set_attribute("output_bytes", stats.output_bytes)
+                        if stats.error is not None:
+                            current.set_error(stats.error)
+                    return ToolResult(tool_call_id=tool_call.id, return_value=ret, stats=stats)
 
             return asyncio.create_task(_call())
         finally:
@@ -353,6 +387,8 @@ class MCPServerInfo:
 
 
 class MCPTool[T: ClientTransport](CallableTool):
+    effect: ToolEffect = "network"
+
     def __init__(
         self,
         server_name: str,
@@ -371,6 +407,7 @@ class MCPTool[T: ClientTransport](CallableTool):
             parameters=mcp_tool.inputSchema,
             **kwargs,
         )
+        self._server_name = server_name
         self._mcp_tool = mcp_tool
         self._client = client
         self._runtime = runtime
@@ -383,14 +420,15 @@ class MCPTool[T: ClientTransport](CallableTool):
             return ToolRejectedError()
 
         try:
-            async with self._client as client:
-                result = await client.call_tool(
-                    self._mcp_tool.name,
-                    kwargs,
-                    timeout=self._timeout,
-                    raise_on_error=False,
-                )
-                return convert_mcp_tool_result(result)
+            with span("mcp.call_tool", server=self._server_name, tool=self._mcp_tool.name):
+                async with self._client as client:
+                    result = await client.call_tool(
+                        self._mcp_tool.name,
+                        kwargs,
+                        timeout=self._timeout,
+                        raise_on_error=False,
+                    )
+                    return convert_mcp_tool_result(result)
         except Exception as e:
             # fastmcp raises `RuntimeError` on timeout and we cannot tell it from other errors
             exc_msg = str(e).lower()
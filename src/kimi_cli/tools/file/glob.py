@@ -8,6 +8,7 @@ from kosong.tooling import CallableTool2, ToolError, ToolOk, ToolReturnValue
 from pydantic import BaseModel, Field
 
 from kimi_cli.soul.agent import BuiltinSystemPromptArgs
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.tools.utils import load_desc
 from kimi_cli.utils.path import is_within_directory, list_directory
 
@@ -30,6 +31,7 @@ class Params(BaseModel):
 
 class Glob(CallableTool2[Params]):
     name: str = "Glob"
+    effect: ToolEffect = "read"
     description: str = load_desc(
         Path(__file__).parent / "glob.md",
         {
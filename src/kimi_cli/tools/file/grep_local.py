@@ -20,6 +20,7 @@ from pydantic import BaseModel, Field
 
 import kimi_cli
 from kimi_cli.share import get_share_dir
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.tools.utils import ToolResultBuilder, load_desc
 from kimi_cli.utils.aiohttp import new_client_session
 from kimi_cli.utils.logging import logger
@@ -242,6 +243,7 @@ async def _ensure_rg_path() -> str:
 
 class Grep(CallableTool2[Params]):
     name: str = "Grep"
+    effect: ToolEffect = "read"
     description: str = load_desc(Path(__file__).parent / "grep.md")
     params: type[Params] = Params
 
@@ -298,6 +300,7 @@ class Grep(CallableTool2[Params]):
                     lines = lines[: params.head_limit]
                     output = "\n".join(lines)
                     message = f"Results truncated to first {params.head_limit} lines"
+                    builder.mark_truncated()
                     if params.output_mode in ["content", "files_with_matches", "count_matches"]:
                         output += f"\n... (results truncated to {params.head_limit} lines)"
 
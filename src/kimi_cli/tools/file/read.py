@@ -6,8 +6,9 @@ from kosong.tooling import CallableTool2, ToolError, ToolOk, ToolReturnValue
 from pydantic import BaseModel, Field
 
 from kimi_cli.soul.agent import Runtime
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.tools.file.utils import MEDIA_SNIFF_BYTES, detect_file_type
-from kimi_cli.tools.utils import load_desc_jinja, truncate_line
+from kimi_cli.tools.utils import TRUNCATED_EXTRA, load_desc_jinja, truncate_line
 from kimi_cli.utils.path import is_within_directory
 
 MAX_LINES = 1000
@@ -44,6 +45,7 @@ class Params(BaseModel):
 
 class ReadFile(CallableTool2[Params]):
     name: str = "ReadFile"
+    effect: ToolEffect = "read"
     params: type[Params] = Params
 
     def __init__(self, runtime: Runtime) -> None:
@@ -174,10 +176,13 @@ class ReadFile(CallableTool2[Params]):
                 message += " End of file reached."
             if truncated_line_numbers:
                 message += f" Lines {truncated_line_numbers} were truncated."
-            return ToolOk(
+            ret = ToolOk(
                 output="".join(lines_with_no),  # lines already contain \n, just join them
                 message=message,
             )
+            if truncated_line_numbers:
+                ret.extras = {TRUNCATED_EXTRA: True}
+            return ret
         except Exception as e:
             return ToolError(
                 message=f"Failed to read {params.path}. Error: {e}",
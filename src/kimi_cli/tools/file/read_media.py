@@ -9,6 +9,7 @@ from kosong.tooling import CallableTool2, ToolError, ToolOk, ToolReturnValue
 from pydantic import BaseModel, Field
 
 from kimi_cli.soul.agent import Runtime
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.tools import SkipThisTool
 from kimi_cli.tools.file.utils import MEDIA_SNIFF_BYTES, FileType, detect_file_type
 from kimi_cli.tools.utils import load_desc_jinja
@@ -48,6 +49,7 @@ class Params(BaseModel):
 
 class ReadMediaFile(CallableTool2[Params]):
     name: str = "ReadMediaFile"
+    effect: ToolEffect = "read"
     params: type[Params] = Params
 
     def __init__(self, runtime: Runtime) -> None:
@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 
 from kimi_cli.soul.agent import BuiltinSystemPromptArgs
 from kimi_cli.soul.approval import Approval
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.tools.display import DisplayBlock
 from kimi_cli.tools.file import FileActions
 from kimi_cli.tools.utils import ToolRejectedError, load_desc
@@ -34,6 +35,7 @@ class Params(BaseModel):
 
 class WriteFile(CallableTool2[Params]):
     name: str = "WriteFile"
+    effect: ToolEffect = "write"
     description: str = load_desc(Path(__file__).parent / "write.md")
     params: type[Params] = Params
 
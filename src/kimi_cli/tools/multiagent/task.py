@@ -5,7 +5,7 @@ from typing import override
 from kosong.tooling import CallableTool2, ToolError, ToolOk, ToolReturnValue
 from pydantic import BaseModel, Field
 
-from kimi_cli.soul import MaxStepsReached, get_wire_or_none, run_soul
+from kimi_cli.soul import MaxStepsReached, UILoopFn, get_wire_or_none, run_soul
 from kimi_cli.soul.agent import Agent, Runtime
 from kimi_cli.soul.context import Context
 from kimi_cli.soul.kimisoul import KimiSoul
@@ -67,6 +67,7 @@ class Task(CallableTool2[Params]):
         )
         self._labor_market = runtime.labor_market
         self._session = runtime.session
+        self._context_config = runtime.config.context
 
     async def _get_subagent_context_file(self) -> Path:
         """Generate a unique context file path for subagent."""
@@ -125,11 +126,24 @@ class Task(CallableTool2[Params]):
                 _super_wire_send(msg)
 
         subagent_context_file = await self._get_subagent_context_file()
-        context = Context(file_backend=subagent_context_file)
+        context = Context(
+            file_backend=subagent_context_file, sync_mode=self._context_config.sync_mode
+        )
         soul = KimiSoul(agent, context=context)
-
         try:
-            await run_soul(soul, prompt, _ui_loop_fn, asyncio.Event())
+            return await self._run_subagent_soul(soul, context, prompt, _ui_loop_fn)
+        finally:
+            await soul.close()
+
+    async def _run_subagent_soul(
+        self,
+        soul: KimiSoul,
+        context: Context,
+        prompt: str,
+        ui_loop_fn: UILoopFn,
+    ) -> ToolReturnValue:
+        try:
+            await run_soul(soul, prompt, ui_loop_fn, asyncio.Event())
         except MaxStepsReached as e:
             return ToolError(
                 message=(
@@ -152,7 +166,7 @@ class Task(CallableTool2[Params]):
         # Check if response is too brief, if so, run again with continuation prompt
         n_attempts_remaining = MAX_CONTINUE_ATTEMPTS
         if len(final_response) < 200 and n_attempts_remaining > 0:
-            await run_soul(soul, CONTINUE_PROMPT, _ui_loop_fn, asyncio.Event())
+            await run_soul(soul, CONTINUE_PROMPT, ui_loop_fn, asyncio.Event())
 
             if len(context.history) == 0 or context.history[-1].role != "assistant":
                 return ToolError(message=_error_msg, brief="Failed to run subagent")
@@ -9,6 +9,7 @@ from kosong.tooling import CallableTool2, ToolReturnValue
 from pydantic import BaseModel, Field
 
 from kimi_cli.soul.approval import Approval
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.tools.display import ShellDisplayBlock
 from kimi_cli.tools.utils import ToolRejectedError, ToolResultBuilder, load_desc
 from kimi_cli.utils.environment import Environment
@@ -31,6 +32,7 @@ class Params(BaseModel):
 
 class Shell(CallableTool2[Params]):
     name: str = "Shell"
+    effect: ToolEffect = "process"
     params: type[Params] = Params
 
     def __init__(self, approval: Approval, environment: Environment):
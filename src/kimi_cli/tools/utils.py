@@ -70,6 +70,7 @@ class ToolResultBuilder:
         self._n_chars = 0
         self._n_lines = 0
         self._truncation_happened = False
+        self._truncated_by_tool = False
         self._display: list[DisplayBlock] = []
         self._extras: dict[str, JsonType] | None = None
 
@@ -131,6 +132,10 @@ class ToolResultBuilder:
         """Add display blocks to the tool result."""
         self._display.extend(blocks)
 
+    def mark_truncated(self) -> None:
+        """Record that the output was truncated by the tool itself, before being written."""
+        self._truncated_by_tool = True
+
     def extras(self, **extras: JsonType) -> None:
         """Add extra data to the tool result."""
         if self._extras is None:
@@ -155,7 +160,7 @@ class ToolResultBuilder:
             output=output,
             message=final_message,
             display=([BriefDisplayBlock(text=brief)] if brief else []) + self._display,
-            extras=self._extras,
+            extras=self._result_extras(),
         )
 
     def error(self, message: str, *, brief: str) -> ToolReturnValue:
@@ -175,9 +180,23 @@ class ToolResultBuilder:
             output=output,
             message=final_message,
             display=([BriefDisplayBlock(text=brief)] if brief else []) + self._display,
-            extras=self._extras,
+            extras=self._result_extras(),
         )
 
+    def _result_extras(self) -> dict[str, JsonType] | None:
+        if not (self._truncation_happened or self._truncated_by_tool):
+            return self._extras
+        return {**(self._extras or {}), TRUNCATED_EXTRA: True}
+
+
+TRUNCATED_EXTRA = "truncated"
+"""The key of the flag set in the `extras` of a tool result whose output was truncated."""
+
+
+def is_truncated(return_value: ToolReturnValue) -> bool:
+    """Whether the output of a tool result was truncated."""
+    return bool(return_value.extras and return_value.extras.get(TRUNCATED_EXTRA))
+
 
 class ToolRejectedError(ToolError):
     def __init__(self):
@@ -9,6 +9,7 @@ from pydantic import BaseModel, Field
 from kimi_cli.config import Config
 from kimi_cli.constant import USER_AGENT
 from kimi_cli.soul.agent import Runtime
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.soul.toolset import get_current_tool_call_or_none
 from kimi_cli.tools.utils import ToolResultBuilder, load_desc
 from kimi_cli.utils.aiohttp import new_client_session
@@ -21,6 +22,7 @@ class Params(BaseModel):
 
 class FetchURL(CallableTool2[Params]):
     name: str = "FetchURL"
+    effect: ToolEffect = "network"
     description: str = load_desc(Path(__file__).parent / "fetch.md", {})
     params: type[Params] = Params
 
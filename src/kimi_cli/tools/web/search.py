@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field, ValidationError
 from kimi_cli.config import Config
 from kimi_cli.constant import USER_AGENT
 from kimi_cli.soul.agent import Runtime
+from kimi_cli.soul.tool_scheduler import ToolEffect
 from kimi_cli.soul.toolset import get_current_tool_call_or_none
 from kimi_cli.tools import SkipThisTool
 from kimi_cli.tools.utils import ToolResultBuilder, load_desc
@@ -38,6 +39,7 @@ class Params(BaseModel):
 
 class SearchWeb(CallableTool2[Params]):
     name: str = "SearchWeb"
+    effect: ToolEffect = "network"
     description: str = load_desc(Path(__file__).parent / "search.md", {})
     params: type[Params] = Params
 
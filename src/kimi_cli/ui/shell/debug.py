@@ -168,6 +168,7 @@ def debug(app: Shell, args: str):
             Group(
                 Text(f"Total messages: {len(history)}", style="bold"),
                 Text(f"Token count: {context.token_count:,}", style="bold"),
+                Text(f"Estimated token count: {context.estimated_token_count:,}", style="bold"),
                 Text(f"Checkpoints: {context.n_checkpoints}", style="bold"),
                 Text(f"Trajectory: {context.file_backend}", style="dim"),
             ),
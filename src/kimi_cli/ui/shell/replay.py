@@ -75,13 +75,32 @@ async def replay_recent_history(
 
 
 async def _build_replay_turns_from_wire(wire_file: WireFile | None) -> list[_ReplayTurn]:
-    if wire_file is None or not wire_file.path.exists():
+    if wire_file is None:
         return []
 
-    size = wire_file.path.stat().st_size
+    # seek straight to the first of the turns to replay, or to the most recent cold segments
+    # holding them if the active segment was sealed recently
+    begin_offsets = [
+        entry.offset for entry in await wire_file.turn_index() if entry.kind == "begin"
+    ]
+    size = wire_file.path.stat().st_size if wire_file.path.exists() else 0
+    n_turns, n_segments = len(begin_offsets), 0
+    if n_turns >= MAX_REPLAY_TURNS:
+        start = begin_offsets[-MAX_REPLAY_TURNS]
+        size -= start
+    else:
+        start = 0
+        for segment in reversed(await wire_file.segments()):
+            if n_turns >= MAX_REPLAY_TURNS:
+                break
+            n_turns += segment.n_turns
+            n_segments += 1
+            size += segment.size
+    if n_turns == 0:
+        return []
     if size > 20 * 1024 * 1024:
         logger.info(
-            "Wire file too large for replay, skipping: {file} ({size} bytes)",
+            "Recent turns too large for replay, skipping: {file} ({size} bytes)",
             file=wire_file.path,
             size=size,
         )
@@ -89,7 +108,7 @@ async def _build_replay_turns_from_wire(wire_file: WireFile | None) -> list[_Rep
 
     turns: deque[_ReplayTurn] = deque(maxlen=MAX_REPLAY_TURNS)
     try:
-        async for record in wire_file.iter_records():
+        async for record in wire_file.iter_records(offset=start, last_segments=n_segments):
             wire_msg = record.to_wire_message()
 
             if isinstance(wire_msg, TurnBegin):
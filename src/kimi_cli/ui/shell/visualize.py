@@ -82,7 +82,13 @@ class _ContentBlock:
     def __init__(self, is_think: bool):
         self.is_think = is_think
         self._spinner = Spinner("dots", "Thinking..." if is_think else "Composing...")
-        self.raw_text = ""
+        self._chunks: list[str] = []
+
+    @property
+    def raw_text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks[:] = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
 
     def compose(self) -> RenderableType:
         return self._spinner
@@ -97,7 +103,7 @@ class _ContentBlock:
         )
 
     def append(self, content: str) -> None:
-        self.raw_text += content
+        self._chunks.append(content)
 
 
 class _ToolCallBlock:
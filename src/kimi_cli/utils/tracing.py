@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from pathlib import Path
+
+from kosong.tracing import AttributeValue, Span, SpanExporter
+
+from kimi_cli.config import TracingConfig
+from kimi_cli.constant import VERSION
+from kimi_cli.utils.aiohttp import new_client_session
+from kimi_cli.utils.logging import logger
+
+TRACES_FILE_NAME = "traces.jsonl"
+
+
+class _BatchingExporter(ABC):
+    """
+    Collect finished spans and deliver them in batches, off the event loop's hot path.
+    A batch is delivered once `max_pending` spans are pending, or at most `flush_interval`
+    seconds after its first span.
+    """
+
+    max_pending: int = 256
+    flush_interval: float = 5.0
+
+    def __init__(self) -> None:
+        self._pending: list[Span] = []
+        self._lock = asyncio.Lock()
+        self._flush_tasks: set[asyncio.Task[None]] = set()
+        self._flush_timer: asyncio.TimerHandle | None = None
+
+    def export(self, span: Span) -> None:
+        self._pending.append(span)
+        if len(self._pending) >= self.max_pending:
+            self._start_flush()
+        elif self._flush_timer is None:
+            loop = asyncio.get_running_loop()
+            self._flush_timer = loop.call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self) -> None:
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        async with self._lock:
+            spans, self._pending = self._pending, []
+            if not spans:
+                return
+            try:
+                await self._deliver(spans)
+            except Exception:
+                logger.exception("Failed to export {n} spans:", n=len(spans))
+
+    @abstractmethod
+    async def _deliver(self, spans: Sequence[Span]) -> None: ...
+
+
+class JsonlSpanExporter(_BatchingExporter):
+    """Append spans to a JSONL file, one `Span.to_dict` object per line."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self.path = path
+
+    async def _deliver(self, spans: Sequence[Span]) -> None:
+        data = "".join(json.dumps(span.to_dict(), ensure_ascii=False) + "\n" for span in spans)
+        await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+
+class OtlpSpanExporter(_BatchingExporter):
+    """Send spans to an OpenTelemetry collector with OTLP/HTTP and JSON encoding."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        *,
+        headers: dict[str, str] | None = None,
+        resource: dict[str, AttributeValue] | None = None,
+    ) -> None:
+        super().__init__()
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self._headers = headers or {}
+        self._resource: dict[str, AttributeValue] = {
+            "service.name": "kimi-cli",
+            "service.version": VERSION,
+            **(resource or {}),
+        }
+
+    async def _deliver(self, spans: Sequence[Span]) -> None:
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes(self._resource)},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "kimi_cli", "version": VERSION},
+                            "spans": [_otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        async with (
+            new_client_session() as session,
+            session.post(self.url, json=payload, headers=self._headers) as response,
+        ):
+            response.raise_for_status()
+
+
+class _FanOutExporter:
+    def __init__(self, exporters: Sequence[SpanExporter]) -> None:
+        self._exporters = exporters
+
+    def export(self, span: Span) -> None:
+        for exporter in self._exporters:
+            exporter.export(span)
+
+    async def flush(self) -> None:
+        await asyncio.gather(*(exporter.flush() for exporter in self._exporters))
+
+
+def create_span_exporter(
+    config: TracingConfig, session_dir: Path, session_id: str
+) -> SpanExporter | None:
+    """Create the exporter configured for a session, or `None` if tracing is disabled."""
+    if not config.enabled:
+        return None
+    exporters: list[SpanExporter] = [JsonlSpanExporter(session_dir / TRACES_FILE_NAME)]
+    if config.otlp_endpoint:
+        exporters.append(
+            OtlpSpanExporter(
+                config.otlp_endpoint,
+                headers=config.otlp_headers,
+                resource={"session.id": session_id},
+            )
+        )
+    return exporters[0] if len(exporters) == 1 else _FanOutExporter(exporters)
+
+
+def _otlp_attributes(attributes: dict[str, AttributeValue]) -> list[dict[str, object]]:
+    result: list[dict[str, object]] = []
+    for key, value in attributes.items():
+        match value:
+            case bool():
+                encoded: dict[str, object] = {"boolValue": value}
+            case int():
+                # 64-bit integers are strings in OTLP JSON
+                encoded = {"intValue": str(value)}
+            case float():
+                encoded = {"doubleValue": value}
+            case str():
+                encoded = {"stringValue": value}
+        result.append({"key": key, "value": encoded})
+    return result
+
+
+_OTLP_STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+
+def _otlp_span(span: Span) -> dict[str, object]:
+    encoded: dict[str, object] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        # SPAN_KIND_INTERNAL
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_time_unix_nano),
+        "endTimeUnixNano": str(span.end_time_unix_nano),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": _OTLP_STATUS_CODES[span.status], "message": span.status_message or ""},
+    }
+    if span.parent_span_id is not None:
+        encoded["parentSpanId"] = span.parent_span_id
+    return encoded
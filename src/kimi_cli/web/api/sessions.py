@@ -31,6 +31,7 @@ from kimi_cli.web.store.sessions import (
     load_all_sessions_cached,
     load_session_by_id,
 )
+from kimi_cli.wire.file import WireFile
 from kimi_cli.wire.jsonrpc import (
     ErrorCodes,
     JSONRPCErrorObject,
@@ -87,39 +88,35 @@ def get_editable_session(
 
 
 async def replay_history(ws: WebSocket, session_dir: Path) -> None:
-    """Replay historical wire messages from wire.jsonl to a WebSocket."""
-    wire_file = session_dir / "wire.jsonl"
-    if not wire_file.exists():
+    """Replay historical wire messages from wire.jsonl and its cold segments to a WebSocket."""
+    wire_file = WireFile(session_dir / "wire.jsonl")
+    if wire_file.is_empty():
         return
 
     try:
-        with open(wire_file, encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
+        async for line in wire_file.iter_lines():
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
                     continue
-                try:
-                    record = json.loads(line)
-                    if not isinstance(record, dict):
-                        continue
-                    record = cast(dict[str, Any], record)
-                    record_type = record.get("type")
-                    if isinstance(record_type, str) and record_type == "metadata":
-                        continue
-                    message_raw = record.get("message")
-                    if not isinstance(message_raw, dict):
-                        continue
-                    message_raw = cast(dict[str, Any], message_raw)
-                    message = deserialize_wire_message(message_raw)
-                    # Convert to JSONRPC event format
-                    event_msg: dict[str, Any] = {
-                        "jsonrpc": "2.0",
-                        "method": "request" if is_request(message) else "event",
-                        "params": message_raw,
-                    }
-                    await ws.send_text(json.dumps(event_msg, ensure_ascii=False))
-                except (json.JSONDecodeError, KeyError, ValueError, TypeError):
+                record = cast(dict[str, Any], record)
+                record_type = record.get("type")
+                if isinstance(record_type, str) and record_type == "metadata":
                     continue
+                message_raw = record.get("message")
+                if not isinstance(message_raw, dict):
+                    continue
+                message_raw = cast(dict[str, Any], message_raw)
+                message = deserialize_wire_message(message_raw)
+                # Convert to JSONRPC event format
+                event_msg: dict[str, Any] = {
+                    "jsonrpc": "2.0",
+                    "method": "request" if is_request(message) else "event",
+                    "params": message_raw,
+                }
+                await ws.send_text(json.dumps(event_msg, ensure_ascii=False))
+            except (json.JSONDecodeError, KeyError, ValueError, TypeError):
+                continue
     except Exception:
         pass
 
@@ -37,15 +37,13 @@ from kimi_cli.wire.jsonrpc import (
     JSONRPCCancelMessage,
     JSONRPCErrorObject,
     JSONRPCErrorResponse,
-    JSONRPCEventMessage,
     JSONRPCInMessage,
     JSONRPCInMessageAdapter,
     JSONRPCOutMessage,
     JSONRPCPromptMessage,
-    JSONRPCRequestMessage,
     JSONRPCSuccessResponse,
+    parse_jsonrpc_response,
 )
-from kimi_cli.wire.serde import deserialize_wire_message
 
 JSONRPCOutMessageAdapter = TypeAdapter[JSONRPCOutMessage](JSONRPCOutMessage)
 
@@ -325,29 +323,15 @@ class SessionProcess:
 
                 await self._broadcast(line.decode("utf-8").rstrip("\n"))
 
-                # Handle out message
+                # Handle out message; only responses matter here, events and requests are
+                # forwarded to the websockets as they are
                 try:
-                    msg = json.loads(line)
-                    match msg.get("method"):
-                        case "event":
-                            msg["params"] = deserialize_wire_message(msg["params"])
-                            await self._handle_out_message(JSONRPCEventMessage.model_validate(msg))
-                        case "request":
-                            msg["params"] = deserialize_wire_message(msg["params"])
-                            await self._handle_out_message(
-                                JSONRPCRequestMessage.model_validate(msg)
-                            )
-                        case _:
-                            if msg.get("error"):
-                                await self._handle_out_message(
-                                    JSONRPCErrorResponse.model_validate(msg)
-                                )
-                            else:
-                                await self._handle_out_message(
-                                    JSONRPCSuccessResponse.model_validate(msg)
-                                )
-                except json.JSONDecodeError:
+                    response = parse_jsonrpc_response(line)
+                except ValueError:
                     logger.error(f"Invalid JSONRPC out message: {line}")
+                    continue
+                if response is not None:
+                    await self._handle_out_message(response)
 
         except asyncio.CancelledError:
             raise
@@ -18,6 +18,7 @@ This design works well when:
 
 from __future__ import annotations
 
+import contextlib
 import time
 from datetime import UTC, datetime
 from pathlib import Path
@@ -29,6 +30,7 @@ from kimi_cli.metadata import load_metadata
 from kimi_cli.session import Session as KimiCLISession
 from kimi_cli.web.models import Session
 from kimi_cli.wire.file import WireFile
+from kimi_cli.wire.segments import first_turn_title
 
 # Cache configuration
 CACHE_TTL = 5.0  # seconds - balance between freshness and performance
@@ -100,36 +102,11 @@ def load_all_sessions() -> list[JointSession]:
                 updated_at=0.0,
             )
 
-            # Derive title from first message by reading wire.jsonl directly
+            # Derive title from the first turn, as indexed next to wire.jsonl
             title = "Untitled"
-            try:
-                import json
-                from textwrap import shorten
-
-                from kosong.message import Message
-
-                wire_file = session_dir / "wire.jsonl"
-                if wire_file.exists():
-                    with open(wire_file, encoding="utf-8") as f:
-                        for line in f:
-                            line = line.strip()
-                            if not line:
-                                continue
-                            try:
-                                record = json.loads(line)
-                                message = record.get("message", {})
-                                if message.get("type") == "TurnBegin":
-                                    user_input = message.get("payload", {}).get("user_input")
-                                    if user_input:
-                                        msg = Message(role="user", content=user_input)
-                                        text = msg.extract_text(" ")
-                                        title = shorten(text, width=300)
-                                        break
-                            except json.JSONDecodeError:
-                                continue
-            except Exception:
-                # Ignore errors reading wire.jsonl - use default title
-                pass
+            # Ignore errors reading wire.jsonl - use default title
+            with contextlib.suppress(Exception):
+                title = first_turn_title(session_dir / "wire.jsonl") or title
 
             kimi_session.title = title
             kimi_session.updated_at = context_file.stat().st_mtime
@@ -4,13 +4,22 @@ import asyncio
 import contextlib
 import copy
 
-from kosong.message import MergeableMixin
+from kosong.message import MergeableMixin, MergeBuffer
 
 from kimi_cli.utils.aioqueue import Queue, QueueShutDown
 from kimi_cli.utils.broadcast import BroadcastQueue
 from kimi_cli.utils.logging import logger
 from kimi_cli.wire.file import WireFile
-from kimi_cli.wire.types import ContentPart, ToolCallPart, WireMessage, is_wire_message
+from kimi_cli.wire.types import (
+    ContentPart,
+    TextPart,
+    ThinkPart,
+    ToolCall,
+    ToolCallPart,
+    TurnEnd,
+    WireMessage,
+    is_wire_message,
+)
 
 WireMessageQueue = BroadcastQueue[WireMessage]
 
@@ -71,7 +80,7 @@ class WireSoulSide:
     def __init__(self, raw_queue: WireMessageQueue, merged_queue: WireMessageQueue):
         self._raw_queue = raw_queue
         self._merged_queue = merged_queue
-        self._merge_buffer: MergeableMixin | None = None
+        self._merge_buffer: MergeBuffer[MergeableMixin] | None = None
 
     def send(self, msg: WireMessage) -> None:
         if not isinstance(msg, ContentPart | ToolCallPart):
@@ -87,23 +96,23 @@ class WireSoulSide:
         match msg:
             case MergeableMixin():
                 if self._merge_buffer is None:
-                    self._merge_buffer = copy.deepcopy(msg)
-                elif self._merge_buffer.merge_in_place(msg):
+                    self._merge_buffer = MergeBuffer(copy.deepcopy(msg))
+                elif self._merge_buffer.merge(msg):
                     pass
                 else:
                     self.flush()
-                    self._merge_buffer = copy.deepcopy(msg)
+                    self._merge_buffer = MergeBuffer(copy.deepcopy(msg))
             case _:
                 self.flush()
                 self._send_merged(msg)
 
     def flush(self) -> None:
-        buffer = self._merge_buffer
-        if buffer is None:
+        if self._merge_buffer is None:
             return
+        buffer = self._merge_buffer.finish()
+        self._merge_buffer = None
         assert is_wire_message(buffer)
         self._send_merged(buffer)
-        self._merge_buffer = None
 
     def _send_merged(self, msg: WireMessage) -> None:
         try:
@@ -127,9 +136,97 @@ class WireUISide:
         return msg
 
 
+class CoalescedWireUISide:
+    """
+    A raw UI side of a `Wire` that coalesces streamed deltas.
+
+    Consecutive mergeable messages are merged for at most `max_delay` seconds after the first
+    of them is received, or until they hold `max_chars` characters of text or arguments. Any
+    other message flushes the merged one before it, so the order of messages is kept.
+    """
+
+    def __init__(self, ui_side: WireUISide, *, max_delay: float, max_chars: int):
+        self._ui_side = ui_side
+        self._max_delay = max_delay
+        self._max_chars = max_chars
+        self._buffer: MergeBuffer[MergeableMixin] | None = None
+        self._buffered_chars = 0
+        self._deadline = 0.0
+        self._next: WireMessage | None = None
+
+    async def receive(self) -> WireMessage:
+        if self._next is not None:
+            msg, self._next = self._next, None
+            return msg
+        while True:
+            try:
+                if self._buffer is None:
+                    msg = await self._ui_side.receive()
+                else:
+                    async with asyncio.timeout_at(self._deadline):
+                        msg = await self._ui_side.receive()
+            except TimeoutError:
+                return self._finish()
+            except QueueShutDown:
+                if self._buffer is None:
+                    raise
+                return self._finish()
+
+            if not isinstance(msg, MergeableMixin):
+                if self._buffer is None:
+                    return msg
+                self._next = msg
+                return self._finish()
+            if self._buffer is None:
+                self._start(msg)
+            elif self._buffer.merge(msg):
+                self._buffered_chars += _delta_chars(msg)
+            else:
+                merged = self._finish()
+                self._start(msg)
+                return merged
+            if self._buffered_chars >= self._max_chars:
+                return self._finish()
+
+    def _start(self, msg: MergeableMixin) -> None:
+        # raw messages are shared with the other subscribers, so merge into a copy
+        self._buffer = MergeBuffer(copy.deepcopy(msg))
+        self._buffered_chars = _delta_chars(msg)
+        self._deadline = asyncio.get_running_loop().time() + self._max_delay
+
+    def _finish(self) -> WireMessage:
+        assert self._buffer is not None
+        merged = self._buffer.finish()
+        self._buffer = None
+        assert is_wire_message(merged)
+        return merged
+
+
+def _delta_chars(msg: MergeableMixin) -> int:
+    match msg:
+        case TextPart():
+            return len(msg.text)
+        case ThinkPart():
+            return len(msg.think)
+        case ToolCall():
+            return len(msg.function.arguments or "")
+        case ToolCallPart():
+            return len(msg.arguments_part or "")
+        case _:
+            return 0
+
+
 class _WireRecorder:
+    """
+    Record merged wire messages to a file. Messages are written in batches: everything queued
+    is staged together, and written at the end of each turn or at most `flush_interval` seconds
+    after being received.
+    """
+
+    flush_interval: float = 0.05
+
     def __init__(self, wire_file: WireFile, queue: Queue[WireMessage]) -> None:
-        self._wire_file = wire_file
+        self._writer = wire_file.open_writer()
         self._task = asyncio.create_task(self._consume_loop(queue))
 
     async def join(self) -> None:
@@ -137,12 +234,38 @@ class _WireRecorder:
             await self._task
 
     async def _consume_loop(self, queue: Queue[WireMessage]) -> None:
-        while True:
-            try:
-                msg = await queue.get()
-                await self._record(msg)
-            except QueueShutDown:
-                break
+        loop = asyncio.get_running_loop()
+        deadline: float | None = None
+        try:
+            while True:
+                try:
+                    if deadline is None:
+                        msg = await queue.get()
+                    else:
+                        async with asyncio.timeout_at(deadline):
+                            msg = await queue.get()
+                except TimeoutError:
+                    await self._writer.flush()
+                    deadline = None
+                    continue
+                except QueueShutDown:
+                    break
+                if deadline is None:
+                    deadline = loop.time() + self.flush_interval
+                turn_ended = self._stage(msg)
+                # drain what is already queued into the same batch
+                while not queue.empty():
+                    try:
+                        turn_ended |= self._stage(queue.get_nowait())
+                    except QueueShutDown:
+                        break
+                if turn_ended:
+                    await self._writer.flush()
+                    deadline = None
+        finally:
+            await self._writer.close()
 
-    async def _record(self, msg: WireMessage) -> None:
-        await self._wire_file.append_message(msg)
+    def _stage(self, msg: WireMessage) -> bool:
+        """Stage a message and return whether it ends a turn."""
+        self._writer.stage(msg)
+        return isinstance(msg, TurnEnd)
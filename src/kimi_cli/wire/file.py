@@ -1,18 +1,32 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import time
 from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Literal
+from typing import BinaryIO, Literal, cast
 
 import aiofiles
 from pydantic import BaseModel, ConfigDict, ValidationError
 
 from kimi_cli.utils.logging import logger
+from kimi_cli.wire.index import WireTurnIndexEntry, load_turn_index, turn_index_path
 from kimi_cli.wire.protocol import WIRE_PROTOCOL_LEGACY_VERSION, WIRE_PROTOCOL_VERSION
-from kimi_cli.wire.types import WireMessage, WireMessageEnvelope
+from kimi_cli.wire.segments import (
+    WireSegment,
+    first_turn_title,
+    load_manifest,
+    open_segment,
+    seal_segment,
+    segment_paths,
+)
+from kimi_cli.wire.serde import dump_wire_message_json
+from kimi_cli.wire.types import TurnBegin, WireMessage, WireMessageEnvelope
+
+DEFAULT_MAX_SEGMENT_BYTES = 16 * 1024 * 1024
+_READ_CHUNK_BYTES = 1024 * 1024
 
 
 class WireFileMetadata(BaseModel):
@@ -58,8 +72,15 @@ def parse_wire_file_line(line: str) -> WireFileMetadata | WireMessageRecord:
 
 @dataclass(slots=True)
 class WireFile:
+    """
+    A wire message log. `path` is its active segment, and older turns are kept in compressed
+    cold segments next to it, see `kimi_cli.wire.segments`.
+    """
+
     path: Path
     protocol_version: str = WIRE_PROTOCOL_VERSION
+    max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES
+    """Size of the active segment past which it is sealed at the next turn."""
 
     def __post_init__(self) -> None:
         if self.path.exists():
@@ -76,6 +97,8 @@ class WireFile:
         return self.protocol_version
 
     def is_empty(self) -> bool:
+        if segment_paths(self.path):
+            return False
         if not self.path.exists():
             return True
         try:
@@ -92,25 +115,61 @@ class WireFile:
             return False
         return True
 
-    async def iter_records(self) -> AsyncIterator[WireMessageRecord]:
+    async def turn_index(self) -> list[WireTurnIndexEntry]:
+        """The turns recorded in the active segment, from its turn index."""
+        return await asyncio.to_thread(load_turn_index, self.path)
+
+    async def segments(self) -> list[WireSegment]:
+        """The cold segments, oldest first."""
+        manifest = await asyncio.to_thread(load_manifest, self.path)
+        return manifest.segments
+
+    async def first_turn_title(self) -> str | None:
+        return await asyncio.to_thread(first_turn_title, self.path)
+
+    async def iter_lines(
+        self, *, offset: int = 0, last_segments: int | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Iterate over the non-empty lines of the cold segments, then of the active segment.
+        With a non-zero `offset`, only the active segment is read, from that byte offset.
+        With `last_segments`, only that many of the most recent cold segments are read.
+        """
+        if offset == 0 and last_segments != 0:
+            segment_paths_ = await asyncio.to_thread(segment_paths, self.path)
+            if last_segments is not None:
+                segment_paths_ = segment_paths_[-last_segments:]
+            for segment_path in segment_paths_:
+                f = await asyncio.to_thread(open_segment, segment_path)
+                try:
+                    while lines := await asyncio.to_thread(f.readlines, _READ_CHUNK_BYTES):
+                        for raw_line in lines:
+                            if line := raw_line.decode("utf-8").strip():
+                                yield line
+                finally:
+                    await asyncio.to_thread(f.close)
         if not self.path.exists():
             return
+        async with aiofiles.open(self.path, mode="rb") as f:
+            await f.seek(offset)
+            async for raw_line in f:
+                if line := raw_line.decode("utf-8").strip():
+                    yield line
+
+    async def iter_records(
+        self, *, offset: int = 0, last_segments: int | None = None
+    ) -> AsyncIterator[WireMessageRecord]:
+        """Iterate over the message records, see `iter_lines`."""
         try:
-            async with aiofiles.open(self.path, encoding="utf-8") as f:
-                async for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        parsed = parse_wire_file_line(line)
-                    except Exception:
-                        logger.exception(
-                            "Failed to parse line in wire file {file}:", file=self.path
-                        )
-                        continue
-                    if isinstance(parsed, WireFileMetadata):
-                        continue
-                    yield parsed
+            async for line in self.iter_lines(offset=offset, last_segments=last_segments):
+                try:
+                    parsed = parse_wire_file_line(line)
+                except Exception:
+                    logger.exception("Failed to parse line in wire file {file}:", file=self.path)
+                    continue
+                if isinstance(parsed, WireFileMetadata):
+                    continue
+                yield parsed
         except Exception:
             logger.exception("Failed to read wire file {file}:", file=self.path)
 
@@ -121,6 +180,10 @@ class WireFile:
         )
         await self.append_record(record)
 
+    def open_writer(self) -> WireFileWriter:
+        """Open a long-lived writer appending records to this file."""
+        return WireFileWriter(self.path, self.protocol_version, self.max_segment_bytes)
+
     async def append_record(self, record: WireMessageRecord) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         needs_header = not self.path.exists() or self.path.stat().st_size == 0
@@ -131,10 +194,136 @@ class WireFile:
             await f.write(_dump_line(record))
 
 
+class WireFileWriter:
+    """
+    A long-lived append handle for a wire file and its turn index.
+    Staged records are written with a single write call when flushed, and the active segment
+    is sealed before the first turn that begins past `max_segment_bytes`.
+    """
+
+    def __init__(self, path: Path, protocol_version: str, max_segment_bytes: int):
+        self._path = path
+        self._protocol_version = protocol_version
+        self._max_segment_bytes = max_segment_bytes
+        self._file: BinaryIO | None = None
+        self._index_file: BinaryIO | None = None
+        # `None` marks where the active segment is sealed
+        self._pending: list[bytes | None] = []
+        self._pending_index: list[bytes | None] = []
+        self._size: int | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def size(self) -> int:
+        """Size of the active segment in bytes, including staged records."""
+        if self._size is None:
+            size = self._path.stat().st_size if self._path.exists() else 0
+            if size == 0:
+                # the header is only checked once, before the first record
+                self._start_segment()
+            else:
+                self._size = size
+        assert self._size is not None
+        return self._size
+
+    def stage(self, msg: WireMessage, *, timestamp: float | None = None) -> None:
+        # serialize right away, since the message may be modified once handed back
+        line = _dump_record_line(
+            msg,
+            timestamp=time.time() if timestamp is None else timestamp,
+        )
+        if isinstance(msg, TurnBegin) and self.size >= self._max_segment_bytes:
+            self._pending.append(None)
+            self._pending_index.append(None)
+            self._start_segment()
+        offset = self._stage_line(line)
+        if (entry := WireTurnIndexEntry.from_wire_message(msg, offset)) is not None:
+            self._pending_index.append(entry.dump_line())
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, pending_index = self._pending[:], self._pending_index[:]
+            await asyncio.to_thread(self._write, pending, pending_index)
+            # records staged while writing are kept for the next flush
+            del self._pending[: len(pending)]
+            del self._pending_index[: len(pending_index)]
+
+    async def close(self) -> None:
+        await self.flush()
+        async with self._lock:
+            files = [f for f in (self._file, self._index_file) if f is not None]
+            self._file = self._index_file = None
+            self._size = None
+            for file in files:
+                await asyncio.to_thread(file.close)
+
+    def _start_segment(self) -> None:
+        metadata = WireFileMetadata(protocol_version=self._protocol_version)
+        header = _dump_line(metadata).encode("utf-8")
+        self._pending.append(header)
+        self._size = len(header)
+
+    def _stage_line(self, line: bytes) -> int:
+        offset = self.size
+        self._pending.append(line)
+        self._size = offset + len(line)
+        return offset
+
+    def _write(self, pending: list[bytes | None], pending_index: list[bytes | None]) -> None:
+        segments = zip(_split_segments(pending), _split_segments(pending_index), strict=True)
+        for i, (data, index_data) in enumerate(segments):
+            if i > 0:
+                self._seal()
+            self._append(data, index_data)
+
+    def _append(self, data: bytes, index_data: bytes) -> None:
+        if not data:
+            return
+        if self._file is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            # bring the index up to date with what is on disk before appending to both
+            load_turn_index(self._path, rewrite=True)
+            self._file = open(self._path, "ab")  # noqa: SIM115
+        self._file.write(data)
+        self._file.flush()
+        if index_data:
+            if self._index_file is None:
+                self._index_file = open(turn_index_path(self._path), "ab")  # noqa: SIM115
+            self._index_file.write(index_data)
+            self._index_file.flush()
+
+    def _seal(self) -> None:
+        for file in (self._file, self._index_file):
+            if file is not None:
+                file.close()
+        self._file = self._index_file = None
+        logger.debug("Sealing wire segment: {file}", file=self._path)
+        seal_segment(self._path)
+
+
+def _split_segments(pending: list[bytes | None]) -> list[bytes]:
+    segments: list[bytes] = []
+    start = 0
+    for i, data in enumerate(pending):
+        if data is None:
+            segments.append(b"".join(cast(list[bytes], pending[start:i])))
+            start = i + 1
+    segments.append(b"".join(cast(list[bytes], pending[start:])))
+    return segments
+
+
 def _dump_line(model: BaseModel) -> str:
     return json.dumps(model.model_dump(mode="json"), ensure_ascii=False) + "\n"
 
 
+def _dump_record_line(msg: WireMessage, *, timestamp: float) -> bytes:
+    """The line of a `WireMessageRecord`, serialized in a single pass over the message."""
+    message = dump_wire_message_json(msg)
+    return b'{"timestamp":%s,"message":%s}\n' % (json.dumps(timestamp).encode(), message)
+
+
 def _load_protocol_version(path: Path) -> str | None:
     try:
         with path.open(encoding="utf-8") as f:
@@ -0,0 +1,161 @@
+"""
+A sidecar index of the turns in a wire file, so that recent turns and the session title can be
+found without reading the whole file.
+
+The index lives next to the wire file as `<stem>.index.jsonl`, with one entry per `TurnBegin`
+and `TurnEnd` record. It is appended to by `WireFileWriter` as turns are recorded. Loading it
+checks the last entry against the wire file and catches up with any turns recorded after it, so
+a missing, stale or foreign index is rebuilt transparently.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from textwrap import shorten
+from typing import IO, Any, Literal, cast
+
+from kosong.message import Message
+
+from kimi_cli.utils.logging import logger
+from kimi_cli.wire.types import TurnBegin, TurnEnd, WireMessage
+
+TITLE_MAX_WIDTH = 300
+
+_TURN_MARKERS = (b'"TurnBegin"', b'"TurnEnd"')
+
+
+@dataclass(frozen=True, slots=True)
+class WireTurnIndexEntry:
+    """Where a turn begins or ends in a wire file."""
+
+    kind: Literal["begin", "end"]
+    offset: int
+    """Byte offset of the `TurnBegin` or `TurnEnd` record in the wire file."""
+    title: str | None = None
+    """The shortened user input of the turn, for `begin` entries."""
+
+    @staticmethod
+    def from_wire_message(msg: WireMessage, offset: int) -> WireTurnIndexEntry | None:
+        match msg:
+            case TurnBegin():
+                return WireTurnIndexEntry("begin", offset, _turn_title(msg))
+            case TurnEnd():
+                return WireTurnIndexEntry("end", offset)
+            case _:
+                return None
+
+    def dump_line(self) -> bytes:
+        data: dict[str, object] = {"kind": self.kind, "offset": self.offset}
+        if self.title is not None:
+            data["title"] = self.title
+        return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def turn_index_path(wire_path: Path) -> Path:
+    return wire_path.with_name(f"{wire_path.stem}.index.jsonl")
+
+
+def load_turn_index(wire_path: Path, *, rewrite: bool = False) -> list[WireTurnIndexEntry]:
+    """
+    Load the turn index of a wire file, bringing it up to date with the wire file.
+
+    The index file is created if it is missing. An existing one is only replaced with
+    `rewrite=True`, which the writer of the wire file uses before appending to it.
+    """
+    if not wire_path.exists():
+        return []
+    index_path = turn_index_path(wire_path)
+    stored = _read_index(index_path)
+    entries = list(stored or [])
+    if entries and not _entry_matches(wire_path, entries[-1]):
+        logger.debug("Rebuilding stale wire turn index: {file}", file=index_path)
+        entries = []
+    try:
+        entries.extend(_scan_turns(wire_path, entries[-1] if entries else None))
+    except OSError:
+        logger.exception("Failed to read wire file {file}:", file=wire_path)
+        return entries
+    if entries != stored and (stored is None or rewrite):
+        _write_index(index_path, entries)
+    return entries
+
+
+def _turn_title(msg: TurnBegin) -> str:
+    text = Message(role="user", content=msg.user_input).extract_text(" ")
+    return shorten(text, width=TITLE_MAX_WIDTH)
+
+
+def _read_index(index_path: Path) -> list[WireTurnIndexEntry] | None:
+    try:
+        with index_path.open(encoding="utf-8") as f:
+            return [WireTurnIndexEntry(**json.loads(line)) for line in f if line.strip()]
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_index(index_path: Path, entries: list[WireTurnIndexEntry]) -> None:
+    tmp_path = index_path.with_name(f"{index_path.name}.tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            f.write(b"".join(entry.dump_line() for entry in entries))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        logger.exception("Failed to write wire turn index {file}:", file=index_path)
+
+
+def _record_message(line: bytes) -> dict[str, Any] | None:
+    """The message envelope of a wire file line, if the line is a message record."""
+    try:
+        message = json.loads(line)["message"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return cast(dict[str, Any], message) if isinstance(message, dict) else None
+
+
+def _entry_matches(wire_path: Path, entry: WireTurnIndexEntry) -> bool:
+    try:
+        with wire_path.open("rb") as f:
+            f.seek(entry.offset)
+            line = f.readline()
+    except OSError:
+        return False
+    message = _record_message(line)
+    expected = "TurnBegin" if entry.kind == "begin" else "TurnEnd"
+    return message is not None and message.get("type") == expected
+
+
+def _scan_turns(wire_path: Path, last: WireTurnIndexEntry | None) -> list[WireTurnIndexEntry]:
+    """Find the turns recorded after the `last` indexed one, or all of them."""
+    with wire_path.open("rb") as f:
+        if last is None:
+            return scan_turns(f)
+        f.seek(last.offset)
+        return scan_turns(f, offset=last.offset + len(f.readline()))
+
+
+def scan_turns(f: IO[bytes], *, offset: int = 0) -> list[WireTurnIndexEntry]:
+    """Find the turns in a wire file read from its current position, at byte `offset`."""
+    entries: list[WireTurnIndexEntry] = []
+    for line in f:
+        line_offset, offset = offset, offset + len(line)
+        # only parse the lines that may be turn boundaries
+        if not any(marker in line for marker in _TURN_MARKERS) or not line.endswith(b"\n"):
+            continue
+        message = _record_message(line)
+        if message is None:
+            continue
+        match message.get("type"):
+            case "TurnBegin":
+                try:
+                    msg = TurnBegin.model_validate(message["payload"])
+                except (ValueError, KeyError):
+                    continue
+                entries.append(WireTurnIndexEntry("begin", line_offset, _turn_title(msg)))
+            case "TurnEnd":
+                entries.append(WireTurnIndexEntry("end", line_offset))
+            case _:
+                pass
+    return entries
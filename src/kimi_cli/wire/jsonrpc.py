@@ -1,18 +1,20 @@
 from __future__ import annotations
 
+import json
 from typing import Any, Literal
 
 from kosong.utils.typing import JsonType
 from pydantic import (
     BaseModel,
     ConfigDict,
+    Field,
     TypeAdapter,
     field_serializer,
     field_validator,
     model_serializer,
 )
 
-from kimi_cli.wire.serde import serialize_wire_message
+from kimi_cli.wire.serde import dump_wire_message_json, serialize_wire_message
 from kimi_cli.wire.types import (
     ContentPart,
     Event,
@@ -82,11 +84,21 @@ class ExternalTool(BaseModel):
     parameters: dict[str, JsonType]
 
 
+class DeltaCoalescing(BaseModel):
+    """Coalescing of streamed content and tool call deltas into fewer events."""
+
+    max_delay_ms: float = Field(default=30, ge=0)
+    """How long a delta may be held back to merge the following ones into it."""
+    max_chars: int = Field(default=4096, gt=0)
+    """How many characters of text or arguments a merged delta may hold."""
+
+
 class JSONRPCInitializeMessage(_MessageBase):
     class Params(BaseModel):
         protocol_version: str
         client: ClientInfo | None = None
         external_tools: list[ExternalTool] | None = None
+        delta_coalescing: DeltaCoalescing | None = None
 
     method: Literal["initialize"] = "initialize"
     id: str
@@ -169,6 +181,47 @@ type JSONRPCOutMessage = (
 JSONRPC_OUT_METHODS = {"event", "request"}
 
 
+def dump_jsonrpc_message(msg: JSONRPCOutMessage) -> bytes:
+    """
+    Serialize an outbound JSON-RPC message to JSON.
+
+    Events and requests, which make up most of the traffic, are serialized with
+    `dump_wire_message_json` instead of going through the generic model serializer.
+    """
+    match msg:
+        case JSONRPCEventMessage():
+            params = dump_wire_message_json(msg.params)
+            return b'{"jsonrpc":"2.0","method":"event","params":%s}' % params
+        case JSONRPCRequestMessage():
+            params = dump_wire_message_json(msg.params)
+            msg_id = json.dumps(msg.id, ensure_ascii=False).encode()
+            return b'{"jsonrpc":"2.0","method":"request","id":%s,"params":%s}' % (msg_id, params)
+        case _:
+            return msg.model_dump_json().encode("utf-8")
+
+
+class _JSONRPCOutMessageHead(_MessageBase):
+    method: str | None = None
+    error: dict[str, Any] | None = None
+
+
+def parse_jsonrpc_response(
+    data: str | bytes,
+) -> JSONRPCSuccessResponse | JSONRPCErrorResponse | None:
+    """
+    Parse an outbound JSON-RPC message if it is a response; return None for events and requests.
+
+    Raises:
+        ValueError: If the data is not a valid JSON-RPC message.
+    """
+    head = _JSONRPCOutMessageHead.model_validate_json(data)
+    if head.method is not None:
+        return None
+    if head.error:
+        return JSONRPCErrorResponse.model_validate_json(data)
+    return JSONRPCSuccessResponse.model_validate_json(data)
+
+
 class ErrorCodes:
     # Predefined JSON-RPC 2.0 error codes
     PARSE_ERROR = -32700
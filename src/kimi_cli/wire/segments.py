@@ -0,0 +1,163 @@
+"""
+Cold segments of a wire file.
+
+A wire file is written as a sequence of segments. The active segment is the wire file itself,
+e.g. `wire.jsonl`. Once it grows past `WireFile.max_segment_bytes`, it is sealed at the next
+turn boundary: renamed to `wire.000001.jsonl`, compressed to `wire.000001.jsonl.gz`, and a
+new active segment is started. Each segment starts with its own metadata header.
+
+`wire.manifest.json` lists the cold segments in order, with their number of turns and the title
+of their first turn, so that the session title is known without decompressing anything. The
+segment files on disk are the source of truth: the manifest is reconciled with them on load,
+which also recovers from a crash in the middle of sealing a segment.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+from pathlib import Path
+from typing import IO, cast
+
+from pydantic import BaseModel, ValidationError
+
+from kimi_cli.utils.logging import logger
+from kimi_cli.wire.index import load_turn_index, scan_turns, turn_index_path
+
+COMPRESSED_SUFFIX = ".gz"
+
+
+class WireSegment(BaseModel):
+    """A sealed segment of a wire file."""
+
+    name: str
+    """File name of the segment, compressed or not."""
+    n_turns: int
+    title: str | None = None
+    """The title of the first turn in the segment."""
+    size: int
+    """Size of the uncompressed segment in bytes."""
+
+
+class WireManifest(BaseModel):
+    """The cold segments of a wire file, oldest first."""
+
+    segments: list[WireSegment] = []
+
+
+def manifest_path(wire_path: Path) -> Path:
+    return wire_path.with_name(f"{wire_path.stem}.manifest.json")
+
+
+def load_manifest(wire_path: Path) -> WireManifest:
+    """Load the manifest of a wire file, reconciled with the segment files on disk."""
+    path = manifest_path(wire_path)
+    try:
+        stored = WireManifest.model_validate_json(path.read_bytes())
+    except (OSError, ValidationError):
+        stored = None
+    known = {segment.name: segment for segment in stored.segments} if stored else {}
+
+    manifest = WireManifest()
+    for segment_path in _segment_files(wire_path):
+        segment = known.get(segment_path.name)
+        if segment is None:
+            logger.debug("Indexing wire segment: {file}", file=segment_path)
+            segment = _describe_segment(segment_path)
+        manifest.segments.append(segment)
+    if manifest != stored and (stored is not None or manifest.segments):
+        _write_manifest(path, manifest)
+    return manifest
+
+
+def segment_paths(wire_path: Path) -> list[Path]:
+    """The paths of the cold segments of a wire file, oldest first."""
+    return [wire_path.with_name(segment.name) for segment in load_manifest(wire_path).segments]
+
+
+def open_segment(path: Path) -> IO[bytes]:
+    """Open a segment for reading, decompressing it if needed."""
+    if path.suffix == COMPRESSED_SUFFIX:
+        return cast(IO[bytes], gzip.open(path, "rb"))
+    return path.open("rb")
+
+
+def first_turn_title(wire_path: Path) -> str | None:
+    """The title of the first turn recorded in a wire file, across its segments."""
+    for segment in load_manifest(wire_path).segments:
+        if segment.title is not None:
+            return segment.title
+    for entry in load_turn_index(wire_path):
+        if entry.title is not None:
+            return entry.title
+    return None
+
+
+def seal_segment(wire_path: Path) -> None:
+    """
+    Turn the active segment of a wire file into a compressed cold segment.
+    The active segment must not be open for writing.
+    """
+    if not wire_path.exists() or wire_path.stat().st_size == 0:
+        return
+    begins = [entry for entry in load_turn_index(wire_path) if entry.kind == "begin"]
+    manifest = load_manifest(wire_path)
+    last_name = manifest.segments[-1].name if manifest.segments else None
+    number = int(last_name.removesuffix(COMPRESSED_SUFFIX).split(".")[-2]) + 1 if last_name else 1
+    segment_path = wire_path.with_name(f"{wire_path.stem}.{number:06d}{wire_path.suffix}")
+    segment = WireSegment(
+        name=segment_path.name + COMPRESSED_SUFFIX,
+        n_turns=len(begins),
+        title=begins[0].title if begins else None,
+        size=wire_path.stat().st_size,
+    )
+
+    # renaming the active segment seals it; the rest can be redone by `load_manifest`
+    os.replace(wire_path, segment_path)
+    turn_index_path(wire_path).unlink(missing_ok=True)
+    try:
+        compressed_path = wire_path.with_name(segment.name)
+        tmp_path = compressed_path.with_name(f"{compressed_path.name}.tmp")
+        with segment_path.open("rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, compressed_path)
+        segment_path.unlink()
+    except OSError:
+        logger.exception("Failed to compress wire segment {file}:", file=segment_path)
+        segment = segment.model_copy(update={"name": segment_path.name})
+    manifest.segments.append(segment)
+    _write_manifest(manifest_path(wire_path), manifest)
+
+
+def _segment_files(wire_path: Path) -> list[Path]:
+    """The segment files next to a wire file, oldest first, preferring compressed ones."""
+    pattern = f"{wire_path.stem}.[0-9][0-9][0-9][0-9][0-9][0-9]{wire_path.suffix}"
+    by_name: dict[str, Path] = {}
+    for path in [*wire_path.parent.glob(pattern), *wire_path.parent.glob(pattern + ".gz")]:
+        name = path.name.removesuffix(COMPRESSED_SUFFIX)
+        if name not in by_name or path.suffix == COMPRESSED_SUFFIX:
+            by_name[name] = path
+    return [by_name[name] for name in sorted(by_name)]
+
+
+def _describe_segment(path: Path) -> WireSegment:
+    n_turns, title, size = 0, None, 0
+    try:
+        with open_segment(path) as f:
+            begins = [entry for entry in scan_turns(f) if entry.kind == "begin"]
+            size = f.tell()
+        n_turns = len(begins)
+        title = begins[0].title if begins else None
+    except (OSError, EOFError):
+        logger.exception("Failed to read wire segment {file}:", file=path)
+    return WireSegment(name=path.name, n_turns=n_turns, title=title, size=size)
+
+
+def _write_manifest(path: Path, manifest: WireManifest) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        tmp_path.write_text(manifest.model_dump_json(indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.exception("Failed to write wire manifest {file}:", file=path)
@@ -4,7 +4,7 @@ from typing import Any
 
 from kosong.utils.typing import JsonType
 
-from kimi_cli.wire.types import WireMessage, WireMessageEnvelope
+from kimi_cli.wire.types import WireMessage, WireMessageEnvelope, wire_message_type_name
 
 
 def serialize_wire_message(msg: WireMessage) -> dict[str, JsonType]:
@@ -15,6 +15,17 @@ def serialize_wire_message(msg: WireMessage) -> dict[str, JsonType]:
     return envelope.model_dump(mode="json")
 
 
+def dump_wire_message_json(msg: WireMessage) -> bytes:
+    """
+    Serialize a `WireMessage` into the JSON of its envelope.
+
+    This is equivalent to `json.dumps(serialize_wire_message(msg))`, but the message is
+    serialized straight to JSON in a single pass, without building the intermediate dict.
+    """
+    payload = msg.__pydantic_serializer__.to_json(msg)
+    return b'{"type":"%s","payload":%s}' % (wire_message_type_name(type(msg)).encode(), payload)
+
+
 def deserialize_wire_message(data: dict[str, JsonType] | Any) -> WireMessage:
     """
     Convert a jsonifiable dict into a `WireMessage`.
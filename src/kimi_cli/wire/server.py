@@ -18,11 +18,12 @@ from kimi_cli.soul.toolset import KimiToolset, WireExternalTool
 from kimi_cli.utils.aioqueue import Queue, QueueShutDown
 from kimi_cli.utils.logging import logger
 from kimi_cli.utils.signals import install_sigint_handler
-from kimi_cli.wire import Wire
+from kimi_cli.wire import CoalescedWireUISide, Wire, WireUISide
 from kimi_cli.wire.types import ApprovalRequest, ApprovalResponse, Request, ToolCallRequest
 
 from .jsonrpc import (
     ClientInfo,
+    DeltaCoalescing,
     ErrorCodes,
     JSONRPCCancelMessage,
     JSONRPCErrorObject,
@@ -38,6 +39,7 @@ from .jsonrpc import (
     JSONRPCRequestMessage,
     JSONRPCSuccessResponse,
     Statuses,
+    dump_jsonrpc_message,
 )
 
 # Maximum buffer size for the asyncio StreamReader used for stdio.
@@ -66,6 +68,8 @@ class WireServer:
         self._cancel_event: asyncio.Event | None = None
         self._pending_requests: dict[str, Request] = {}
         """Maps JSON RPC message IDs to pending `Request`s."""
+        self._delta_coalescing: DeltaCoalescing | None = None
+        """Coalescing of streamed deltas, as negotiated by the client in `initialize`."""
 
     async def serve(self) -> None:
         logger.info("Starting Wire server on stdio")
@@ -116,7 +120,7 @@ class WireServer:
                 except QueueShutDown:
                     logger.debug("Send queue shut down, stopping Wire server write loop")
                     break
-                self._writer.write(msg.model_dump_json().encode("utf-8") + b"\n")
+                self._writer.write(dump_jsonrpc_message(msg) + b"\n")
                 await self._writer.drain()
         except asyncio.CancelledError:
             raise
@@ -353,6 +357,10 @@ class WireServer:
                 },
             )
 
+        self._delta_coalescing = msg.params.delta_coalescing
+        if self._delta_coalescing is not None:
+            result["delta_coalescing"] = self._delta_coalescing.model_dump(mode="json")
+
         self._apply_wire_client_info(msg.params.client)
 
         return JSONRPCSuccessResponse(
@@ -519,7 +527,13 @@ class WireServer:
                 request.resolve(tool_result.return_value)
 
     async def _stream_wire_messages(self, wire: Wire) -> None:
-        wire_ui = wire.ui_side(merge=False)
+        wire_ui: WireUISide | CoalescedWireUISide = wire.ui_side(merge=False)
+        if (coalescing := self._delta_coalescing) is not None:
+            wire_ui = CoalescedWireUISide(
+                wire_ui,
+                max_delay=coalescing.max_delay_ms / 1000,
+                max_chars=coalescing.max_chars,
+            )
         while True:
             msg = await wire_ui.receive()
             match msg:
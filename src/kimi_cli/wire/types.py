@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 from typing import Any, Literal, TypeGuard, cast
 
 from kosong.chat_provider import TokenUsage
@@ -17,8 +18,10 @@ from kosong.message import (
 from kosong.tooling import (
     BriefDisplayBlock,
     DisplayBlock,
+    ToolCallStats,
     ToolResult,
     ToolReturnValue,
+    ToolStatsSummary,
     UnknownDisplayBlock,
 )
 from kosong.utils.typing import JsonType
@@ -100,6 +103,23 @@ class StatusUpdate(BaseModel):
     """The token usage statistics of the current step."""
     message_id: str | None = None
     """The message ID of the current step."""
+    tool_stats: dict[str, ToolStatsSummary] | None = None
+    """The execution statistics of the tools called in the session, by tool name."""
+    retry_ms: float | None = None
+    """Time spent in failed attempts and retry backoff before the step's LLM call succeeded, in
+    milliseconds."""
+    ttft_ms: float | None = None
+    """Time to the first streamed part of the step's LLM response, in milliseconds."""
+    stream_ms: float | None = None
+    """Time from the first streamed part to the end of the step's LLM response, in milliseconds."""
+    output_tokens_per_second: float | None = None
+    """Output tokens per second while the step's LLM response was streaming."""
+    tool_ms: float | None = None
+    """Time spent waiting for the step's tool calls after the LLM response ended, in
+    milliseconds."""
+    persist_ms: float | None = None
+    """Time spent appending the step to the context until it is written to the context file,
+    in milliseconds."""
 
 
 class SubagentEvent(BaseModel):
@@ -307,20 +327,23 @@ _NAME_TO_WIRE_MESSAGE_TYPE: dict[str, type[WireMessage]] = {
 _NAME_TO_WIRE_MESSAGE_TYPE["ApprovalRequestResolved"] = ApprovalResponse
 
 
+@functools.cache
+def wire_message_type_name(msg_type: type[WireMessage]) -> str:
+    """The name of a `WireMessage` type in the message envelope."""
+    for name, typ in _NAME_TO_WIRE_MESSAGE_TYPE.items():
+        if issubclass(msg_type, typ):
+            return name
+    raise AssertionError(f"Unknown wire message type: {msg_type}")
+
+
 class WireMessageEnvelope(BaseModel):
     type: str
     payload: dict[str, JsonType]
 
     @classmethod
     def from_wire_message(cls, msg: WireMessage) -> WireMessageEnvelope:
-        typename: str | None = None
-        for name, typ in _NAME_TO_WIRE_MESSAGE_TYPE.items():
-            if issubclass(type(msg), typ):
-                typename = name
-                break
-        assert typename is not None, f"Unknown wire message type: {type(msg)}"
         return cls(
-            type=typename,
+            type=wire_message_type_name(type(msg)),
             payload=msg.model_dump(mode="json"),
         )
 
@@ -355,8 +378,10 @@ __all__ = [
     "ToolCallRequest",
     # helpers
     "WireMessageEnvelope",
+    "wire_message_type_name",
     # `StatusUpdate`-related
     "TokenUsage",
+    "ToolStatsSummary",
     # `ContentPart` types
     "TextPart",
     "ThinkPart",
@@ -365,6 +390,7 @@ __all__ = [
     "VideoURLPart",
     # `ToolResult`-related
     "ToolReturnValue",
+    "ToolCallStats",
     # `DisplayBlock` types
     "DisplayBlock",
     "UnknownDisplayBlock",
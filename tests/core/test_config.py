@@ -38,7 +38,12 @@ def test_default_config_dump():
                 "max_retries_per_step": 3,
                 "max_ralph_iterations": 0,
                 "reserved_context_size": 50000,
+                "background_compaction_ratio": 0.8,
+                "compaction_strategy": "elision",
             },
+            "context": {"sync_mode": "none"},
+            "tool_concurrency": {"write": 8, "process": 4, "network": 8},
+            "tracing": {"enabled": False, "otlp_endpoint": None, "otlp_headers": None},
             "services": {"moonshot_search": None, "moonshot_fetch": None},
             "mcp": {"client": {"tool_call_timeout_ms": 60000}},
         }
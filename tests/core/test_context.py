@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from inline_snapshot import snapshot
+from kosong.chat_provider.conversion_cache import MessageConversionCache
+from kosong.message import Message
+
+from kimi_cli.soul.blobs import PINS_FILE_NAME
+from kimi_cli.soul.context import Context
+from kimi_cli.wire.types import ImageURLPart, TextPart
+
+
+def _read_roles(path: Path) -> list[str]:
+    return [json.loads(line)["role"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+async def test_context_roundtrip_through_restore(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path)
+    await context.checkpoint(add_user_message=False)
+    await context.append_message(Message(role="user", content=[TextPart(text="Hello")]))
+    await context.update_token_count(42)
+    await context.close()
+
+    restored = Context(path)
+    assert await restored.restore()
+    assert restored.history == snapshot([Message(role="user", content=[TextPart(text="Hello")])])
+    assert restored.token_count == 42
+    assert restored.n_checkpoints == 1
+
+
+async def test_context_batch_defers_writes_until_commit(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path)
+
+    async with context.batch():
+        await context.checkpoint(add_user_message=False)
+        async with context.batch():
+            await context.append_message(Message(role="user", content="Hello"))
+        assert not path.exists()
+        await context.update_token_count(10)
+        assert not path.exists()
+
+    assert _read_roles(path) == snapshot(["_checkpoint", "user", "_usage"])
+    await context.close()
+
+
+async def test_context_batch_commits_on_error(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path)
+
+    try:
+        async with context.batch():
+            await context.append_message(Message(role="user", content="Hello"))
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert _read_roles(path) == snapshot(["user"])
+    await context.close()
+
+
+async def test_context_sync_mode_always_writes_through_batch(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path, sync_mode="always")
+
+    async with context.batch():
+        await context.append_message(Message(role="user", content="Hello"))
+        assert _read_roles(path) == snapshot(["user"])
+    await context.close()
+
+
+async def test_context_revert_flushes_pending_batch(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path, sync_mode="per-step")
+
+    async with context.batch():
+        await context.checkpoint(add_user_message=False)
+        await context.append_message(Message(role="user", content="first"))
+        await context.checkpoint(add_user_message=False)
+        await context.append_message(Message(role="user", content="second"))
+        await context.revert_to(1)
+        await context.append_message(Message(role="user", content="third"))
+
+    assert [message.extract_text() for message in context.history] == snapshot(["first", "third"])
+    assert _read_roles(path) == snapshot(["_checkpoint", "user", "user"])
+    assert _read_roles(tmp_path / "context_1.jsonl") == snapshot(
+        ["_checkpoint", "user", "_checkpoint", "user"]
+    )
+
+    await context.close()
+    await context.append_message(Message(role="user", content="after close"))
+    await context.close()
+    assert _read_roles(path) == snapshot(["_checkpoint", "user", "user", "user"])
+
+
+async def _build_context_with_checkpoints(path: Path) -> Context:
+    context = Context(path)
+    for i in range(3):
+        await context.checkpoint(add_user_message=False)
+        await context.append_message(Message(role="user", content=f"question {i}"))
+        await context.append_message(Message(role="assistant", content=f"answer {i}"))
+        await context.update_token_count(100 * (i + 1))
+    await context.close()
+    return context
+
+
+async def test_context_indexes_checkpoints(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = await _build_context_with_checkpoints(path)
+    restored = Context(path)
+    assert await restored.restore()
+
+    entries = context._checkpoints  # pyright: ignore[reportPrivateUsage]
+    assert [(entry.id, entry.n_messages, entry.token_count) for entry in entries] == snapshot(
+        [(0, 0, 0), (1, 2, 100), (2, 4, 200)]
+    )
+    assert restored._checkpoints == entries  # pyright: ignore[reportPrivateUsage]
+    with path.open("rb") as f:
+        data = f.read()
+    for entry in entries:
+        line = data[entry.offset :].split(b"\n", 1)[0]
+        assert json.loads(line) == {"role": "_checkpoint", "id": entry.id}
+
+
+async def test_context_estimates_tokens_not_yet_reported(tmp_path: Path):
+    context = Context(tmp_path / "context.jsonl")
+    await context.append_message(Message(role="user", content="a" * 400))
+    assert context.token_count == 0
+    assert context.estimated_token_count == snapshot(104)
+
+    await context.update_token_count(120)
+    assert context.estimated_token_count == 120
+
+    # the reported growth calibrates the estimates of the following messages
+    await context.append_message(Message(role="tool", content="b" * 800, tool_call_id="1"))
+    await context.update_token_count(120 + 204 * 2)
+    await context.append_message(Message(role="tool", content="c" * 800, tool_call_id="2"))
+    assert context.estimated_token_count == snapshot(528 + round(204 * 1.3))
+
+    await context.checkpoint(add_user_message=False)
+    await context.append_message(Message(role="user", content="d" * 400))
+    await context.close()
+
+    restored = Context(tmp_path / "context.jsonl")
+    assert await restored.restore()
+    assert restored.token_count == 528
+    assert restored.estimated_token_count == snapshot(528 + 204 + 104)
+
+    await restored.revert_to(0)
+    assert restored.estimated_token_count == 528 + 204
+
+
+async def test_context_calibrates_tokens_per_model(tmp_path: Path):
+    context = Context(tmp_path / "context.jsonl")
+    await context.append_message(Message(role="user", content="a" * 400))
+    await context.update_token_count(120, model="kimi")
+    await context.append_message(Message(role="tool", content="b" * 800, tool_call_id="1"))
+    await context.update_token_count(120 + 204 * 2, model="kimi")
+    await context.append_message(Message(role="tool", content="c" * 800, tool_call_id="2"))
+    assert context.estimated_token_count == snapshot(528 + round(204 * 1.3))
+
+    # the growth since the count of another model is not a sample of either tokenizer
+    await context.update_token_count(528 + 100, model="claude")
+    await context.append_message(Message(role="tool", content="d" * 800, tool_call_id="3"))
+    assert context.estimated_token_count == 628 + 204
+    assert context.token_calibration.ratio("claude") == 1.0
+
+
+async def test_context_revert_matches_restored_file(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = await _build_context_with_checkpoints(path)
+
+    await context.revert_to(2)
+    assert [message.extract_text() for message in context.history] == snapshot(
+        ["question 0", "answer 0", "question 1", "answer 1"]
+    )
+    assert context.token_count == 200
+    assert context.n_checkpoints == 2
+
+    restored = Context(path)
+    assert await restored.restore()
+    assert restored.history == context.history
+    assert restored.token_count == context.token_count
+    assert restored.n_checkpoints == context.n_checkpoints
+
+    # reverting again works from the in-memory index
+    await restored.revert_to(1)
+    await restored.checkpoint(add_user_message=False)
+    await restored.close()
+    assert _read_roles(path) == snapshot(
+        ["_checkpoint", "user", "assistant", "_usage", "_checkpoint"]
+    )
+
+
+async def test_context_restore_skips_blank_lines(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    path.write_text(
+        "\n".join(
+            [
+                json.dumps({"role": "_checkpoint", "id": 0}),
+                "",
+                json.dumps({"role": "user", "content": "Hello"}),
+                json.dumps({"role": "_usage", "token_count": 7}),
+                "",
+                json.dumps({"role": "_checkpoint", "id": 1}),
+            ]
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+
+    context = Context(path)
+    assert await context.restore()
+    assert context.history == snapshot([Message(role="user", content="Hello")])
+    assert context.token_count == 7
+    assert context.n_checkpoints == 2
+
+    raw = path.read_bytes()
+    for entry in context._checkpoints:  # pyright: ignore[reportPrivateUsage]
+        assert json.loads(raw[entry.offset :].split(b"\n", 1)[0])["id"] == entry.id
+
+
+_IMAGE_DATA_URL = "data:image/png;base64,aGVsbG8="
+
+
+def _image_message() -> Message:
+    return Message(
+        role="user",
+        content=[
+            TextPart(text="Look"),
+            ImageURLPart(image_url=ImageURLPart.ImageURL(url=_IMAGE_DATA_URL)),
+        ],
+    )
+
+
+async def test_context_moves_inline_media_to_blob_store(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path)
+    await context.append_message([_image_message(), _image_message()])
+
+    digest = "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+    assert "base64" not in path.read_text(encoding="utf-8")
+    assert [p.name for p in context.blobs.root.iterdir()] == [digest]
+    assert context.history[0].content[1] == ImageURLPart(
+        image_url=ImageURLPart.ImageURL(url=f"blob://{digest}/image/png")
+    )
+
+    restored = Context(path)
+    assert await restored.restore()
+    assert await restored.blobs.resolve(restored.history) == [_image_message(), _image_message()]
+
+
+async def test_context_resolved_media_hit_conversion_cache(tmp_path: Path):
+    context = Context(tmp_path / "context.jsonl")
+    await context.checkpoint(add_user_message=False)
+    await context.append_message(_image_message())
+    cache = MessageConversionCache[str]()
+    converted: list[Message] = []
+
+    def convert(message: Message) -> str:
+        converted.append(message)
+        return message.extract_text()
+
+    # two steps over the same history convert the image message only once
+    for _ in range(2):
+        for message in await context.blobs.resolve(context.history):
+            cache.get_or_convert(message, convert)
+        await context.append_message(Message(role="assistant", content="Nice"))
+    assert [message.role for message in converted] == ["user", "assistant"]
+    assert converted[0] == _image_message()
+
+    # reverting releases the message, so a new one with the same image is resolved again
+    await context.revert_to(0)
+    await context.append_message(_image_message())
+    (resolved,) = await context.blobs.resolve(context.history)
+    assert resolved is not converted[0]
+    assert resolved == _image_message()
+
+
+def _blob_names(context: Context) -> list[str]:
+    return sorted(p.name for p in context.blobs.root.iterdir() if p.name != PINS_FILE_NAME)
+
+
+async def test_context_collects_unreferenced_blobs(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path)
+    await context.checkpoint(add_user_message=False)
+    await context.append_message(_image_message())
+    await context.checkpoint(add_user_message=False)
+    await context.append_message(_image_message())
+
+    await context.revert_to(1)
+    await context.update_token_count(0)
+    assert len(_blob_names(context)) == 1
+
+    # media kept across a clear survives when re-appended in the same batch
+    kept = list(context.history)
+    await context.clear()
+    async with context.batch():
+        await context.append_message(kept)
+    assert len(_blob_names(context)) == 1
+
+    # the rotated context files still refer to the blob
+    await context.clear()
+    await context.update_token_count(0)
+    assert len(_blob_names(context)) == 1
+
+    for rotated_file in tmp_path.glob("context_*.jsonl"):
+        rotated_file.unlink()
+    await context.clear()
+    await context.update_token_count(0)
+    assert _blob_names(context) == []
+
+
+async def test_context_keeps_blobs_of_rotated_files(tmp_path: Path):
+    path = tmp_path / "context.jsonl"
+    context = Context(path)
+    await context.checkpoint(add_user_message=False)
+    await context.append_message(_image_message())
+    await context.clear()
+    await context.append_message(Message(role="user", content="Hi"))
+    assert _blob_names(context) != []
+
+    # restore the rotated file in place of the current one
+    (rotated_file,) = tmp_path.glob("context_*.jsonl")
+    rotated_file.replace(path)
+    restored = Context(path)
+    assert await restored.restore()
+    assert await restored.blobs.resolve(restored.history) == [_image_message()]
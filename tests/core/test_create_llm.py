@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+from pathlib import Path
+
+import pytest
 from inline_snapshot import snapshot
+from kosong import StreamTimeout
 from kosong.chat_provider.echo import EchoChatProvider
 from kosong.chat_provider.kimi import Kimi
 from pydantic import SecretStr
 
 from kimi_cli.config import LLMModel, LLMProvider
-from kimi_cli.llm import augment_provider_with_env_vars, create_llm
+from kimi_cli.llm import (
+    KIMI_UPLOADS_FILE_NAME,
+    _KimiUploadCache,  # pyright: ignore[reportPrivateUsage]
+    augment_provider_with_env_vars,
+    create_llm,
+)
 
 
 def test_augment_provider_with_env_vars_kimi(monkeypatch):
@@ -86,6 +95,22 @@ def test_create_llm_echo_provider():
     assert llm is not None
     assert isinstance(llm.chat_provider, EchoChatProvider)
     assert llm.max_context_size == 1234
+    assert llm.stream_timeout == StreamTimeout(first_part=None, idle=60)
+
+
+def test_create_llm_stream_timeout():
+    provider = LLMProvider(
+        type="_echo",
+        base_url="",
+        api_key=SecretStr(""),
+        first_token_timeout=120,
+        stream_idle_timeout=15,
+    )
+    model = LLMModel(provider="_echo", model="echo", max_context_size=1234)
+
+    llm = create_llm(provider, model)
+    assert llm is not None
+    assert llm.stream_timeout == StreamTimeout(first_part=120, idle=15)
 
 
 def test_create_llm_requires_base_url_for_kimi():
@@ -93,3 +118,37 @@ def test_create_llm_requires_base_url_for_kimi():
     model = LLMModel(provider="kimi", model="kimi-base", max_context_size=4096)
 
     assert create_llm(provider, model) is None
+
+
+@pytest.mark.parametrize(
+    ("base_url", "upload_images", "expected"),
+    [
+        ("https://api.moonshot.ai/v1", None, True),
+        ("https://api.kimi.com/coding/v1", None, True),
+        ("https://kimi.example.com/v1", None, False),
+        ("https://kimi.example.com/v1", True, True),
+        ("https://api.moonshot.cn/v1", False, False),
+    ],
+)
+def test_create_llm_kimi_upload_images(base_url: str, upload_images: bool | None, expected: bool):
+    provider = LLMProvider(
+        type="kimi",
+        base_url=base_url,
+        api_key=SecretStr("test-key"),
+        upload_images=upload_images,
+    )
+    model = LLMModel(provider="kimi", model="kimi-base", max_context_size=4096)
+
+    llm = create_llm(provider, model)
+    assert llm is not None
+    assert isinstance(llm.chat_provider, Kimi)
+    assert llm.chat_provider.upload_images is expected
+
+
+async def test_kimi_upload_cache_persists_in_session_dir(tmp_path: Path):
+    cache = _KimiUploadCache(tmp_path / KIMI_UPLOADS_FILE_NAME)
+    assert await cache.get("digest") is None
+    await cache.put("digest", "ms://file-1")
+
+    resumed = _KimiUploadCache(tmp_path / KIMI_UPLOADS_FILE_NAME)
+    assert await resumed.get("digest") == "ms://file-1"
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+
+from inline_snapshot import snapshot
+from kosong.chat_provider.mock import MockChatProvider
+from kosong.message import Message, ToolCall
+
+from kimi_cli.llm import LLM
+from kimi_cli.soul.compaction import ElisionCompaction, SimpleCompaction, create_compaction
+from kimi_cli.soul.message import system
+from kimi_cli.soul.tokens import TokenCalibration, estimate_message_tokens
+from kimi_cli.wire.types import TextPart, ThinkPart
+
+
+def _tool_call(id: str, name: str, arguments: dict[str, object]) -> ToolCall:
+    return ToolCall(
+        id=id,
+        function=ToolCall.FunctionBody(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+def _history() -> list[Message]:
+    log = "\n".join(f"line {i}" for i in range(500))
+    return [
+        Message(role="user", content="Fix the bug"),
+        Message(
+            role="assistant",
+            content=[ThinkPart(think="Let me look around"), TextPart(text="Looking.")],
+            tool_calls=[
+                _tool_call("read-1", "ReadFile", {"path": "a.py"}),
+                _tool_call("shell-1", "Shell", {"command": "make test"}),
+            ],
+        ),
+        Message(role="tool", content="def a(): ...", tool_call_id="read-1"),
+        Message(role="tool", content=log, tool_call_id="shell-1"),
+        Message(
+            role="assistant",
+            content="Reading again.",
+            tool_calls=[_tool_call("read-2", "ReadFile", {"path": "a.py"})],
+        ),
+        Message(role="tool", content="def a(): ...", tool_call_id="read-2"),
+        Message(role="assistant", content="Fixed."),
+        Message(role="user", content="Thanks"),
+        Message(role="assistant", content="You are welcome."),
+    ]
+
+
+def _texts(messages: Sequence[Message]) -> list[tuple[str, str]]:
+    return [(message.role, message.extract_text("|")) for message in messages]
+
+
+def test_elide_stale_content_from_older_messages():
+    history = _history()
+
+    elided = ElisionCompaction(max_preserved_messages=3).elide(history)
+
+    assert _texts(elided) == snapshot(
+        [
+            ("user", "Fix the bug"),
+            ("assistant", "Looking."),
+            (
+                "tool",
+                '<system>The output of `ReadFile({"path": "a.py"})` was dropped since the file was read again later.</system>',
+            ),
+            (
+                "tool",
+                """\
+<system>The output of `Shell({"command": "make test"})` was elided to save context: 500 lines, 4,389 characters. Call the tool again if you need it.</system>|line 0
+line 1
+line 2
+...
+line 497
+line 498
+line 499\
+""",
+            ),
+            ("assistant", "Reading again."),
+            ("tool", "def a(): ..."),
+            ("assistant", "Fixed."),
+            ("user", "Thanks"),
+            ("assistant", "You are welcome."),
+        ]
+    )
+    assert [message.tool_calls for message in elided] == [message.tool_calls for message in history]
+    # untouched messages are kept as-is
+    assert elided[4] is history[4]
+    assert elided[-3:] == history[-3:]
+
+
+def test_elide_keeps_history_with_few_messages():
+    history = _history()[-3:]
+
+    assert ElisionCompaction().elide(history) == history
+
+
+def test_elide_does_not_count_checkpoints():
+    history = [
+        Message(role="user", content="Fix the bug"),
+        Message(role="assistant", content=[ThinkPart(think="Easy"), TextPart(text="Fixed.")]),
+        Message(role="user", content=[system("CHECKPOINT 1")]),
+        Message(role="user", content="Thanks"),
+        Message(role="user", content=[system("CHECKPOINT 2")]),
+        Message(role="assistant", content="You are welcome."),
+    ]
+
+    assert ElisionCompaction(max_preserved_messages=3).elide(history) == history
+
+
+async def test_elision_falls_back_when_not_enough():
+    history = _history()
+    llm = LLM(chat_provider=MockChatProvider([]), max_context_size=100, capabilities=set())
+
+    class _Fallback:
+        async def compact(self, messages: Sequence[Message], llm: LLM) -> Sequence[Message]:
+            received.append(list(messages))
+            return [Message(role="user", content="summary")]
+
+    received: list[list[Message]] = []
+    compaction = ElisionCompaction(_Fallback(), max_preserved_messages=3)
+
+    assert _texts(await compaction.compact(history, llm)) == snapshot([("user", "summary")])
+    assert received == [compaction.elide(history)]
+
+    llm.max_context_size = 100_000
+    assert await compaction.compact(history, llm) == compaction.elide(history)
+    assert len(received) == 1
+
+
+async def test_elision_checks_calibrated_estimate():
+    history = _history()
+    compaction = ElisionCompaction(max_preserved_messages=3)
+    n_tokens = sum(map(estimate_message_tokens, compaction.elide(history)))
+    llm = LLM(
+        chat_provider=MockChatProvider([]),
+        max_context_size=round(n_tokens * 1.5 / compaction.target_ratio),
+        capabilities=set(),
+    )
+
+    class _Fallback:
+        async def compact(self, messages: Sequence[Message], llm: LLM) -> Sequence[Message]:
+            return [Message(role="user", content="summary")]
+
+    calibration = TokenCalibration()
+    compaction = ElisionCompaction(
+        _Fallback(), max_preserved_messages=3, token_calibration=calibration
+    )
+    assert await compaction.compact(history, llm) == compaction.elide(history)
+
+    # the LLM counts twice as many tokens as estimated
+    for _ in range(10):
+        calibration.observe(estimated=1000, reported=2000, model=llm.chat_provider.model_name)
+    assert _texts(await compaction.compact(history, llm)) == snapshot([("user", "summary")])
+
+
+def test_manual_elision_always_falls_back():
+    automatic = create_compaction("elision")
+    manual = create_compaction("elision", manual=True)
+    assert isinstance(automatic, ElisionCompaction)
+    assert isinstance(manual, ElisionCompaction)
+    assert isinstance(manual.fallback, SimpleCompaction)
+    assert automatic.target_ratio == 0.4
+    # the history is never small enough to skip the summary asked for by `/compact`
+    assert manual.target_ratio == 0
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from pathlib import Path
+
+from inline_snapshot import snapshot
+from kosong.chat_provider.echo import ScriptedEchoChatProvider
+from kosong.message import Message
+from kosong.tooling.empty import EmptyToolset
+
+from kimi_cli.app import KimiCLI
+from kimi_cli.llm import LLM
+from kimi_cli.soul import run_soul
+from kimi_cli.soul.agent import Agent, Runtime
+from kimi_cli.soul.context import Context
+from kimi_cli.soul.kimisoul import KimiSoul
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.wire import Wire
+from kimi_cli.wire.types import CompactionBegin, WireMessage
+
+
+async def _run(soul: KimiSoul, user_input: str) -> list[WireMessage]:
+    messages: list[WireMessage] = []
+
+    async def _ui_loop_fn(wire: Wire) -> None:
+        wire_ui = wire.ui_side(merge=True)
+        while True:
+            try:
+                messages.append(await wire_ui.receive())
+            except QueueShutDown:
+                return
+
+    await run_soul(soul, user_input, _ui_loop_fn, asyncio.Event())
+    return messages
+
+
+async def _make_soul(runtime: Runtime, scripts: list[str], tmp_path: Path) -> KimiSoul:
+    llm = LLM(
+        chat_provider=ScriptedEchoChatProvider(scripts),
+        max_context_size=100_000,
+        capabilities=set(),
+    )
+    agent = Agent(
+        name="Test Agent",
+        system_prompt="Test system prompt.",
+        toolset=EmptyToolset(),
+        runtime=dataclasses.replace(runtime, llm=llm),
+    )
+    context = Context(file_backend=tmp_path / "history.jsonl")
+    await context.append_message(
+        [
+            Message(role="user", content="q0"),
+            # too long for the rule-based elision to be enough
+            Message(role="assistant", content="a0" + "." * 176_000),
+            Message(role="user", content="q1"),
+            Message(role="assistant", content="a1"),
+        ]
+    )
+    return KimiSoul(agent, context=context)
+
+
+async def test_background_compaction_is_spliced_at_next_step(runtime: Runtime, tmp_path: Path):
+    # the soft watermark is at 0.8 * (100_000 - 50_000) tokens
+    soul = await _make_soul(
+        runtime,
+        [
+            "usage: input_other=45000 output=10\ntext: a2",
+            "text: summary",
+            "text: a3",
+        ],
+        tmp_path,
+    )
+
+    messages = await _run(soul, "q2")
+    assert not any(isinstance(msg, CompactionBegin) for msg in messages)
+    background = soul._background_compaction  # pyright: ignore[reportPrivateUsage]
+    assert background is not None
+    await background.task
+
+    messages = await _run(soul, "q3")
+    assert any(isinstance(msg, CompactionBegin) for msg in messages)
+    assert [(msg.role, msg.extract_text()) for msg in soul.context.history] == snapshot(
+        [
+            (
+                "user",
+                "<system>Previous context has been compacted. Here is the compaction output:</system>summary",
+            ),
+            ("assistant", "a1"),
+            ("user", "q2"),
+            ("assistant", "a2"),
+            ("user", "q3"),
+            ("assistant", "a3"),
+        ]
+    )
+
+
+async def test_background_compaction_is_discarded_after_revert(runtime: Runtime, tmp_path: Path):
+    soul = await _make_soul(
+        runtime,
+        [
+            "usage: input_other=45000 output=10\ntext: a2",
+            "text: summary",
+            "text: a3",
+        ],
+        tmp_path,
+    )
+
+    await _run(soul, "q2")
+    background = soul._background_compaction  # pyright: ignore[reportPrivateUsage]
+    assert background is not None
+    await background.task
+    await soul.context.revert_to(0)
+
+    await _run(soul, "q3")
+    assert [(msg.role, msg.extract_text()[:2]) for msg in soul.context.history] == snapshot(
+        [
+            ("user", "q0"),
+            ("assistant", "a0"),
+            ("user", "q1"),
+            ("assistant", "a1"),
+            ("user", "q3"),
+            ("assistant", "a3"),
+        ]
+    )
+
+
+async def test_background_compaction_backs_off_after_failure(
+    runtime: Runtime, tmp_path: Path, monkeypatch
+):
+    # the soft watermark is at 0.8 * (100_000 - 50_000) tokens
+    soul = await _make_soul(
+        runtime,
+        [
+            "usage: input_other=45000 output=10\ntext: a2",
+            "usage: input_other=46000 output=10\ntext: a3",
+            "usage: input_other=48000 output=10\ntext: a4",
+        ],
+        tmp_path,
+    )
+    attempts: list[int] = []
+
+    async def _compact(history, *, manual=False):
+        attempts.append(len(history))
+        if len(attempts) == 1:
+            raise RuntimeError("compaction failed")
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(soul, "_compact", _compact)
+
+    await _run(soul, "q2")
+    background = soul._background_compaction  # pyright: ignore[reportPrivateUsage]
+    assert background is not None
+    await background.task
+    assert len(attempts) == 1
+
+    # not retried until the usage grew halfway to the hard limit since the failed attempt
+    await _run(soul, "q3")
+    assert len(attempts) == 1
+
+    await _run(soul, "q4")
+    background = soul._background_compaction  # pyright: ignore[reportPrivateUsage]
+    assert background is not None
+    await asyncio.sleep(0)
+    assert len(attempts) == 2
+
+    # the pending compaction does not outlive the soul
+    await soul.close()
+    await asyncio.sleep(0)
+    assert background.task.cancelled()
+
+
+async def test_background_compaction_outlives_cli_runs(
+    runtime: Runtime, tmp_path: Path, monkeypatch
+):
+    soul = await _make_soul(
+        runtime,
+        [
+            "usage: input_other=45000 output=10\ntext: a2",
+            "text: a3",
+        ],
+        tmp_path,
+    )
+
+    async def _compact(history, *, manual=False):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(soul, "_compact", _compact)
+    cli = KimiCLI(soul, soul.runtime, {})
+
+    async for _ in cli.run("q2", asyncio.Event()):
+        pass
+    background = soul._background_compaction  # pyright: ignore[reportPrivateUsage]
+    assert background is not None
+
+    # ACP runs each prompt separately, the compaction keeps going between them
+    async for _ in cli.run("q3", asyncio.Event()):
+        pass
+    assert soul._background_compaction is background  # pyright: ignore[reportPrivateUsage]
+    assert not background.task.done()
+
+    await cli.close()
+    await asyncio.sleep(0)
+    assert background.task.cancelled()
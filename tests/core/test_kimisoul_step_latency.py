@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import pytest
+from kosong.chat_provider.echo import ScriptedEchoChatProvider, ScriptedEchoStreamedMessage
+from kosong.message import Message
+from kosong.tooling import Tool
+from kosong.tooling.empty import EmptyToolset
+
+from kimi_cli.llm import LLM
+from kimi_cli.soul import run_soul
+from kimi_cli.soul.agent import Agent, Runtime
+from kimi_cli.soul.context import Context, _ContextWriter  # pyright: ignore[reportPrivateUsage]
+from kimi_cli.soul.kimisoul import KimiSoul
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.wire import Wire
+from kimi_cli.wire.types import StatusUpdate
+
+
+class SlowProvider(ScriptedEchoChatProvider):
+    async def generate(
+        self,
+        system_prompt: str,
+        tools: Sequence[Tool],
+        history: Sequence[Message],
+    ) -> ScriptedEchoStreamedMessage:
+        await asyncio.sleep(0.05)
+        return await super().generate(system_prompt, tools, history)
+
+
+async def test_step_reports_latency_breakdown(
+    runtime: Runtime, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    original_write = _ContextWriter._write  # pyright: ignore[reportPrivateUsage]
+
+    def slow_write(self: _ContextWriter, *args: Any) -> None:
+        time.sleep(0.05)
+        original_write(self, *args)
+
+    # the context writes of a step are committed after the step itself has returned
+    monkeypatch.setattr(_ContextWriter, "_write", slow_write)
+    llm = LLM(
+        chat_provider=SlowProvider(["usage: input_other=10 output=20\ntext: Hello\ntext: world"]),
+        max_context_size=100_000,
+        capabilities=set(),
+    )
+    agent = Agent(
+        name="Test Agent",
+        system_prompt="Test system prompt.",
+        toolset=EmptyToolset(),
+        runtime=dataclasses.replace(runtime, llm=llm),
+    )
+    soul = KimiSoul(agent, context=Context(file_backend=tmp_path / "history.jsonl"))
+    updates: list[StatusUpdate] = []
+
+    async def _ui_loop_fn(wire: Wire) -> None:
+        wire_ui = wire.ui_side(merge=True)
+        while True:
+            try:
+                msg = await wire_ui.receive()
+            except QueueShutDown:
+                return
+            if isinstance(msg, StatusUpdate):
+                updates.append(msg)
+
+    await run_soul(soul, "Hi", _ui_loop_fn, asyncio.Event())
+
+    streamed, persisted = updates
+    assert streamed.retry_ms is not None and streamed.retry_ms < 50
+    assert streamed.ttft_ms is not None and streamed.ttft_ms >= 50
+    assert streamed.stream_ms is not None
+    if streamed.stream_ms > 0:
+        assert streamed.output_tokens_per_second is not None
+    assert streamed.tool_ms is None
+    assert persisted.tool_ms is not None
+    assert persisted.persist_ms is not None and persisted.persist_ms >= 50
+    assert persisted.ttft_ms is None
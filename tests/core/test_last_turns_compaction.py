@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from inline_snapshot import snapshot
+from kosong.chat_provider.mock import MockChatProvider
+from kosong.message import Message
+
+from kimi_cli.llm import LLM
+from kimi_cli.soul.compaction import KeepLastTurnsCompaction
+from kimi_cli.soul.message import system
+
+
+def _llm() -> LLM:
+    return LLM(chat_provider=MockChatProvider([]), max_context_size=100_000, capabilities=set())
+
+
+async def test_keep_last_turns_drops_older_turns():
+    messages = [
+        Message(role="user", content=f"question {i // 2}")
+        if i % 2 == 0
+        else Message(role="assistant", content=f"answer {i // 2}")
+        for i in range(8)
+    ]
+
+    compacted = await KeepLastTurnsCompaction(max_turns=2).compact(messages, _llm())
+
+    assert [(message.role, message.extract_text()) for message in compacted] == snapshot(
+        [
+            (
+                "user",
+                "<system>Previous context has been compacted. 4 earlier messages were dropped.</system>",
+            ),
+            ("user", "question 2"),
+            ("assistant", "answer 2"),
+            ("user", "question 3"),
+            ("assistant", "answer 3"),
+        ]
+    )
+
+
+async def test_keep_last_turns_keeps_short_history():
+    messages = [
+        Message(role="user", content="question"),
+        Message(role="assistant", content="answer"),
+    ]
+
+    assert await KeepLastTurnsCompaction(max_turns=2).compact(messages, _llm()) == messages
+
+
+async def test_keep_last_turns_skips_checkpoints():
+    messages: list[Message] = []
+    for turn in range(3):
+        messages.append(Message(role="user", content=f"question {turn}"))
+        for step in range(3):
+            messages.append(Message(role="user", content=[system(f"CHECKPOINT {turn}{step}")]))
+            messages.append(Message(role="assistant", content=f"answer {turn}.{step}"))
+
+    compacted = await KeepLastTurnsCompaction(max_turns=2).compact(messages, _llm())
+
+    assert compacted[1:] == messages[7:]
+    assert compacted[1].extract_text() == "question 1"
+
+
+async def test_keep_last_turns_keeps_exactly_max_turns():
+    messages = [
+        Message(role="user", content="question 0"),
+        Message(role="assistant", content="answer 0"),
+        Message(role="user", content="question 1"),
+        Message(role="assistant", content="answer 1"),
+    ]
+
+    assert await KeepLastTurnsCompaction(max_turns=2).compact(messages, _llm()) == messages
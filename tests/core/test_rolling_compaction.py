@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from inline_snapshot import snapshot
+from kosong.chat_provider.echo import ScriptedEchoChatProvider, ScriptedEchoStreamedMessage
+from kosong.message import Message
+from kosong.tooling import Tool
+
+from kimi_cli.llm import LLM
+from kimi_cli.soul.compaction import RollingCompaction
+
+
+class RecordingProvider(ScriptedEchoChatProvider):
+    def __init__(self, scripts: list[str]) -> None:
+        super().__init__(scripts)
+        self.requests: list[str] = []
+
+    async def generate(
+        self,
+        system_prompt: str,
+        tools: Sequence[Tool],
+        history: Sequence[Message],
+    ) -> ScriptedEchoStreamedMessage:
+        self.requests.append(history[-1].extract_text())
+        return await super().generate(system_prompt, tools, history)
+
+
+def _turn(i: int) -> list[Message]:
+    return [
+        Message(role="user", content=f"question {i}"),
+        Message(role="assistant", content=f"answer {i}"),
+    ]
+
+
+def _texts(messages: Sequence[Message]) -> list[str]:
+    return [message.extract_text() for message in messages]
+
+
+async def test_rolling_compaction_only_summarizes_new_segment():
+    provider = RecordingProvider(["text: summary 1", "text: summary 2"])
+    llm = LLM(chat_provider=provider, max_context_size=100_000, capabilities=set())
+    compaction = RollingCompaction()
+
+    compacted = await compaction.compact([*_turn(0), *_turn(1)], llm)
+    assert _texts(compacted) == snapshot(
+        [
+            "<system>Summary of an earlier part of the conversation:</system>summary 1",
+            "question 1",
+            "answer 1",
+        ]
+    )
+
+    compacted = await compaction.compact([*compacted, *_turn(2)], llm)
+    assert _texts(compacted) == snapshot(
+        [
+            "<system>Summary of an earlier part of the conversation:</system>summary 1",
+            "<system>Summary of an earlier part of the conversation:</system>summary 2",
+            "question 2",
+            "answer 2",
+        ]
+    )
+    # the second compaction did not re-read the first summary
+    assert "question 0" in provider.requests[0]
+    assert "summary 1" not in provider.requests[1]
+    assert "question 1" in provider.requests[1]
+
+
+async def test_rolling_compaction_merges_summaries_over_budget():
+    long_summary = "text: " + "x" * 400
+    provider = RecordingProvider([long_summary, long_summary, long_summary, "text: merged"])
+    llm = LLM(chat_provider=provider, max_context_size=100_000, capabilities=set())
+    compaction = RollingCompaction(summary_budget=250)
+
+    compacted: Sequence[Message] = _turn(0)
+    for i in range(1, 4):
+        compacted = await compaction.compact([*compacted, *_turn(i)], llm)
+
+    assert [text[-10:] for text in _texts(compacted)] == snapshot(
+        ["tem>merged", "xxxxxxxxxx", "question 3", "answer 3"]
+    )
+    assert len(provider.requests) == 4
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from kosong.message import Message
+
+from kimi_cli.soul.tokens import (
+    IMAGE_TOKENS,
+    MESSAGE_OVERHEAD_TOKENS,
+    TokenCalibration,
+    estimate_message_tokens,
+    estimate_text_tokens,
+)
+from kimi_cli.wire.types import ImageURLPart, TextPart
+
+
+def test_estimate_text_tokens():
+    assert estimate_text_tokens("") == 0
+    assert estimate_text_tokens("a" * 400) == 100
+    assert estimate_text_tokens("你" * 300) == 200
+    assert estimate_text_tokens("a" * 400 + "你" * 300) == 300
+
+
+def test_estimate_message_tokens():
+    message = Message(
+        role="user",
+        content=[
+            TextPart(text="a" * 40),
+            ImageURLPart(image_url=ImageURLPart.ImageURL(url="blob://x/image/png")),
+        ],
+    )
+    assert estimate_message_tokens(message) == MESSAGE_OVERHEAD_TOKENS + 10 + IMAGE_TOKENS
+
+
+def test_token_calibration_converges_and_is_clamped():
+    calibration = TokenCalibration()
+    assert calibration.apply(1000) == 1000
+
+    for _ in range(20):
+        calibration.observe(estimated=1000, reported=1500)
+    assert calibration.apply(1000) == 1500
+
+    # small samples are ignored
+    calibration.observe(estimated=10, reported=1000)
+    assert calibration.apply(1000) == 1500
+
+    for _ in range(50):
+        calibration.observe(estimated=1000, reported=100_000)
+    assert calibration.apply(1000) == 1000 * TokenCalibration.MAX_RATIO
+
+
+def test_token_calibration_is_kept_per_model():
+    calibration = TokenCalibration()
+    for _ in range(20):
+        calibration.observe(estimated=1000, reported=1500, model="kimi")
+    assert calibration.apply(1000, model="kimi") == 1500
+    assert calibration.apply(1000, model="claude") == 1000
+
+    for _ in range(20):
+        calibration.observe(estimated=1000, reported=800, model="claude")
+    assert calibration.apply(1000, model="claude") == 800
+    assert calibration.apply(1000, model="kimi") == 1500
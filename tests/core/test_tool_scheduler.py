@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from kaos.path import KaosPath
+from kosong.tooling import CallableTool2, ToolOk, ToolReturnValue
+from pydantic import BaseModel
+
+from kimi_cli.config import ToolConcurrencyConfig
+from kimi_cli.soul.tool_scheduler import ToolEffect, ToolScheduler
+from kimi_cli.soul.toolset import KimiToolset
+from kimi_cli.wire.types import ToolCall, ToolResult
+
+
+class Params(BaseModel):
+    path: str = ""
+
+
+class _RecordingTool(CallableTool2[Params]):
+    description: str = "Record when the call runs."
+    params: type[Params] = Params
+
+    def __init__(self, name: str, effect: ToolEffect, log: list[str], running: list[int]):
+        super().__init__(name=name)
+        self.effect = effect
+        self._log = log
+        self._running = running
+
+    async def __call__(self, params: Params) -> ToolReturnValue:
+        self._running[0] += 1
+        self._running[1] = max(self._running[1], self._running[0])
+        self._log.append(f"start {self.name} {params.path}")
+        await asyncio.sleep(0.01)
+        self._log.append(f"end {self.name} {params.path}")
+        self._running[0] -= 1
+        return ToolOk(output="")
+
+
+def _call(toolset: KimiToolset, i: int, name: str, path: str = "") -> asyncio.Future[ToolResult]:
+    tool_call = ToolCall(
+        id=str(i), function=ToolCall.FunctionBody(name=name, arguments=json.dumps({"path": path}))
+    )
+    result = toolset.handle(tool_call)
+    assert isinstance(result, asyncio.Future)
+    return result
+
+
+async def test_writes_to_same_path_are_serialized():
+    log: list[str] = []
+    toolset = KimiToolset()
+    toolset.add(_RecordingTool("Write", "write", log, [0, 0]))
+
+    await asyncio.gather(
+        _call(toolset, 0, "Write", "a.txt"),
+        _call(toolset, 1, "Write", "./a.txt"),
+        _call(toolset, 2, "Write", "b.txt"),
+    )
+
+    # the second write to a.txt waits for the first, while b.txt is written meanwhile
+    assert log.index("end Write a.txt") < log.index("start Write ./a.txt")
+    assert log.index("start Write b.txt") < log.index("end Write a.txt")
+
+
+async def test_writes_to_same_file_are_serialized_across_spellings():
+    log: list[str] = []
+    toolset = KimiToolset()
+    toolset.add(_RecordingTool("Write", "write", log, [0, 0]))
+    absolute = str(KaosPath("a.txt").canonical())
+
+    await asyncio.gather(
+        _call(toolset, 0, "Write", "a.txt"),
+        _call(toolset, 1, "Write", absolute),
+    )
+
+    assert log == [
+        "start Write a.txt",
+        "end Write a.txt",
+        f"start Write {absolute}",
+        f"end Write {absolute}",
+    ]
+
+
+async def test_reads_and_writes_to_same_path_are_ordered():
+    log: list[str] = []
+    reads = [0, 0]
+    toolset = KimiToolset()
+    toolset.add(_RecordingTool("Write", "write", log, [0, 0]))
+    toolset.add(_RecordingTool("Read", "read", log, reads))
+
+    await asyncio.gather(
+        _call(toolset, 0, "Write", "a.txt"),
+        _call(toolset, 1, "Read", "a.txt"),
+        _call(toolset, 2, "Read", "./a.txt"),
+        _call(toolset, 3, "Write", "./a.txt"),
+    )
+
+    # the reads of a.txt see the first write but not the second, and run together
+    assert log.index("end Write a.txt") < log.index("start Read a.txt")
+    assert log.index("end Read ./a.txt") < log.index("start Write ./a.txt")
+    assert reads[1] == 2
+
+
+async def test_cancelled_call_keeps_path_order():
+    scheduler = ToolScheduler(ToolConcurrencyConfig())
+    log: list[str] = []
+
+    async def _run(name: str, effect: ToolEffect) -> None:
+        async with scheduler.slot(effect, "a.txt"):
+            log.append(f"start {name}")
+            await asyncio.sleep(0.02)
+            log.append(f"end {name}")
+
+    first = asyncio.create_task(_run("first", "write"))
+    cancelled = asyncio.create_task(_run("cancelled", "write"))
+    read = asyncio.create_task(_run("read", "read"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.gather(first, read, return_exceptions=True)
+
+    assert log == ["start first", "end first", "start read", "end read"]
+
+
+async def test_effect_classes_are_limited():
+    toolset = KimiToolset(ToolConcurrencyConfig(process=2))
+    processes = [0, 0]
+    reads = [0, 0]
+    toolset.add(_RecordingTool("Shell", "process", [], processes))
+    toolset.add(_RecordingTool("Read", "read", [], reads))
+
+    await asyncio.gather(
+        *(_call(toolset, i, "Shell") for i in range(6)),
+        *(_call(toolset, i, "Read", f"{i}.txt") for i in range(6)),
+    )
+
+    assert processes[1] == 2
+    assert reads[1] == 6
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+
+from inline_snapshot import snapshot
+from kosong.tooling import CallableTool2, ToolReturnValue
+from pydantic import BaseModel
+
+from kimi_cli.soul.tool_stats import ToolStats
+from kimi_cli.soul.toolset import KimiToolset
+from kimi_cli.tools.utils import ToolResultBuilder, is_truncated
+from kimi_cli.wire.types import ToolCall, ToolCallStats, ToolResult
+
+
+class Params(BaseModel):
+    text: str = ""
+
+
+class _EchoTool(CallableTool2[Params]):
+    name: str = "Echo"
+    description: str = "Echo the text, truncating it when long."
+    params: type[Params] = Params
+
+    async def __call__(self, params: Params) -> ToolReturnValue:
+        if not params.text:
+            raise ValueError("nothing to echo")
+        builder = ToolResultBuilder(max_chars=10)
+        builder.write(params.text)
+        return builder.ok()
+
+
+async def _call(toolset: KimiToolset, text: str) -> ToolResult:
+    result = toolset.handle(
+        ToolCall(
+            id="0",
+            function=ToolCall.FunctionBody(name="Echo", arguments=f'{{"text": "{text}"}}'),
+        )
+    )
+    assert isinstance(result, asyncio.Future)
+    return await result
+
+
+async def test_toolset_records_tool_call_stats():
+    toolset = KimiToolset()
+    toolset.add(_EchoTool())
+    assert not toolset.stats
+
+    result = await _call(toolset, "hello")
+    assert result.stats is not None
+    assert result.stats.model_dump(exclude={"queue_ms", "run_ms"}) == snapshot(
+        {"output_bytes": 5, "truncated": False, "error": None}
+    )
+
+    result = await _call(toolset, "hello, world")
+    assert result.stats is not None
+    assert result.stats.truncated
+
+    result = await _call(toolset, "")
+    assert result.stats is not None
+    assert result.stats.error == "ToolRuntimeError"
+
+    summary = toolset.stats.summary()["Echo"]
+    assert summary.model_dump(include={"n_calls", "n_errors", "n_truncated"}) == snapshot(
+        {"n_calls": 3, "n_errors": 1, "n_truncated": 1}
+    )
+    assert summary.run_ms_p50 <= summary.run_ms_p95
+
+
+def test_tool_stats_skip_unknown_tools():
+    toolset = KimiToolset()
+    result = toolset.handle(
+        ToolCall(id="0", function=ToolCall.FunctionBody(name="Nope", arguments="{}"))
+    )
+    assert isinstance(result, ToolResult)
+    assert result.return_value.is_error
+    assert not toolset.stats
+
+
+def test_tool_stats_are_bounded():
+    stats = ToolStats()
+    for i in range(10_000):
+        stats.record("Shell", ToolCallStats(queue_ms=0, run_ms=i % 100, output_bytes=1))
+
+    summary = stats.summary()["Shell"]
+    assert (summary.n_calls, summary.output_bytes) == (10_000, 10_000)
+    assert 30 <= summary.run_ms_p50 <= 70
+    assert len(stats._tools["Shell"].samples) == ToolStats.max_samples  # pyright: ignore[reportPrivateUsage]
+
+
+def test_tool_result_builder_flags_truncation():
+    builder = ToolResultBuilder()
+    builder.write("short")
+    assert not is_truncated(builder.ok())
+
+    builder.mark_truncated()
+    result = builder.ok("Results truncated to first 10 lines")
+    assert is_truncated(result)
+    # the message to the model is left to the tool
+    assert result.message == "Results truncated to first 10 lines."
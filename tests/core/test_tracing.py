@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from inline_snapshot import snapshot
+from kosong.chat_provider.echo import ScriptedEchoChatProvider
+from kosong.tooling import CallableTool2, ToolOk, ToolReturnValue, Toolset
+from kosong.tooling.empty import EmptyToolset
+from kosong.tracing import Span, set_exporter
+from pydantic import BaseModel
+
+from kimi_cli.app import KimiCLI
+from kimi_cli.llm import LLM
+from kimi_cli.soul import run_soul
+from kimi_cli.soul.agent import Agent, Runtime
+from kimi_cli.soul.context import Context
+from kimi_cli.soul.kimisoul import KimiSoul
+from kimi_cli.soul.toolset import KimiToolset
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.utils.tracing import JsonlSpanExporter, _otlp_span  # pyright: ignore[reportPrivateUsage]
+from kimi_cli.wire import Wire
+
+
+class RecordingExporter:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    async def flush(self) -> None:
+        pass
+
+
+@pytest.fixture
+def exporter() -> Iterator[RecordingExporter]:
+    exporter = RecordingExporter()
+    set_exporter(exporter)
+    yield exporter
+    set_exporter(None)
+
+
+async def _drain(wire: Wire) -> None:
+    wire_ui = wire.ui_side(merge=True)
+    while True:
+        try:
+            await wire_ui.receive()
+        except QueueShutDown:
+            return
+
+
+def _make_soul(
+    runtime: Runtime, scripts: list[str], context_file: Path, toolset: Toolset | None = None
+) -> KimiSoul:
+    llm = LLM(
+        chat_provider=ScriptedEchoChatProvider(scripts),
+        max_context_size=100_000,
+        capabilities=set(),
+    )
+    agent = Agent(
+        name="Test Agent",
+        system_prompt="Test system prompt.",
+        toolset=toolset or EmptyToolset(),
+        runtime=dataclasses.replace(runtime, llm=llm),
+    )
+    return KimiSoul(agent, context=Context(file_backend=context_file))
+
+
+class Params(BaseModel):
+    prompt: str
+
+
+class _SubagentTool(CallableTool2[Params]):
+    name: str = "Task"
+    description: str = "Run a subagent, like the `Task` tool."
+    params: type[Params] = Params
+
+    def __init__(self, subagent: KimiSoul):
+        super().__init__()
+        self._subagent = subagent
+
+    async def __call__(self, params: Params) -> ToolReturnValue:
+        await run_soul(self._subagent, params.prompt, _drain, asyncio.Event())
+        return ToolOk(output="done")
+
+
+async def test_subagent_spans_are_children_of_tool_call(
+    runtime: Runtime, tmp_path: Path, exporter: RecordingExporter
+):
+    subagent = _make_soul(runtime, ["text: sub"], tmp_path / "subagent.jsonl")
+    toolset = KimiToolset()
+    toolset.add(_SubagentTool(subagent))
+    soul = _make_soul(
+        runtime,
+        [
+            'tool_call: {"id": "task-1", "name": "Task", "arguments": "{\\"prompt\\": \\"go\\"}"}',
+            "text: done",
+        ],
+        tmp_path / "main.jsonl",
+        toolset,
+    )
+
+    await run_soul(soul, "Hi", _drain, asyncio.Event())
+
+    by_id = {span.span_id: span for span in exporter.spans}
+
+    def ancestors(span: Span) -> list[Span]:
+        result: list[Span] = []
+        while span.parent_span_id is not None:
+            span = by_id[span.parent_span_id]
+            result.append(span)
+        return result
+
+    (tool_span,) = [span for span in exporter.spans if span.name == "tool.call"]
+    assert tool_span.attributes["tool"] == "Task"
+    (subagent_turn,) = [
+        span for span in exporter.spans if span.name == "soul.turn" and tool_span in ancestors(span)
+    ]
+    assert [span.name for span in reversed(ancestors(subagent_turn))] == snapshot(
+        [
+            "soul.run",
+            "soul.turn",
+            "soul.step",
+            "kosong.step",
+            "kosong.generate",
+            "tool.call",
+            "soul.run",
+        ]
+    )
+    assert len({span.trace_id for span in exporter.spans}) == 1
+
+
+async def test_concurrent_sessions_trace_to_their_own_exporter(runtime: Runtime, tmp_path: Path):
+    exporters = [RecordingExporter(), RecordingExporter()]
+    clis = [
+        KimiCLI(
+            _make_soul(runtime, ["text: a", "text: b"], tmp_path / f"context-{i}.jsonl"),
+            runtime,
+            {},
+            exporter,
+        )
+        for i, exporter in enumerate(exporters)
+    ]
+    started = asyncio.Barrier(len(clis))
+
+    async def _prompt(cli: KimiCLI, user_input: str) -> None:
+        async for _ in cli.run(user_input, asyncio.Event()):
+            # keep both sessions running at the same time
+            await started.wait()
+
+    # like the ACP server, which runs each prompt of each session in its own task
+    await asyncio.gather(*(_prompt(cli, "Hi") for cli in clis))
+    await asyncio.gather(*(_prompt(cli, "Again") for cli in clis))
+
+    for exporter in exporters:
+        assert [span.name for span in exporter.spans].count("soul.turn") == 2
+    assert not {span.trace_id for span in exporters[0].spans} & {
+        span.trace_id for span in exporters[1].spans
+    }
+
+
+async def test_jsonl_exporter_appends_spans(tmp_path: Path):
+    exporter = JsonlSpanExporter(tmp_path / "traces.jsonl")
+    span = Span(
+        name="tool.call",
+        trace_id="0" * 32,
+        span_id="1" * 16,
+        parent_span_id=None,
+        start_time_unix_nano=1,
+        end_time_unix_nano=2,
+        attributes={"tool": "Shell"},
+    )
+    exporter.export(span)
+    exporter.export(span)
+    await exporter.flush()
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [span.to_dict()] * 2
+
+
+async def test_jsonl_exporter_flushes_on_timer(tmp_path: Path):
+    exporter = JsonlSpanExporter(tmp_path / "traces.jsonl")
+    exporter.flush_interval = 0.01
+    span = Span(
+        name="soul.turn",
+        trace_id="0" * 32,
+        span_id="1" * 16,
+        parent_span_id=None,
+        start_time_unix_nano=1,
+        end_time_unix_nano=2,
+        attributes={},
+    )
+    exporter.export(span)
+    for _ in range(100):
+        if (tmp_path / "traces.jsonl").exists():
+            break
+        await asyncio.sleep(0.01)
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [span.to_dict()]
+
+
+def test_otlp_span_encoding():
+    span = Span(
+        name="tool.call",
+        trace_id="0" * 32,
+        span_id="1" * 16,
+        parent_span_id="2" * 16,
+        start_time_unix_nano=1,
+        end_time_unix_nano=2,
+        attributes={"tool": "Shell", "queue_ms": 1.5, "n": 3, "ok": True},
+        status="error",
+        status_message="ToolError",
+    )
+
+    assert _otlp_span(span) == snapshot(
+        {
+            "traceId": "00000000000000000000000000000000",
+            "spanId": "1111111111111111",
+            "name": "tool.call",
+            "kind": 1,
+            "startTimeUnixNano": "1",
+            "endTimeUnixNano": "2",
+            "attributes": [
+                {"key": "tool", "value": {"stringValue": "Shell"}},
+                {"key": "queue_ms", "value": {"doubleValue": 1.5}},
+                {"key": "n", "value": {"intValue": "3"}},
+                {"key": "ok", "value": {"boolValue": True}},
+            ],
+            "status": {"code": 2, "message": "ToolError"},
+            "parentSpanId": "2222222222222222",
+        }
+    )
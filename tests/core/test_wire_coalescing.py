@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from kimi_cli.utils.aioqueue import QueueShutDown
+from kimi_cli.wire import CoalescedWireUISide, Wire
+from kimi_cli.wire.types import (
+    StepBegin,
+    TextPart,
+    ThinkPart,
+    ToolCall,
+    ToolCallPart,
+    WireMessage,
+)
+
+
+async def _receive_all(ui_side: CoalescedWireUISide) -> list[WireMessage]:
+    received: list[WireMessage] = []
+    while True:
+        try:
+            received.append(await ui_side.receive())
+        except QueueShutDown:
+            return received
+
+
+async def test_coalescing_keeps_order():
+    wire = Wire()
+    ui_side = CoalescedWireUISide(wire.ui_side(merge=False), max_delay=10, max_chars=4096)
+    raw_side = wire.ui_side(merge=False)
+
+    sent: list[WireMessage] = [
+        ThinkPart(think="Let me "),
+        ThinkPart(think="think"),
+        TextPart(text="Hello"),
+        TextPart(text=", world"),
+        StepBegin(n=2),
+        TextPart(text="Reading"),
+        ToolCall(id="call_1", function=ToolCall.FunctionBody(name="ReadFile", arguments='{"pa')),
+        ToolCallPart(arguments_part='th": "a.py"}'),
+    ]
+    originals = [msg.model_copy(deep=True) for msg in sent]
+    for msg in sent:
+        wire.soul_side.send(msg)
+    wire.shutdown()
+
+    assert await _receive_all(ui_side) == [
+        ThinkPart(think="Let me think"),
+        TextPart(text="Hello, world"),
+        StepBegin(n=2),
+        TextPart(text="Reading"),
+        ToolCall(
+            id="call_1",
+            function=ToolCall.FunctionBody(name="ReadFile", arguments='{"path": "a.py"}'),
+        ),
+    ]
+    # the raw messages seen by other subscribers are left untouched
+    assert [await raw_side.receive() for _ in sent] == originals
+
+
+async def test_coalescing_is_bounded_by_size():
+    wire = Wire()
+    ui_side = CoalescedWireUISide(wire.ui_side(merge=False), max_delay=10, max_chars=5)
+
+    for text in ["abc", "def", "ghi"]:
+        wire.soul_side.send(TextPart(text=text))
+    # a full buffer is returned without waiting for more deltas
+    assert await asyncio.wait_for(ui_side.receive(), timeout=1) == TextPart(text="abcdef")
+
+    wire.shutdown()
+    assert await _receive_all(ui_side) == [TextPart(text="ghi")]
+
+
+async def test_coalescing_is_bounded_by_time():
+    wire = Wire()
+    ui_side = CoalescedWireUISide(wire.ui_side(merge=False), max_delay=0.01, max_chars=4096)
+
+    wire.soul_side.send(TextPart(text="Hello"))
+    assert await asyncio.wait_for(ui_side.receive(), timeout=1) == TextPart(text="Hello")
+
+    wire.soul_side.send(TextPart(text="world"))
+    assert await asyncio.wait_for(ui_side.receive(), timeout=1) == TextPart(text="world")
+
+    wire.shutdown()
+    with pytest.raises(QueueShutDown):
+        await ui_side.receive()
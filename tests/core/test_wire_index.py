@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from kimi_cli.ui.shell.replay import (
+    MAX_REPLAY_TURNS,
+    _build_replay_turns_from_wire,  # pyright: ignore[reportPrivateUsage]
+)
+from kimi_cli.wire.file import WireFile
+from kimi_cli.wire.index import WireTurnIndexEntry, load_turn_index, turn_index_path
+from kimi_cli.wire.types import StepBegin, TextPart, TurnBegin, TurnEnd
+
+
+async def _record_turns(wire_file: WireFile, n_turns: int, *, start: int = 0) -> None:
+    writer = wire_file.open_writer()
+    for turn in range(start, start + n_turns):
+        writer.stage(TurnBegin(user_input=f"turn {turn}"))
+        writer.stage(StepBegin(n=1))
+        writer.stage(TextPart(text=f"answer {turn}"))
+        writer.stage(TurnEnd())
+    await writer.close()
+
+
+async def test_writer_indexes_turns(tmp_path: Path):
+    wire_file = WireFile(tmp_path / "wire.jsonl")
+    await _record_turns(wire_file, 2)
+    await _record_turns(wire_file, 1, start=2)
+
+    index = await wire_file.turn_index()
+    assert [(entry.kind, entry.title) for entry in index] == [
+        ("begin", "turn 0"),
+        ("end", None),
+        ("begin", "turn 1"),
+        ("end", None),
+        ("begin", "turn 2"),
+        ("end", None),
+    ]
+    index_data = turn_index_path(wire_file.path).read_bytes()
+    assert index_data == b"".join(entry.dump_line() for entry in index)
+    first = [r.to_wire_message() async for r in wire_file.iter_records(offset=index[4].offset)]
+    assert first == [
+        TurnBegin(user_input="turn 2"),
+        StepBegin(n=1),
+        TextPart(text="answer 2"),
+        TurnEnd(),
+    ]
+
+
+async def test_index_is_rebuilt_for_existing_logs(tmp_path: Path):
+    wire_file = WireFile(tmp_path / "wire.jsonl")
+    await _record_turns(wire_file, 2)
+    index = load_turn_index(wire_file.path)
+    index_path = turn_index_path(wire_file.path)
+
+    # missing index
+    index_path.unlink()
+    assert load_turn_index(wire_file.path) == index
+    assert index_path.exists()
+
+    # index of another file
+    index_path.write_bytes(WireTurnIndexEntry("end", 1).dump_line())
+    assert load_turn_index(wire_file.path) == index
+
+    # turns recorded without updating the index
+    await wire_file.append_message(TurnBegin(user_input="late turn"))
+    assert [entry.title for entry in load_turn_index(wire_file.path)] == [
+        "turn 0",
+        None,
+        "turn 1",
+        None,
+        "late turn",
+    ]
+
+
+async def test_replay_reads_recent_turns(tmp_path: Path):
+    wire_file = WireFile(tmp_path / "wire.jsonl")
+    await _record_turns(wire_file, MAX_REPLAY_TURNS + 2)
+
+    turns = await _build_replay_turns_from_wire(wire_file)
+
+    assert [turn.user_message.extract_text() for turn in turns] == [
+        f"turn {i}" for i in range(2, MAX_REPLAY_TURNS + 2)
+    ]
+    assert turns[0].n_steps == 1
@@ -1,11 +1,25 @@
 import inspect
+import json
 
 import pytest
 from inline_snapshot import snapshot
 from pydantic import BaseModel
 
 from kimi_cli.wire.file import WireMessageRecord
-from kimi_cli.wire.serde import deserialize_wire_message, serialize_wire_message
+from kimi_cli.wire.jsonrpc import (
+    JSONRPCErrorObject,
+    JSONRPCErrorResponse,
+    JSONRPCEventMessage,
+    JSONRPCRequestMessage,
+    JSONRPCSuccessResponse,
+    dump_jsonrpc_message,
+    parse_jsonrpc_response,
+)
+from kimi_cli.wire.serde import (
+    deserialize_wire_message,
+    dump_wire_message_json,
+    serialize_wire_message,
+)
 from kimi_cli.wire.types import (
     ApprovalRequest,
     ApprovalResponse,
@@ -37,6 +51,7 @@ def _test_serde(msg: WireMessage):
     serialized = serialize_wire_message(msg)
     deserialized = deserialize_wire_message(serialized)
     assert deserialized == msg
+    assert json.loads(dump_wire_message_json(msg)) == serialized
 
 
 async def test_wire_message_serde():
@@ -86,7 +101,18 @@ async def test_wire_message_serde():
     assert serialize_wire_message(msg) == snapshot(
         {
             "type": "StatusUpdate",
-            "payload": {"context_usage": 0.5, "token_usage": None, "message_id": None},
+            "payload": {
+                "context_usage": 0.5,
+                "token_usage": None,
+                "message_id": None,
+                "tool_stats": None,
+                "retry_ms": None,
+                "ttft_ms": None,
+                "stream_ms": None,
+                "output_tokens_per_second": None,
+                "tool_ms": None,
+                "persist_ms": None,
+            },
         }
     )
     _test_serde(msg)
@@ -153,6 +179,7 @@ async def test_wire_message_serde():
                     "display": [{"type": "brief", "text": "Command completed"}],
                     "extras": None,
                 },
+                "stats": None,
             },
         }
     )
@@ -352,3 +379,26 @@ def test_wire_message_type_alias():
 
     for type_ in wire_message_types:
         assert type_ in module._WIRE_MESSAGE_TYPES
+
+
+def test_jsonrpc_message_json():
+    messages = [
+        JSONRPCEventMessage(params=TextPart(text="Hello, 世界")),
+        JSONRPCRequestMessage(
+            id="req_1",
+            params=ToolCallRequest(id="call_123", name="bash", arguments="{}"),
+        ),
+        JSONRPCSuccessResponse(id="prompt_1", result={"status": "finished"}),
+        JSONRPCErrorResponse(id="prompt_2", error=JSONRPCErrorObject(code=-32000, message="x")),
+    ]
+    for msg in messages:
+        data = dump_jsonrpc_message(msg)
+        assert json.loads(data) == json.loads(msg.model_dump_json())
+        response = parse_jsonrpc_response(data)
+        if isinstance(msg, JSONRPCSuccessResponse | JSONRPCErrorResponse):
+            assert response == msg
+        else:
+            assert response is None
+
+    with pytest.raises(ValueError):
+        parse_jsonrpc_response(b"not json")
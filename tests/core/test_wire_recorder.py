@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from kimi_cli.wire import Wire
+from kimi_cli.wire.file import WireFile, WireFileWriter
+from kimi_cli.wire.protocol import WIRE_PROTOCOL_VERSION
+from kimi_cli.wire.types import StepBegin, TextPart, TurnBegin, TurnEnd
+
+
+@pytest.fixture
+def writes(monkeypatch: pytest.MonkeyPatch) -> list[bytes]:
+    writes: list[bytes] = []
+    original = WireFileWriter._append  # pyright: ignore[reportPrivateUsage]
+
+    def _append(self: WireFileWriter, data: bytes, index_data: bytes) -> None:
+        if data:
+            writes.append(data)
+        original(self, data, index_data)
+
+    monkeypatch.setattr(WireFileWriter, "_append", _append)
+    return writes
+
+
+async def test_recorder_batches_messages(tmp_path: Path, writes: list[bytes]):
+    wire_file = WireFile(tmp_path / "wire.jsonl")
+    wire = Wire(file_backend=wire_file)
+    soul_side = wire.soul_side
+
+    soul_side.send(TurnBegin(user_input="Hi"))
+    soul_side.send(StepBegin(n=1))
+    soul_side.send(TextPart(text="Hello"))
+    soul_side.send(TextPart(text=", world"))
+    soul_side.send(TurnEnd())
+    # the end of the turn is written right away
+    for _ in range(100):
+        if writes:
+            break
+        await asyncio.sleep(0.01)
+    assert len(writes) == 1
+
+    soul_side.send(TurnBegin(user_input="Again"))
+    wire.shutdown()
+    await wire.join()
+
+    assert len(writes) == 2
+    lines = wire_file.path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"type": "metadata", "protocol_version": WIRE_PROTOCOL_VERSION}
+    messages = [record.to_wire_message() async for record in wire_file.iter_records()]
+    assert messages == [
+        TurnBegin(user_input="Hi"),
+        StepBegin(n=1),
+        TextPart(text="Hello, world"),
+        TurnEnd(),
+        TurnBegin(user_input="Again"),
+    ]
+
+
+async def test_recorder_flushes_on_timer(tmp_path: Path, writes: list[bytes]):
+    wire = Wire(file_backend=WireFile(tmp_path / "wire.jsonl"))
+
+    wire.soul_side.send(TurnBegin(user_input="Hi"))
+    wire.soul_side.send(StepBegin(n=1))
+    await asyncio.sleep(0.2)
+    assert len(writes) == 1
+
+    wire.shutdown()
+    await wire.join()
+    assert len(writes) == 1
+
+
+async def test_writer_keeps_existing_header(tmp_path: Path):
+    wire_file = WireFile(tmp_path / "wire.jsonl")
+    for n in range(2):
+        writer = wire_file.open_writer()
+        writer.stage(StepBegin(n=n))
+        await writer.flush()
+        await writer.close()
+
+    lines = wire_file.path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    assert [record.to_wire_message() async for record in wire_file.iter_records()] == [
+        StepBegin(n=0),
+        StepBegin(n=1),
+    ]
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import gzip
+from pathlib import Path
+
+from kimi_cli.ui.shell.replay import (
+    MAX_REPLAY_TURNS,
+    _build_replay_turns_from_wire,  # pyright: ignore[reportPrivateUsage]
+)
+from kimi_cli.wire.file import WireFile
+from kimi_cli.wire.segments import load_manifest, manifest_path
+from kimi_cli.wire.types import StepBegin, TextPart, TurnBegin, TurnEnd, WireMessage
+
+
+def _turn(turn: int) -> list[WireMessage]:
+    return [
+        TurnBegin(user_input=f"turn {turn}"),
+        StepBegin(n=1),
+        TextPart(text=f"answer {turn} " * 20),
+        TurnEnd(),
+    ]
+
+
+async def _record(wire_file: WireFile, turns: range) -> list[WireMessage]:
+    messages = [msg for turn in turns for msg in _turn(turn)]
+    writer = wire_file.open_writer()
+    for msg in messages:
+        writer.stage(msg)
+        # flush often, so that turns are sealed both within and across flushes
+        if isinstance(msg, StepBegin):
+            await writer.flush()
+    await writer.close()
+    return messages
+
+
+async def test_wire_file_is_sealed_into_segments(tmp_path: Path):
+    wire_file = WireFile(tmp_path / "wire.jsonl", max_segment_bytes=500)
+    messages = await _record(wire_file, range(3))
+    messages += await _record(wire_file, range(3, 5))
+
+    manifest = load_manifest(wire_file.path)
+    assert [(s.name, s.n_turns, s.title) for s in manifest.segments] == [
+        ("wire.000001.jsonl.gz", 1, "turn 0"),
+        ("wire.000002.jsonl.gz", 1, "turn 1"),
+        ("wire.000003.jsonl.gz", 1, "turn 2"),
+        ("wire.000004.jsonl.gz", 1, "turn 3"),
+    ]
+    segment = gzip.decompress((tmp_path / "wire.000002.jsonl.gz").read_bytes())
+    assert len(segment) == manifest.segments[1].size
+    assert segment.startswith(b'{"type": "metadata"')
+
+    assert [r.to_wire_message() async for r in wire_file.iter_records()] == messages
+    assert [entry.title for entry in await wire_file.turn_index()] == ["turn 4", None]
+    assert await wire_file.first_turn_title() == "turn 0"
+    assert not wire_file.is_empty()
+
+
+async def test_manifest_is_rebuilt_from_segment_files(tmp_path: Path):
+    wire_file = WireFile(tmp_path / "wire.jsonl", max_segment_bytes=500)
+    messages = await _record(wire_file, range(3))
+    manifest = load_manifest(wire_file.path)
+
+    # as if sealing was interrupted before compressing the last segment
+    manifest_path(wire_file.path).unlink()
+    last = tmp_path / manifest.segments[-1].name
+    (tmp_path / last.stem).write_bytes(gzip.decompress(last.read_bytes()))
+    last.unlink()
+
+    rebuilt = load_manifest(wire_file.path)
+    assert [s.name for s in rebuilt.segments] == ["wire.000001.jsonl.gz", "wire.000002.jsonl"]
+    assert [s.title for s in rebuilt.segments] == ["turn 0", "turn 1"]
+    assert rebuilt.segments[1].size == manifest.segments[1].size
+    assert [r.to_wire_message() async for r in wire_file.iter_records()] == messages
+
+
+async def test_replay_reads_recent_turns_across_segments(tmp_path: Path):
+    wire_file = WireFile(tmp_path / "wire.jsonl", max_segment_bytes=500)
+    await _record(wire_file, range(MAX_REPLAY_TURNS + 2))
+    # the active segment was just sealed and only holds the last turn
+    assert len([e for e in await wire_file.turn_index() if e.kind == "begin"]) == 1
+
+    turns = await _build_replay_turns_from_wire(wire_file)
+
+    assert [turn.user_message.extract_text() for turn in turns] == [
+        f"turn {i}" for i in range(2, MAX_REPLAY_TURNS + 2)
+    ]
+    assert all(turn.n_steps == 1 for turn in turns)